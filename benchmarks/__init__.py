@@ -0,0 +1,6 @@
+"""Performance benchmarks: synthetic log generator, harness and baselines
+
+    python -m benchmarks generate /tmp/bench --size 1GB
+    python -m benchmarks run /tmp/bench --save local
+    python -m benchmarks run /tmp/bench --compare local
+"""
@@ -0,0 +1,83 @@
+"""Command line entry point: python -m benchmarks {generate,run}"""
+import argparse
+import json
+import sys
+from config import BENCHMARK_CONFIG
+from benchmarks.generator import LogGenerator
+from benchmarks.harness import CASES, BenchmarkHarness, compare, load_baseline, save_baseline
+
+
+def _generate(args) -> int:
+    profile = {"size_bytes": args.size, "files": args.files, "seed": args.seed}
+    if args.templates is not None:
+        profile["templates"] = args.templates
+    manifest = LogGenerator(**profile).write(args.directory)
+    print(f"Wrote {manifest['bytes']:,} bytes, {manifest['lines']:,} lines "
+          f"in {len(manifest['files'])} files to {args.directory}")
+    return 0
+
+
+def _print_case(name: str, metrics: dict) -> None:
+    if "error" in metrics or "skipped" in metrics:
+        print(f"{name:32} {metrics.get('error') or metrics['skipped']}")
+        return
+    print(f"{name:32} cold {metrics['cold_s']:8.3f}s {metrics['mb_per_s'] or 0:8.1f} MB/s "
+          f"{metrics['lines_per_s'] or 0:>10,} lines/s  p50 {metrics['p50_s']:.4f}s "
+          f"p99 {metrics['p99_s']:.4f}s  rss {metrics['peak_rss_mb']} MB")
+
+
+def _run(args) -> int:
+    names = args.cases.split(",") if args.cases else None
+    unknown = sorted(set(names or ()) - set(CASES))
+    if unknown:
+        print(f"Unknown cases: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    harness = BenchmarkHarness(args.directory, args.repeats)
+    results = harness.run(names, progress=_print_case)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save:
+        print(f"Saved baseline {save_baseline(results, args.save)}")
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline["meta"].get("profile") != results["meta"].get("profile"):
+            print("Warning: baseline was recorded on a different generator profile")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']} {regression['metric']}: "
+                  f"{regression.get('baseline')} -> {regression['current']} {regression.get('change', '')}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic log directory")
+    generate.add_argument("directory")
+    generate.add_argument("--size", default=BENCHMARK_CONFIG["size_bytes"], help="total size, e.g. 512MB or 2GB")
+    generate.add_argument("--files", type=int, default=BENCHMARK_CONFIG["files"])
+    generate.add_argument("--seed", type=int, default=BENCHMARK_CONFIG["seed"])
+    generate.add_argument("--templates", type=int)
+    generate.set_defaults(handler=_generate)
+
+    run = commands.add_parser("run", help="time the analyzer methods and MCP tools")
+    run.add_argument("directory")
+    run.add_argument("--cases", help=f"comma-separated subset of: {', '.join(CASES)}")
+    run.add_argument("--repeats", type=int, default=BENCHMARK_CONFIG["repeats"])
+    run.add_argument("--output", help="write the results as JSON")
+    run.add_argument("--save", metavar="NAME", help="store the results as baseline NAME")
+    run.add_argument("--compare", metavar="NAME", help="fail on regressions against baseline NAME")
+    run.add_argument("--tolerance", type=float, default=BENCHMARK_CONFIG["tolerance"])
+    run.set_defaults(handler=_run)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Deterministic synthetic log generator
+
+Every random choice comes from one random.Random seeded with the
+profile's seed, so the same profile always writes byte-identical files.
+Lines look like sample_logs/sample.log ("2026-01-03 10:00:01.000 INFO
+message"). Messages come from profile["templates"] templates with
+numeric variable parts, padded with filler words to a normally
+distributed length. Each file holds a few error bursts: runs of
+ERROR/CRITICAL lines timed much more densely than the rest, which the
+spike detector should find.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import itertools
+import json
+import random
+import re
+from config import BENCHMARK_CONFIG
+
+MANIFEST_NAME = "benchmark.json"
+
+_WORDS = (
+    "request user session cache database query connection worker job queue payment order "
+    "invoice token upstream downstream replica shard index batch upload download config "
+    "scheduler handler socket stream message event retry timeout response service node"
+).split()
+_VERBS = (
+    "started finished failed accepted rejected opened closed loaded saved dropped queued "
+    "retried expired refreshed validated processed received sent created deleted updated"
+).split()
+_LEVEL_WIDTH = max(len(level) for level in BENCHMARK_CONFIG["level_mix"])
+_BATCH = 10000
+
+
+def parse_size(text) -> int:
+    """'512MB', '2GB', '100k' or a plain number of bytes"""
+    if isinstance(text, int):
+        return text
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*', str(text), re.I)
+    if match is None:
+        raise ValueError(f"Invalid size: {text}")
+    power = " kmgt".index(match.group(2).lower() or " ")
+    return int(float(match.group(1)) * 1024 ** power)
+
+
+class LogGenerator:
+    def __init__(self, **profile):
+        unknown = set(profile) - set(BENCHMARK_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown profile keys: {', '.join(sorted(unknown))}")
+        self.profile = {
+            key: BENCHMARK_CONFIG[key] for key in (
+                "seed", "size_bytes", "files", "level_mix", "templates",
+                "line_length", "bursts", "burst_lines", "line_interval_ms"
+            )
+        }
+        self.profile.update(profile)
+        self.profile["size_bytes"] = parse_size(self.profile["size_bytes"])
+        self.rng = random.Random(self.profile["seed"])
+        self.templates = self._templates(self.profile["templates"])
+        self.filler = " ".join(self.rng.choice(_WORDS) for _ in range(4096))
+
+    def _templates(self, count: int) -> List[Tuple[str, int]]:
+        """count distinct (template, slots) with 1-3 numeric slots each"""
+        templates = []
+        seen = set()
+        while len(templates) < count:
+            words = [self.rng.choice(_WORDS), self.rng.choice(_VERBS)]
+            words += self.rng.sample(_WORDS, self.rng.randint(1, 4))
+            slots = self.rng.randint(1, 3)
+            for slot in range(slots):
+                words.insert(self.rng.randint(2, len(words)), f"{self.rng.choice(_WORDS)}=%d")
+            template = " ".join(words)
+            if template not in seen:
+                seen.add(template)
+                templates.append((template, slots))
+        return templates
+
+    def write(self, directory: str) -> Dict:
+        """Write the profile's files into directory and a manifest next to them"""
+        out = Path(directory)
+        out.mkdir(parents=True, exist_ok=True)
+        per_file = self.profile["size_bytes"] // self.profile["files"]
+        start = datetime(2026, 1, 3, 0, 0, 0)
+        files = []
+        for index in range(self.profile["files"]):
+            path = out / f"service-{index}.log"
+            files.append(self._write_file(path, per_file, start))
+        manifest = {
+            "profile": self.profile,
+            "files": files,
+            "bytes": sum(info["bytes"] for info in files),
+            "lines": sum(info["lines"] for info in files),
+            "first_timestamp": min(info["first_timestamp"] for info in files),
+            "last_timestamp": max(info["last_timestamp"] for info in files),
+        }
+        with open(out / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def _write_file(self, path: Path, size: int, start: datetime) -> Dict:
+        rng = self.rng
+        levels = list(self.profile["level_mix"])
+        cum_levels = list(itertools.accumulate(self.profile["level_mix"][level] for level in levels))
+        padded = {level: level.ljust(_LEVEL_WIDTH) for level in levels}
+        burst_levels = [padded["ERROR"]] * 4 + [padded["CRITICAL"]]
+        mean, deviation = self.profile["line_length"]
+        interval = self.profile["line_interval_ms"]
+        # Bursts start at evenly spread, jittered byte positions
+        bursts = sorted(
+            int(size * (slot + rng.random()) / max(self.profile["bursts"], 1))
+            for slot in range(self.profile["bursts"])
+        )
+        burst_left = 0
+        millis = 0
+        second_cache = (None, "")
+        written = lines = 0
+        first = None
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            while written < size:
+                batch = []
+                picks = rng.choices(levels, cum_weights=cum_levels, k=_BATCH)
+                templates = rng.choices(self.templates, k=_BATCH)
+                for level, (template, slots) in zip(picks, templates):
+                    if bursts and written >= bursts[0]:
+                        bursts.pop(0)
+                        burst_left = self.profile["burst_lines"]
+                    if burst_left:
+                        burst_left -= 1
+                        millis += 1
+                        level_text = rng.choice(burst_levels)
+                    else:
+                        millis += interval
+                        level_text = padded[level]
+                    second = millis // 1000
+                    if second != second_cache[0]:
+                        second_cache = (second, (start + timedelta(seconds=second)).strftime("%Y-%m-%d %H:%M:%S"))
+                    message = template % tuple(rng.getrandbits(16) for _ in range(slots))
+                    target = int(rng.gauss(mean, deviation))
+                    if target > len(message):
+                        offset = rng.randrange(len(self.filler) - target)
+                        message = f"{message} {self.filler[offset:offset + target - len(message)]}"
+                    line = f"{second_cache[1]}.{millis % 1000:03d} {level_text} {message}\n"
+                    batch.append(line)
+                    written += len(line)
+                    lines += 1
+                    if first is None:
+                        first = second_cache[1]
+                    if written >= size:
+                        break
+                f.write("".join(batch))
+        return {
+            "name": path.name,
+            "bytes": path.stat().st_size,
+            "lines": lines,
+            "first_timestamp": first,
+            "last_timestamp": second_cache[1],
+        }
+
+
+def load_manifest(directory: str) -> Optional[Dict]:
+    """Manifest of a generated directory, or None for other log directories"""
+    try:
+        with open(Path(directory) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
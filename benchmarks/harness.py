@@ -0,0 +1,277 @@
+"""Benchmark harness
+
+Each case runs in a fresh spawned process so that in-memory caches start
+empty and peak RSS belongs to that case alone. The first run is reported
+as cold. The repeats after it run against warm caches and checkpoints,
+and their latencies give the percentiles. Throughput is the size of the
+whole data set over the cold run time, so for calls that read only part
+of it (tails, time windows) it is an effective rate, not disk speed.
+Peak RSS is the larger of the case process and its scan workers, which
+are shut down before it is read.
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from config import BENCHMARK_CONFIG
+from benchmarks.generator import load_manifest
+
+
+def _window(info: Dict) -> Dict:
+    """A window over the middle tenth of the generated time span"""
+    if info is None:
+        return {}
+    first = datetime.fromisoformat(info["first_timestamp"])
+    span = datetime.fromisoformat(info["last_timestamp"]) - first
+    since = first + span * 0.45
+    until = since + span / 10
+    return {"since": since.isoformat(sep=" "), "until": until.isoformat(sep=" ")}
+
+
+def _analyzer(directory: str):
+    from log_analyzer import LogAnalyzer
+    return LogAnalyzer(directory)
+
+
+def _tool(name: str) -> Callable:
+    import mcp_server
+    tool = getattr(mcp_server, name)
+    return getattr(tool, "fn", tool)  # FastMCP may wrap the function
+
+
+def _follow(directory: str) -> Dict:
+    """Follow from the start, read the windows once and stop"""
+    analyzer = _analyzer(directory)
+    started = analyzer.start_follow(from_start=True)
+    if "error" in started:
+        return started
+    result = analyzer.read_follow(started["watch_id"])
+    analyzer.stop_follow(started["watch_id"])
+    return result
+
+
+# name -> (kind, call); analyzer calls take (directory, scratch, window)
+CASES = {
+    "read_logs": ("analyzer", lambda d, s, w: _analyzer(d).read_logs(lines=100)),
+    "read_logs_filter": ("analyzer", lambda d, s, w: _analyzer(d).read_logs("timeout", lines=100)),
+    "read_logs_regex": ("analyzer", lambda d, s, w: _analyzer(d).read_logs(r"retry=\d+ .*failed", regex=True)),
+    "read_logs_window": ("analyzer", lambda d, s, w: _analyzer(d).read_logs(lines=100, **w)),
+    "count_log_types": ("analyzer", lambda d, s, w: _analyzer(d).count_log_types()),
+    "count_log_types_window": ("analyzer", lambda d, s, w: _analyzer(d).count_log_types(**w)),
+    "generate_statistics_summary": ("analyzer", lambda d, s, w: _analyzer(d).generate_statistics("summary")),
+    "generate_statistics_detailed": ("analyzer", lambda d, s, w: _analyzer(d).generate_statistics("detailed")),
+    "extract_critical_logs": ("analyzer", lambda d, s, w: _analyzer(d).extract_critical_logs(
+        "ERROR,CRITICAL", os.path.join(s, "critical.log"))),
+    "extract_critical_keywords": ("analyzer", lambda d, s, w: _analyzer(d).extract_critical_logs(
+        "ERROR,CRITICAL", None, keywords=["timeout", "payment", "replica"])),
+    "detect_anomalies_spike": ("analyzer", lambda d, s, w: _analyzer(d).detect_anomalies("spike")),
+    "detect_anomalies_pattern": ("analyzer", lambda d, s, w: _analyzer(d).detect_anomalies("pattern")),
+    "detect_anomalies_missing": ("analyzer", lambda d, s, w: _analyzer(d).detect_anomalies("missing")),
+    "generate_report_summary": ("analyzer", lambda d, s, w: _analyzer(d).generate_report(
+        "summary", os.path.join(s, "report.txt"))),
+    "generate_report_html": ("analyzer", lambda d, s, w: _analyzer(d).generate_report(
+        "html", os.path.join(s, "report.html"))),
+    "follow": ("analyzer", lambda d, s, w: _follow(d)),
+    "mcp_read_logs": ("tool", lambda d, s, w: _tool("read_logs")(customPath=d)),
+    "mcp_count_log_types": ("tool", lambda d, s, w: _tool("count_log_types")(customPath=d)),
+    "mcp_generate_statistics": ("tool", lambda d, s, w: _tool("generate_statistics")(customPath=d)),
+    "mcp_extract_critical_logs": ("tool", lambda d, s, w: _tool("extract_critical_logs")(
+        customPath=d, outputPath=os.path.join(s, "critical.log"))),
+    "mcp_detect_anomalies": ("tool", lambda d, s, w: _tool("detect_anomalies")(customPath=d)),
+    "mcp_generate_report": ("tool", lambda d, s, w: _tool("generate_report")(
+        customPath=d, outputPath=os.path.join(s, "report.txt"))),
+}
+WINDOW_CASES = {"read_logs_window", "count_log_types_window"}
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process and its reaped children"""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_case(name: str, directory: str, repeats: int, window: Dict, conn) -> None:
+    """Case process: one cold run and repeats warm runs"""
+    from utils.parallel import shutdown_pools
+    from utils.trigram import TRIGRAM_INDEX
+    scratch = tempfile.mkdtemp(prefix="log_bench_")
+    # On-disk indexes would otherwise survive from earlier cases
+    TRIGRAM_INDEX.index_dir = os.path.join(scratch, "trigrams")
+    kind, call = CASES[name]
+    loop = None
+    if kind == "tool":
+        import mcp_server  # server start-up is not part of the call
+        loop = asyncio.new_event_loop()
+    try:
+        latencies = []
+        error = None
+        for _ in range(repeats + 1):
+            started = time.perf_counter()
+            result = call(directory, scratch, window)
+            if loop is not None:
+                result = loop.run_until_complete(result)
+            latencies.append(time.perf_counter() - started)
+            if isinstance(result, dict) and "error" in result:
+                error = result["error"]
+                break
+        shutdown_pools()
+        conn.send({"latencies": latencies, "error": error, "peak_rss_mb": _peak_rss_mb()})
+    except Exception as e:
+        conn.send({"latencies": [], "error": f"{type(e).__name__}: {e}", "peak_rss_mb": _peak_rss_mb()})
+    finally:
+        if loop is not None:
+            loop.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+        conn.close()
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Linear-interpolated percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class BenchmarkHarness:
+    def __init__(self, directory: str, repeats: int = BENCHMARK_CONFIG["repeats"]):
+        self.directory = str(Path(directory).resolve())
+        self.repeats = repeats
+        self.manifest = load_manifest(self.directory)
+        if self.manifest is not None:
+            self.bytes, self.lines = self.manifest["bytes"], self.manifest["lines"]
+        else:
+            self.bytes, self.lines = self._measure()
+
+    def _measure(self):
+        """Bytes and lines of the log files of a directory not made by the generator"""
+        from utils.file_handler import FileHandler
+        size = lines = 0
+        for log_file in FileHandler.get_log_files(self.directory):
+            size += log_file.stat().st_size
+            with open(log_file, 'rb') as f:
+                lines += sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+        return size, lines
+
+    def run_case(self, name: str) -> Dict:
+        if name not in CASES:
+            raise ValueError(f"Unknown case: {name}")
+        window = _window(self.manifest)
+        if name in WINDOW_CASES and not window:
+            return {"skipped": "window cases need a generated directory"}
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run_case, args=(name, self.directory, self.repeats, window, sender))
+        process.start()
+        sender.close()
+        try:
+            outcome = receiver.recv()
+        except EOFError:
+            outcome = {"latencies": [], "error": f"case process exited with {process.exitcode}", "peak_rss_mb": None}
+        process.join()
+        return self._metrics(outcome)
+
+    def _metrics(self, outcome: Dict) -> Dict:
+        latencies = outcome["latencies"]
+        if outcome["error"] is not None:
+            return {"error": outcome["error"]}
+        cold, warm = latencies[0], latencies[1:] or latencies[:1]
+        mb = self.bytes / (1024 * 1024)
+        return {
+            "cold_s": round(cold, 4),
+            "mb_per_s": round(mb / cold, 1) if cold else None,
+            "lines_per_s": round(self.lines / cold) if cold else None,
+            "p50_s": round(percentile(warm, 0.50), 4),
+            "p90_s": round(percentile(warm, 0.90), 4),
+            "p99_s": round(percentile(warm, 0.99), 4),
+            "max_s": round(max(warm), 4),
+            "peak_rss_mb": outcome["peak_rss_mb"],
+        }
+
+    def run(self, names: Optional[List[str]] = None, progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """Run cases (all by default) and return the results document"""
+        cases = {}
+        for name in names or CASES:
+            cases[name] = self.run_case(name)
+            if progress is not None:
+                progress(name, cases[name])
+        return {
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "repeats": self.repeats,
+                "bytes": self.bytes,
+                "lines": self.lines,
+                "profile": self.manifest["profile"] if self.manifest else None,
+            },
+            "cases": cases,
+        }
+
+
+def baseline_path(name: str, baseline_dir: str = BENCHMARK_CONFIG["baseline_dir"]) -> Path:
+    return Path(baseline_dir) / f"{name}.json"
+
+
+def save_baseline(results: Dict, name: str) -> Path:
+    path = baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def load_baseline(name: str) -> Dict:
+    path = baseline_path(name)
+    if not path.exists():
+        raise FileNotFoundError(f"Baseline not found: {path}")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(
+    results: Dict,
+    baseline: Dict,
+    tolerance: float = BENCHMARK_CONFIG["tolerance"],
+    noise_floor: float = BENCHMARK_CONFIG["noise_floor_seconds"]
+) -> List[Dict]:
+    """Cases slower (cold or p50) or larger (peak RSS) than baseline by more than tolerance"""
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None or "error" in previous or "skipped" in previous or "skipped" in current:
+            continue
+        if "error" in current:
+            regressions.append({"case": name, "metric": "error", "current": current["error"]})
+            continue
+        for metric, floor in (("cold_s", noise_floor), ("p50_s", noise_floor), ("peak_rss_mb", 1.0)):
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({
+                    "case": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": f"{(new / old - 1) * 100:+.0f}%" if old else "new",
+                })
+    return regressions
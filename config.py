@@ -10,6 +10,48 @@ LOG_LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
 # Supported log formats
 LOG_FORMATS = [".log", ".txt"]
 
+# Log file discovery
+DISCOVERY_CONFIG = {
+    "recursive": False,  # descend into subdirectories
+    "max_depth": None,  # subdirectory levels when recursive (None = unlimited)
+    "include": None,  # globs of files to analyze (None = LOG_FORMATS and rotations)
+    "exclude": [],  # globs of files or directories to skip
+    "manifest": True,  # reuse listings while directory mtimes are unchanged
+    "max_manifests": 256,  # directory listings kept in memory
+}
+
+# Rotated and compressed archives (app.log.1, app.log.2.gz, .bz2, .xz)
+ARCHIVE_CONFIG = {
+    "rotated": True,  # include rotated and compressed siblings of log files
+    "read_size": 256 * 1024,  # compressed bytes read per step
+    "decoded_size": 4 * 1024 * 1024,  # most decompressed bytes produced per decode step
+    "gzip_index_span": 16 * 1024 * 1024,  # decompressed bytes between seek points
+    "max_indexes": 64,  # gzip seek indexes kept in memory
+    "min_parallel_bytes": 1024 * 1024,  # smaller archives are parsed in-process
+    "piece_bytes": 8 * 1024 * 1024,  # decoded bytes of a larger archive parsed per worker task
+}
+
+# Trigram index for read_logs filters
+TRIGRAM_CONFIG = {
+    "enabled": True,
+    "index_dir": None,  # where indexes are stored (None = system temp dir)
+    "min_file_bytes": 4 * 1024 * 1024,  # smaller files are filtered directly
+    "page_bytes": 64 * 1024,  # newline-aligned block each posting refers to
+    "segment_bytes": 64 * 1024 * 1024,  # file bytes per index segment
+    "max_cached": 16,  # file indexes kept in memory
+}
+
+# Record parsing: "auto", "plain", "bracketed" or "json"
+PARSER_CONFIG = {
+    "format": "auto",
+}
+
+# Time-range queries (binary search over monotonic timestamps)
+TIME_INDEX_CONFIG = {
+    "linear_scan_bytes": 64 * 1024,  # stop bisecting below this range size
+    "probe_lines": 1000,  # lines read at a probe point to find a timestamp
+}
+
 # Statistics
 STATS_CONFIG = {
     "min_line_length": 5,
@@ -17,9 +59,163 @@ STATS_CONFIG = {
     "rare_threshold": 0.01,  # 1% of logs
 }
 
+# Streaming scan settings
+SCAN_CONFIG = {
+    "chunk_size": 1024 * 1024,  # bytes read per chunk
+    "tail_block_size": 64 * 1024,  # bytes read per step when tailing from EOF
+    "raw_bytes": True,  # count and filter levels on raw bytes, decoding only returned lines
+    "byte_chunk_size": 16 * 1024 * 1024,  # bytes classified per pass on the raw-bytes path
+}
+
+# Parallel scanning over a process pool
+PARALLEL_CONFIG = {
+    "enabled": True,
+    "workers": None,  # None = one per CPU
+    "chunk_bytes": 64 * 1024 * 1024,  # newline-aligned byte range per task
+    "min_parallel_bytes": 16 * 1024 * 1024,  # smaller scans stay in-process
+}
+
+# Async tool execution: worker threads, per-tool concurrency and timeouts
+EXECUTOR_CONFIG = {
+    "workers": 8,  # threads running tool calls
+    "default_timeout": 300,  # seconds before a call is cancelled (None = never)
+    "default_max_concurrent": 4,  # concurrent calls per tool
+    "tools": {
+        # dedup: identical concurrent calls share one run
+        "read_logs": {"max_concurrent": 8, "timeout": 60},
+        "generate_report": {"max_concurrent": 2, "timeout": 600},
+        "extract_critical_logs": {"max_concurrent": 2, "timeout": 600},
+        "start_follow": {"dedup": False, "timeout": 30},
+        "read_follow": {"max_concurrent": 8, "timeout": 10},
+        "stop_follow": {"dedup": False, "timeout": 30},
+        "server_metrics": {"dedup": False, "max_concurrent": 8, "timeout": 10},
+        "ingest_logs": {"max_concurrent": 1, "timeout": 3600},
+        "warmup_status": {"dedup": False, "max_concurrent": 8, "timeout": 10},
+    },
+}
+
+# Instrumentation and profiling (server_metrics tool, profile flag)
+METRICS_CONFIG = {
+    "enabled": True,  # per-stage timings and counters; off leaves one flag check per call/chunk
+    "profile_top": 25,  # hot functions returned by a profiled call
+    "profile_sort": "tottime",  # "tottime" (self time) or "cumulative"
+}
+
+# Cross-call cache of per-file aggregates
+CACHE_CONFIG = {
+    "enabled": True,
+    "max_bytes": 64 * 1024 * 1024,  # approximate memory cap before LRU eviction
+}
+
+# Incremental indexing of append-only files
+CHECKPOINT_CONFIG = {
+    "enabled": True,
+    "head_bytes": 4096,  # bytes hashed to detect rotation/truncation
+    "max_entries": 10000,  # checkpoints kept in memory
+    "max_bytes": 64 * 1024 * 1024,  # their estimated footprint (as in CACHE_CONFIG) before LRU eviction
+    "sidecar_dir": None,  # directory to persist checkpoints across restarts
+}
+
+# Background warm-up of log directories after server start (warmup_status tool)
+WARMUP_CONFIG = {
+    "paths": [],  # log directories discovered and summarized in the background
+    "file_limit": None,  # newest N files per directory (None = all)
+    "recursive": None,  # None = DISCOVERY_CONFIG
+    "ingest": False,  # also build the columnar store (see COLUMNAR_CONFIG)
+}
+
+# Columnar store of parsed lines (ingest_logs tool)
+COLUMNAR_CONFIG = {
+    "enabled": True,  # answer aggregate queries from ingested columns when fresh
+    "store_dir": None,  # where columns are stored (None = system temp dir)
+    "max_open": 64,  # ingested files kept memory-mapped
+}
+
+# Approximate counts from sampled blocks (mode="approximate")
+SAMPLING_CONFIG = {
+    "block_bytes": 256 * 1024,  # newline-aligned byte range read per sample step
+    "time_budget": 2.0,  # seconds of reading per call when no budget is given
+    "byte_budget": None,  # bytes read per call (None = limited by time only)
+    "z": 1.96,  # normal quantile of the reported intervals (1.96 = 95%)
+    "seed": None,  # fixed seed for a reproducible block order (None = random)
+    "max_samples": 32,  # samples kept for refinement; least recently used dropped
+}
+
+# Drain-style template mining
+TEMPLATE_CONFIG = {
+    "depth": 4,  # prefix tree depth (token count + 2 leading tokens)
+    "similarity": 0.5,  # share of equal tokens needed to join a template
+    "max_children": 100,  # children per tree node before routing to <*>
+    "max_templates": 1000,  # templates kept; the rarest of the least recently matched is evicted
+    "max_messages": 10000,  # distinct masked messages per file kept by the columnar store
+}
+
+# Paged reads merged across files (read_logs)
+READ_CONFIG = {
+    "page_size": 50,  # lines per page
+}
+
+# Extraction of matching lines to files
+EXTRACT_CONFIG = {
+    "buffer_bytes": 1024 * 1024,  # write buffer per output file
+    "sample_lines": 20,  # matching lines returned in the response
+}
+
+# Frequency sketches for heavy hitters and rare events
+SKETCH_CONFIG = {
+    "cms_width": 2048,  # count-min counters per row
+    "cms_depth": 4,  # count-min rows (independent hashes)
+    "heavy_hitters": 100,  # messages tracked by SpaceSaving
+    "rare_candidates": 200,  # rare messages remembered with an example
+}
+
+# Follow mode: live sliding-window aggregates
+FOLLOW_CONFIG = {
+    "poll_interval": 2.0,  # seconds between stat polls
+    "bucket_seconds": 1,  # resolution of the sliding windows
+    "windows": [60, 300, 900],  # trailing windows reported, in seconds
+    "max_templates": 1000,  # distinct templates tracked across the windows
+    "top_templates": 10,  # templates returned per window
+    "max_sessions": 8,  # concurrent follow sessions
+    "idle_timeout": 3600,  # seconds without a read before a session is stopped
+}
+
+# Time-bucketed anomaly detection
+ANOMALY_CONFIG = {
+    "bucket_seconds": 60,  # width of each time bucket
+    "window_buckets": 10,  # trailing buckets used as the rolling baseline
+    "z_threshold": 3.0,  # z-score at or above which a bucket is a spike
+    "ewma_alpha": 0.3,  # smoothing factor of the reported EWMA
+    "min_count": 3,  # ignore buckets with fewer events than this
+    "min_gap_buckets": 2,  # consecutive silent buckets reported as a gap
+    "max_patterns": 1000,  # patterns tracked per timeline
+    "max_results": 20,  # windows/patterns returned per anomaly type
+}
+
 # Report settings
 REPORT_CONFIG = {
     "include_timestamp": True,
     "include_statistics": True,
     "include_anomalies": True,
+    "top_templates": 10,  # error templates listed in the HTML report
+    "histogram_bars": 48,  # time buckets of the HTML level histogram (adjacent buckets are combined)
+    "preview_chars": 500,  # characters of the report returned as a preview
+    "buffer_bytes": 256 * 1024,  # write buffer of the report file
+}
+
+# Benchmarks (python -m benchmarks)
+BENCHMARK_CONFIG = {
+    "seed": 42,  # same seed and profile give byte-identical logs
+    "size_bytes": 256 * 1024 * 1024,  # total generated across all files
+    "files": 4,
+    "level_mix": {"INFO": 0.70, "DEBUG": 0.15, "WARNING": 0.09, "ERROR": 0.05, "CRITICAL": 0.01},
+    "templates": 500,  # distinct message templates
+    "line_length": (90, 40),  # mean and standard deviation of message length
+    "bursts": 4,  # error bursts per file
+    "burst_lines": 2000,  # lines per burst, all ERROR/CRITICAL and densely timed
+    "line_interval_ms": 20,  # time between lines outside bursts
+    "repeats": 5,  # warm runs per case after the cold one
+    "tolerance": 0.20,  # allowed slowdown or growth before a regression is reported
+    "noise_floor_seconds": 0.005,  # smaller absolute differences are ignored
+    "baseline_dir": str(Path(__file__).parent / "benchmarks" / "baselines"),
 }
@@ -1,83 +1,267 @@
 """Main log analysis module"""
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-from utils.file_handler import FileHandler
-from utils.statistics import StatisticsAnalyzer
+import math
+import os
+import re
+from utils.file_handler import FileHandler, LineWriter
+from utils.parallel import ParallelScanner
+from utils.cache import ANALYSIS_CACHE
+from utils.checkpoint import CHECKPOINTS
+from utils.statistics import StatisticsAnalyzer, LevelCounter, LineCounter, LineSample, LogSummary
+from utils.parser import normalize_level
+from utils.time_index import TimeRange
+from utils.anomaly import ANOMALY_TYPES
+from utils.follow import FOLLOWS
+from utils.trigram import TRIGRAM_INDEX, required_literals
+from utils.matcher import KeywordMatcher, parse_list
 from utils.report_generator import ReportGenerator
-from config import LOG_LEVELS
+from utils.metrics import METRICS
+from utils.discovery import DISCOVERY
+from utils.columnar import COLUMN_STORE, PARTS
+from utils.merge import LogMerger
+from utils.sampling import SAMPLES, Sample
+from utils.warmup import WARMUP, WarmupProgress
+from config import LOG_LEVELS, FOLLOW_CONFIG, EXTRACT_CONFIG, READ_CONFIG, REPORT_CONFIG, SAMPLING_CONFIG, WARMUP_CONFIG
+
+def _rounded(interval: Optional[List[float]], digits: int = 0, scale: float = 1) -> Optional[List[float]]:
+    """Confidence interval for display; None while it cannot be estimated yet"""
+    if interval is None:
+        return None
+    if digits:
+        return [round(bound * scale, digits) for bound in interval]
+    return [round(bound * scale) for bound in interval]
 
 class LogAnalyzer:
-    def __init__(self, directory: str):
+    def __init__(
+        self,
+        directory: str,
+        recursive: Optional[bool] = None,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None
+    ):
         self.directory = directory
+        # None falls back to DISCOVERY_CONFIG
+        self.discovery = {"recursive": recursive, "include": include, "exclude": exclude}
         self.file_handler = FileHandler()
         self.stats_analyzer = StatisticsAnalyzer()
+        self.scanner = ParallelScanner()
+        self.cache = ANALYSIS_CACHE
+        self.checkpoints = CHECKPOINTS
+        self.columns = COLUMN_STORE
+        self.merger = LogMerger(self.scanner.parser, self.scanner.time_index)
+        self.samples = SAMPLES
+
+    def _log_files(self, file_limit: Optional[int] = None) -> List[Path]:
+        """All log files, or the newest file_limit of them"""
+        return self.file_handler.get_log_files(self.directory, file_limit, **self.discovery)
+
+    def _scan_file(self, file_path: str) -> LogSummary:
+        """Summarize one file from its ingested columns if fresh, else scan only
+        bytes appended since its checkpoint"""
+        summary = self.columns.summarize(file_path, PARTS)
+        if summary is not None:
+            return summary
+        return self.checkpoints.summarize(file_path, self.scanner.scan_range)
+
+    def _file_summary(self, log_file: Path, parts: Tuple[str, ...], window: Optional[TimeRange]) -> LogSummary:
+        """Summary of one file, restricted to window if given"""
+        if not window:
+            return self.cache.summarize(log_file, self._scan_file)
+        summary = self.columns.summarize(str(log_file), parts, window)
+        if summary is None:
+            summary = LogSummary()
+            self.scanner.aggregate(self.scanner.records_in_window([log_file], window), summary)
+        return summary
+
+    def _summarize(
+        self,
+        log_files: List[Path],
+        parts: Tuple[str, ...] = PARTS,
+        window: Optional[TimeRange] = None
+    ) -> LogSummary:
+        """Merge the given parts of per-file summaries, scanning only files not cached or ingested"""
+        summaries = self.scanner.map_files(lambda log_file: self._file_summary(log_file, parts, window), log_files)
+        total = LogSummary()
+        with METRICS.stage("merge"):
+            for summary in summaries:
+                for part in parts:
+                    getattr(total, part).merge(getattr(summary, part))
+        return total
+
+    def _file_levels(self, log_file: Path) -> Tuple[LevelCounter, int]:
+        """Level and line counts of one file: from its cached, ingested or
+        checkpointed summary when there is one, else counted on raw bytes"""
+        path = str(Path(log_file).resolve())
+        summary = self.cache.get(path, self.cache.identity(path)) if self.cache.enabled else None
+        if summary is None:
+            summary = self.columns.summarize(path, ("levels", "line_stats"))
+        if summary is None and self.checkpoints.resumable(path):
+            summary = self.cache.summarize(path, self._scan_file)
+        if summary is not None:
+            return summary.levels, summary.line_stats.total_lines
+        levels, lines = LevelCounter(), LineCounter()
+        self.scanner.scan_range(path, 0, None, levels, lines)
+        return levels, lines.count
+
+    def _count_levels(self, log_files: List[Path]) -> Tuple[Dict[str, int], int]:
+        """Per-level counts and total lines of whole files"""
+        total, lines = LevelCounter(), 0
+        for levels, count in self.scanner.map_files(self._file_levels, log_files):
+            total.merge(levels)
+            lines += count
+        return total.result(), lines
+
+    def _sample(
+        self,
+        file_limit: Optional[int],
+        budget_seconds: Optional[float],
+        budget_bytes: Optional[int],
+        sample_id: Optional[str]
+    ) -> Tuple[str, Sample]:
+        """New or continued sample of the log files, extended by the budget"""
+        key = (self.directory, file_limit, sorted(self.discovery.items()))
+        if sample_id:
+            sample = self.samples.get(sample_id, key)
+        else:
+            log_files = self._log_files(file_limit)
+            if not log_files:
+                raise ValueError("No log files found")
+            sample_id, sample = self.samples.create(key, log_files)
+        if budget_seconds is None and budget_bytes is None:
+            budget_seconds = SAMPLING_CONFIG["time_budget"]
+        with METRICS.stage("sample"):
+            sample.extend(self.scanner.scan_range, budget_seconds, budget_bytes or SAMPLING_CONFIG["byte_budget"])
+        return sample_id, sample
+
+    @staticmethod
+    def _sample_result(sample_id: str, sample: Sample) -> Dict:
+        """Fields every approximate result carries"""
+        return {
+            "mode": "approximate",
+            "confidence": round(math.erf(SAMPLING_CONFIG["z"] / math.sqrt(2)), 4),
+            "sampled": sample.coverage(),
+            "sample_id": sample_id,
+        }
 
+    @METRICS.timed("analyzer.read_logs")
     def read_logs(
         self,
         filter_text: Optional[str] = None,
         lines: int = 100,
         file_limit: int = 5,
-        page: int = 1
+        page: int = 1,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        regex: bool = False,
+        cursor: Optional[str] = None,
+        page_size: int = READ_CONFIG["page_size"]
     ) -> Dict:
-        """Read and optionally filter logs"""
+        """Read and optionally filter logs, merged across files in timestamp order.
+
+        Pass the returned next_cursor to read the following page; it resumes
+        where this page stopped instead of reading earlier pages again.
+
+        total_found is known without a filter (lines > 0 bounds each file)
+        and on the last page; otherwise it is None and has_more tells
+        whether another page follows.
+        """
         try:
-            log_files = self.file_handler.get_log_files(self.directory, file_limit)
+            window = TimeRange.parse(since, until)
+            log_files = self._log_files(file_limit)
             
             if not log_files:
                 return {"error": "No log files found"}
             
-            all_lines = []
-            for log_file in log_files:
-                file_lines = self.file_handler.read_file(str(log_file), lines)
-                all_lines.extend(file_lines)
-            
-            # Filter if specified
+            matches = None
+            literals = None
             if filter_text:
-                filter_text = filter_text.upper()
-                all_lines = [line for line in all_lines if filter_text in line.upper()]
+                if regex:
+                    matches = re.compile(filter_text, re.IGNORECASE).search
+                    literals = required_literals(filter_text)
+                else:
+                    needle = filter_text.upper()
+                    matches = lambda line: needle in line.upper()
+                    literals = [needle]
             
-            # Pagination
-            page_size = 50
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            paginated_lines = all_lines[start_idx:end_idx]
+            query_key = self.merger.query_key(self.directory, filter_text, regex, lines, since, until)
+            if cursor:
+                positions, state = self.merger.decode_cursor(cursor, query_key, log_files)
+                page, taken, total = state["page"], state["taken"], state["total"]
+                skip = 0
+            else:
+                # Last `lines` lines of each file; pages before `page` are skipped
+                positions, selected = self.merger.start(log_files, lines, window)
+                total = None if filter_text else selected
+                skip = (page - 1) * page_size
+            records, positions, skipped = self.merger.read(positions, page_size, window, matches, literals, skip)
+            if not cursor:
+                taken = skipped
+            taken += len(records)
+            if not positions:
+                total = taken
             
             return {
                 "status": "success",
-                "total_found": len(all_lines),
                 "page": page,
-                "lines": [line.strip() for line in paginated_lines],
+                "count": len(records),
+                "total_found": total,
+                "has_more": bool(positions),
+                "lines": [record.line.strip() for record in records],
+                "next_cursor": self.merger.encode_cursor(query_key, positions, page + 1, taken, total),
                 "files_read": [f.name for f in log_files],
-                "filter_applied": filter_text or "None"
+                "filter_applied": filter_text.upper() if filter_text else "None"
             }
         except Exception as e:
             return {"error": str(e)}
 
-    def count_log_types(self, log_level: Optional[str] = None) -> Dict:
-        """Count logs by severity level"""
+    @METRICS.timed("analyzer.count_log_types")
+    def count_log_types(
+        self,
+        log_level: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        file_limit: Optional[int] = None,
+        mode: str = "exact",
+        budget_seconds: Optional[float] = None,
+        budget_bytes: Optional[int] = None,
+        sample_id: Optional[str] = None
+    ) -> Dict:
+        """Count logs by severity level.
+
+        mode="approximate" estimates from sampled blocks within the budget;
+        pass the returned sample_id to refine the same estimate.
+        """
         try:
-            log_files = self.file_handler.get_log_files(self.directory)
-            all_lines = []
-            
-            for log_file in log_files:
-                all_lines.extend(self.file_handler.read_all_lines(str(log_file)))
-            
-            level_counts = self.stats_analyzer.analyze_log_levels(all_lines)
+            if mode not in ("exact", "approximate"):
+                return {"error": "Invalid mode"}
+            if mode == "approximate" or sample_id:
+                if since or until:
+                    return {"error": "since/until are not supported in approximate mode"}
+                return self._approximate_counts(log_level, file_limit, budget_seconds, budget_bytes, sample_id)
+
+            window = TimeRange.parse(since, until)
+            log_files = self._log_files(file_limit)
+            if window:
+                summary = self._summarize(log_files, ("levels", "line_stats"), window)
+                level_counts, total_logs = summary.levels.result(), summary.line_stats.total_lines
+            else:
+                level_counts, total_logs = self._count_levels(log_files)
             
             if log_level:
-                log_level = log_level.upper()
+                log_level = normalize_level(log_level) or log_level.upper()
                 return {
                     "status": "success",
                     "level": log_level,
                     "count": level_counts.get(log_level, 0),
-                    "total_logs": len(all_lines)
+                    "total_logs": total_logs
                 }
             
             total = sum(level_counts.values()) or 1
             return {
                 "status": "success",
                 "counts": level_counts,
-                "total_logs": len(all_lines),
+                "total_logs": total_logs,
                 "percentages": {
                     level: round((count / total) * 100, 2) 
                     for level, count in level_counts.items()
@@ -86,16 +270,120 @@ class LogAnalyzer:
         except Exception as e:
             return {"error": str(e)}
 
-    def generate_statistics(self, stats_type: str = "summary") -> Dict:
-        """Generate comprehensive statistics"""
+    def _approximate_counts(
+        self,
+        log_level: Optional[str],
+        file_limit: Optional[int],
+        budget_seconds: Optional[float],
+        budget_bytes: Optional[int],
+        sample_id: Optional[str]
+    ) -> Dict:
+        """count_log_types estimated from a sample, with confidence intervals"""
+        sample_id, sample = self._sample(file_limit, budget_seconds, budget_bytes, sample_id)
+        total_logs, total_interval = sample.total("lines")
+
+        if log_level:
+            log_level = normalize_level(log_level) or log_level.upper()
+            if log_level not in LOG_LEVELS:
+                return {"error": f"Invalid log level: {log_level}"}
+            count, interval = sample.total(log_level)
+            return {
+                "status": "success",
+                "level": log_level,
+                "count": round(count),
+                "total_logs": round(total_logs),
+                "intervals": {"count": _rounded(interval), "total_logs": _rounded(total_interval)},
+                **self._sample_result(sample_id, sample)
+            }
+
+        counts, count_intervals, percentages, percentage_intervals = {}, {}, {}, {}
+        for level in LOG_LEVELS:
+            count, interval = sample.total(level)
+            counts[level], count_intervals[level] = round(count), _rounded(interval)
+            share, interval = sample.ratio([level], LOG_LEVELS, upper=1.0)
+            percentages[level] = round((share or 0) * 100, 2)
+            percentage_intervals[level] = _rounded(interval, 2, 100)
+        return {
+            "status": "success",
+            "counts": counts,
+            "total_logs": round(total_logs),
+            "percentages": percentages,
+            "intervals": {
+                "counts": count_intervals,
+                "total_logs": _rounded(total_interval),
+                "percentages": percentage_intervals,
+            },
+            **self._sample_result(sample_id, sample)
+        }
+
+    def _approximate_statistics(
+        self,
+        file_limit: Optional[int],
+        budget_seconds: Optional[float],
+        budget_bytes: Optional[int],
+        sample_id: Optional[str]
+    ) -> Dict:
+        """Summary statistics estimated from a sample, with confidence intervals.
+
+        min_length and max_length are the extremes seen in the sample.
+        """
+        sample_id, sample = self._sample(file_limit, budget_seconds, budget_bytes, sample_id)
+        total_lines, total_interval = sample.total("lines")
+        non_empty, non_empty_interval = sample.total("non_empty_lines")
+        avg_length, avg_interval = sample.ratio(["length_total"], ["lines"])
+        if not total_lines:
+            return {"error": "No logs found"}
+        return {
+            "status": "success",
+            "type": "summary",
+            "statistics": {
+                "total_lines": round(total_lines),
+                "min_length": sample.min_length,
+                "max_length": sample.max_length,
+                "avg_length": avg_length,
+                "non_empty_lines": round(non_empty),
+            },
+            "intervals": {
+                "total_lines": _rounded(total_interval),
+                "avg_length": _rounded(avg_interval, 2),
+                "non_empty_lines": _rounded(non_empty_interval),
+            },
+            **self._sample_result(sample_id, sample)
+        }
+
+    @METRICS.timed("analyzer.generate_statistics")
+    def generate_statistics(
+        self,
+        stats_type: str = "summary",
+        file_limit: Optional[int] = None,
+        mode: str = "exact",
+        budget_seconds: Optional[float] = None,
+        budget_bytes: Optional[int] = None,
+        sample_id: Optional[str] = None
+    ) -> Dict:
+        """Generate comprehensive statistics.
+
+        mode="approximate" (summary only) estimates from sampled blocks
+        within the budget; pass the returned sample_id to refine it.
+        """
         try:
-            log_files = self.file_handler.get_log_files(self.directory)
-            all_lines = []
-            
-            for log_file in log_files:
-                all_lines.extend(self.file_handler.read_all_lines(str(log_file)))
-            
-            stats = self.stats_analyzer.get_statistics(all_lines)
+            if stats_type not in ("summary", "detailed", "anomalies"):
+                return {"error": "Invalid stats type"}
+            if mode not in ("exact", "approximate"):
+                return {"error": "Invalid mode"}
+            if mode == "approximate" or sample_id:
+                if stats_type != "summary":
+                    return {"error": "Approximate mode supports the summary stats type only"}
+                return self._approximate_statistics(file_limit, budget_seconds, budget_bytes, sample_id)
+
+            log_files = self._log_files(file_limit)
+
+            summary = self._summarize(log_files, {
+                "summary": ("line_stats",),
+                "detailed": ("line_stats", "templates", "sketch"),
+                "anomalies": ("line_stats", "timeline"),
+            }[stats_type])
+            stats = summary.line_stats.result()
             
             if stats_type == "summary":
                 return {
@@ -104,71 +392,99 @@ class LogAnalyzer:
                     "statistics": stats
                 }
             elif stats_type == "detailed":
-                patterns = self.stats_analyzer.find_common_patterns(all_lines)
-                rare = self.stats_analyzer.find_rare_logs(all_lines)
                 return {
                     "status": "success",
                     "type": "detailed",
                     "statistics": stats,
-                    "common_patterns": patterns,
-                    "rare_logs": rare
+                    "common_patterns": summary.templates.result(),
+                    "top_error_templates": summary.templates.templates(),
+                    "template_lines_dropped": summary.templates.dropped,
+                    "heavy_hitters": summary.sketch.heavy_hitters(),
+                    "rare_logs": summary.sketch.rare()
                 }
-            elif stats_type == "anomalies":
-                spike = self.stats_analyzer.detect_spike(all_lines)
+            else:
                 return {
                     "status": "success",
                     "type": "anomalies",
-                    "spike_detection": spike
+                    "spike_detection": summary.timeline.result("spike")
                 }
-            else:
-                return {"error": "Invalid stats type"}
         except Exception as e:
             return {"error": str(e)}
 
+    @METRICS.timed("analyzer.extract_critical_logs")
     def extract_critical_logs(
         self,
         severity: str = "CRITICAL",
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        split_by_severity: bool = False,
+        file_limit: Optional[int] = None
     ) -> Dict:
-        """Extract critical/error logs to separate file"""
+        """Extract critical/error logs to separate file(s)"""
         try:
-            log_files = self.file_handler.get_log_files(self.directory)
-            all_lines = []
+            window = TimeRange.parse(since, until)
+            log_files = self._log_files(file_limit)
             
-            for log_file in log_files:
-                all_lines.extend(self.file_handler.read_all_lines(str(log_file)))
+            # One or more severities, comma-separated or as a list
+            levels = []
+            for token in parse_list(severity):
+                level = normalize_level(token)
+                if level is None:
+                    return {"error": f"Invalid severity: {token}"}
+                levels.append(level)
+            if not levels:
+                return {"error": f"Invalid severity: {severity}"}
+            wanted = set(levels)
+            keywords = parse_list(keywords)
+            matcher = KeywordMatcher(keywords) if keywords else None
+            if matcher is None:
+                predicate = lambda record: record.level in wanted
+            else:
+                predicate = lambda record: record.level in wanted and matcher.matches(record.line)
             
-            severity = severity.upper()
-            critical_lines = [line for line in all_lines if severity in line]
+            matched = LineSample(limit=EXTRACT_CONFIG["sample_lines"])  # First few
+            by_level = LevelCounter()
+            aggregators = [matched, by_level] + ([matcher] if matcher else [])
+            critical_records = self.scanner.tap(
+                self.scanner.filter(self.scanner.records_with_levels(log_files, wanted, window), predicate),
+                *aggregators
+            )
             
-            # Save to file if output path provided
+            # Stream matches straight to file(s) if output path provided
             saved_path = None
             if output_path:
-                self.file_handler.write_file(output_path, critical_lines)
-                saved_path = output_path
+                with LineWriter(output_path, split=split_by_severity) as writer:
+                    for record in critical_records:
+                        writer.write(record.line, record.level)
+                saved_path = writer.paths if split_by_severity else output_path
+            else:
+                self.scanner.aggregate(critical_records)
             
-            return {
+            result = {
                 "status": "success",
-                "severity": severity,
-                "count": len(critical_lines),
-                "logs": [line.strip() for line in critical_lines[:20]],  # First 20
+                "severity": ",".join(levels),
+                "count": matched.count,
+                "counts_by_severity": {level: by_level.counts[level] for level in levels},
+                "logs": matched.result(),
                 "saved_to": saved_path,
-                "total_found": len(critical_lines)
+                "total_found": matched.count
             }
+            if matcher:
+                result["keyword_hits"] = matcher.result()
+            return result
         except Exception as e:
             return {"error": str(e)}
 
-    def detect_anomalies(self, anomaly_type: str = "spike") -> Dict:
+    @METRICS.timed("analyzer.detect_anomalies")
+    def detect_anomalies(self, anomaly_type: str = "spike", file_limit: Optional[int] = None) -> Dict:
         """Detect anomalies in logs"""
         try:
-            log_files = self.file_handler.get_log_files(self.directory)
-            all_lines = []
-            
-            for log_file in log_files:
-                all_lines.extend(self.file_handler.read_all_lines(str(log_file)))
+            log_files = self._log_files(file_limit)
             
-            if anomaly_type == "spike":
-                result = self.stats_analyzer.detect_spike(all_lines)
+            if anomaly_type in ANOMALY_TYPES:
+                result = self._summarize(log_files, ("timeline",)).timeline.result(anomaly_type)
             else:
                 result = {"error": "Invalid anomaly type"}
             
@@ -176,44 +492,182 @@ class LogAnalyzer:
         except Exception as e:
             return {"error": str(e)}
 
+    @METRICS.timed("analyzer.start_follow")
+    def start_follow(
+        self,
+        poll_interval: float = FOLLOW_CONFIG["poll_interval"],
+        from_start: bool = False,
+        file_limit: int = 5
+    ) -> Dict:
+        """Start following log files for live sliding-window counts"""
+        try:
+            watch_id = FOLLOWS.start(
+                self.directory,
+                file_limit=file_limit,
+                poll_interval=poll_interval,
+                from_start=from_start
+            )
+            return {
+                "status": "success",
+                "watch_id": watch_id,
+                "directory": self.directory,
+                "poll_interval": poll_interval,
+                "windows": [f"{window}s" for window in FOLLOW_CONFIG["windows"]]
+            }
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    @METRICS.timed("analyzer.read_follow")
+    def read_follow(watch_id: str, top_n: int = FOLLOW_CONFIG["top_templates"]) -> Dict:
+        """Current sliding-window counts of a follow session"""
+        try:
+            session = FOLLOWS.get(watch_id)
+            if session is None:
+                return {"error": f"Unknown watch id: {watch_id}"}
+            return {"status": "success", "watch_id": watch_id, **session.result(top_n)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    @METRICS.timed("analyzer.stop_follow")
+    def stop_follow(watch_id: str) -> Dict:
+        """Stop a follow session"""
+        try:
+            if not FOLLOWS.stop(watch_id):
+                return {"error": f"Unknown watch id: {watch_id}"}
+            return {"status": "success", "watch_id": watch_id, "stopped": True}
+        except Exception as e:
+            return {"error": str(e)}
+
+    @METRICS.timed("analyzer.generate_report")
     def generate_report(
         self,
         report_type: str = "summary",
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        file_limit: Optional[int] = None
     ) -> Dict:
         """Generate analysis report"""
         try:
-            log_files = self.file_handler.get_log_files(self.directory)
-            all_lines = []
-            
-            for log_file in log_files:
-                all_lines.extend(self.file_handler.read_all_lines(str(log_file)))
-            
-            log_levels = self.stats_analyzer.analyze_log_levels(all_lines)
+            log_files = self._log_files(file_limit)
+            if report_type not in ("summary", "html"):
+                return {"error": "Invalid report type"}
+            # One pass fills every part the report renders
+            parts = ("levels", "line_stats", "templates") + (("timeline",) if report_type == "html" else ())
+            summary = self._summarize(log_files, parts)
+            log_levels = summary.levels.result()
             
             if report_type == "summary":
-                report = ReportGenerator.generate_summary_report(
-                    self.directory, all_lines, log_levels
-                )
-            elif report_type == "html":
-                report = ReportGenerator.generate_html_report(
-                    self.directory, all_lines, log_levels
+                lines = ReportGenerator.iter_summary_report(
+                    self.directory, summary.line_stats.result(), log_levels,
+                    summary.templates.templates(), summary.templates.dropped
                 )
             else:
-                return {"error": "Invalid report type"}
+                lines = ReportGenerator.iter_html_report(
+                    self.directory, summary.line_stats.result(), log_levels,
+                    summary.timeline, summary.templates.templates(REPORT_CONFIG["top_templates"]),
+                    dropped=summary.templates.dropped
+                )
             
-            # Save report if output path provided
-            saved_path = None
-            if output_path:
-                with open(output_path, 'w') as f:
-                    f.write(report)
-                saved_path = output_path
+            # Streamed to output_path if given; only the preview is kept
+            preview = ReportGenerator.write(lines, output_path)
             
             return {
                 "status": "success",
                 "report_type": report_type,
-                "saved_to": saved_path,
-                "report_preview": report[:500] + "..." if len(report) > 500 else report
+                "saved_to": output_path or None,
+                "report_preview": preview
+            }
+        except Exception as e:
+            return {"error": str(e)}
+
+    @METRICS.timed("analyzer.ingest")
+    def ingest(self, file_limit: Optional[int] = None, force: bool = False) -> Dict:
+        """Parse log files into the columnar store for fast repeated aggregates"""
+        try:
+            log_files = self._log_files(file_limit)
+            files = self.columns.ingest(log_files, force=force)
+            return {
+                "status": "success",
+                "directory": self.directory,
+                "ingested": sum(1 for info in files if "skipped" not in info),
+                "up_to_date": sum(1 for info in files if "skipped" in info),
+                "files": files,
+            }
+        except Exception as e:
+            return {"error": str(e)}
+
+    def warm(
+        self,
+        progress: WarmupProgress,
+        file_limit: Optional[int] = WARMUP_CONFIG["file_limit"],
+        ingest: bool = WARMUP_CONFIG["ingest"]
+    ) -> None:
+        """Summarize every file, and ingest it if asked, so later calls start warm"""
+        log_files = self._log_files(file_limit)
+        sizes = [os.path.getsize(log_file) for log_file in log_files]
+        progress.begin([str(Path(log_file).resolve()) for log_file in log_files], sum(sizes))
+
+        def warm_file(item: Tuple[Path, int]) -> None:
+            log_file, size = item
+            if ingest:
+                self.columns.ingest([log_file])
+            self._file_summary(log_file, PARTS, None)
+            progress.advance(size)
+
+        self.scanner.map_files(warm_file, list(zip(log_files, sizes)))
+
+    @staticmethod
+    def _is_warm(file_path: str) -> bool:
+        """True if the file is cached or ingested and unchanged since"""
+        try:
+            return ANALYSIS_CACHE.contains(file_path) or COLUMN_STORE.columns(file_path, count=False) is not None
+        except OSError:
+            return False
+
+    @staticmethod
+    def warmup_status(directory: Optional[str] = None) -> Dict:
+        """Warm-up progress of the configured directories and whether they are still warm"""
+        try:
+            if directory is None:
+                entries = WARMUP.list()
+            else:
+                progress = WARMUP.get(directory)
+                if progress is None:
+                    return {"error": f"Not a warm-up directory: {directory}"}
+                entries = [progress]
+            directories = []
+            for progress in entries:
+                status = progress.to_dict()
+                status["files_warm"] = sum(1 for path in progress.files if LogAnalyzer._is_warm(path))
+                # Files changed since warm-up are rescanned from their checkpoints
+                status["warm"] = status["state"] == "done" and status["files_warm"] == status["files"]
+                directories.append(status)
+            return {"status": "success", "directories": directories}
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def server_metrics(reset: bool = False, enabled: Optional[bool] = None) -> Dict:
+        """Per-stage timings and cache effectiveness since start or last reset"""
+        try:
+            if enabled is not None:
+                METRICS.enabled = enabled
+            result = {
+                "status": "success",
+                **METRICS.result(),
+                "caches": {
+                    "analysis": ANALYSIS_CACHE.stats(),
+                    "checkpoints": CHECKPOINTS.stats(),
+                    "discovery": DISCOVERY.stats(),
+                    "columnar": COLUMN_STORE.stats(),
+                    "trigram": TRIGRAM_INDEX.stats(),
+                    "samples": SAMPLES.stats(),
+                },
+                "follow_sessions": len(FOLLOWS.list()),
             }
+            if reset:
+                METRICS.reset()
+            return result
         except Exception as e:
             return {"error": str(e)}
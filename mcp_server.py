@@ -1,40 +1,117 @@
-"""FastMCP Server for Log Analysis"""
+"""FastMCP Server for Log Analysis
+
+The analysis stack (NumPy, scanners, process pools) is imported on first
+use rather than at startup, so the server answers the MCP handshake
+quickly; directories listed in WARMUP_CONFIG["paths"] are summarized in
+the background once it is up.
+"""
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
-from log_analyzer import LogAnalyzer
-from config import DEFAULT_LOG_DIR
-from typing import Optional
+from utils.executor import TOOL_EXECUTOR
+from utils.warmup import WARMUP, WarmupProgress
+from config import DEFAULT_LOG_DIR, FOLLOW_CONFIG, READ_CONFIG, WARMUP_CONFIG
+from pathlib import Path
+from typing import List, Optional
+
+def _analyzer_type():
+    """LogAnalyzer, imported on first use"""
+    from log_analyzer import LogAnalyzer
+    return LogAnalyzer
+
+def _analyzer(*args):
+    # Called inside the callables handed to TOOL_EXECUTOR, so the import and
+    # the analyzer's setup run on a worker thread rather than the event loop
+    return _analyzer_type()(*args)
+
+def _warm(directory: str, progress: WarmupProgress) -> None:
+    _analyzer(directory, WARMUP_CONFIG["recursive"]).warm(progress)
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Start warming the configured directories once the server is up"""
+    WARMUP.start(WARMUP_CONFIG["paths"], _warm)
+    yield {}
 
 # Initialize FastMCP server
-mcp = FastMCP("log-analyzer")
+mcp = FastMCP("log-analyzer", lifespan=_lifespan)
+
+def _path_key(customPath: str) -> str:
+    """Identical requests for the same directory share one run"""
+    return str(Path(customPath).resolve())
+
+def _discovery_key(recursive: Optional[bool], include: Optional[List[str]], exclude: Optional[List[str]]) -> tuple:
+    """Hashable form of the file discovery options"""
+    return (recursive, include and tuple(include), exclude and tuple(exclude))
 
 @mcp.tool()
-def read_logs(
+async def read_logs(
     customPath: str = DEFAULT_LOG_DIR,
     filter: Optional[str] = None,
     lines: int = 100,
     fileLimit: int = 5,
-    page: int = 1
+    page: int = 1,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    regex: bool = False,
+    cursor: Optional[str] = None,
+    pageSize: int = READ_CONFIG["page_size"],
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    profile: bool = False
 ) -> dict:
     """
     Read logs from a directory with optional filtering and pagination.
+    Lines of all files are merged in timestamp order.
     
     Args:
         customPath: Path to log directory
         filter: Text to filter logs (case-insensitive)
-        lines: Number of lines to read
-        fileLimit: Max number of files to read
-        page: Page number for pagination
+        lines: Number of lines to read from the end of each file
+        fileLimit: Max number of files to read (newest first)
+        page: Page number for pagination (earlier pages are read and skipped)
+        since: Only lines at or after this ISO timestamp (e.g. 2026-01-03 10:00)
+        until: Only lines at or before this ISO timestamp
+        regex: Treat filter as a case-insensitive regular expression
+        cursor: next_cursor of the previous page, to continue where it stopped
+        pageSize: Lines per page
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
-        Dictionary with log entries and metadata
+        Dictionary with log entries, page, count, total_found, has_more and
+        next_cursor (None after the last page). total_found is the number of
+        lines matching the query; it is null before the last page when a
+        filter is given or lines <= 0, since counting would then read every
+        file to the end. has_more tells whether another page follows.
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.read_logs(filter, lines, fileLimit, page)
+    return await TOOL_EXECUTOR.run(
+        "read_logs",
+        lambda: _analyzer(customPath, recursive, include, exclude).read_logs(
+            filter, lines, fileLimit, page, since, until, regex, cursor, pageSize
+        ),
+        key=(_path_key(customPath), filter, lines, fileLimit, page, since, until, regex, cursor, pageSize,
+             _discovery_key(recursive, include, exclude)),
+        profile=profile
+    )
 
 @mcp.tool()
-def count_log_types(
+async def count_log_types(
     customPath: str = DEFAULT_LOG_DIR,
-    logLevel: Optional[str] = None
+    logLevel: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fileLimit: Optional[int] = None,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    mode: str = "exact",
+    budgetSeconds: Optional[float] = None,
+    budgetBytes: Optional[int] = None,
+    sampleId: Optional[str] = None,
+    profile: bool = False
 ) -> dict:
     """
     Count logs by severity level.
@@ -42,17 +119,44 @@ def count_log_types(
     Args:
         customPath: Path to log directory
         logLevel: Specific level to count (CRITICAL, ERROR, WARNING, INFO, DEBUG)
+        since: Only count lines at or after this ISO timestamp
+        until: Only count lines at or before this ISO timestamp
+        fileLimit: Only the newest N files (default: all files)
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        mode: 'exact', or 'approximate' to estimate from sampled blocks with confidence intervals (archives are read whole)
+        budgetSeconds: Approximate mode: seconds of reading (default 2 when no budget is given)
+        budgetBytes: Approximate mode: bytes to read
+        sampleId: Continue the sample of an earlier approximate call to narrow its intervals
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
         Dictionary with counts and percentages
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.count_log_types(logLevel)
+    return await TOOL_EXECUTOR.run(
+        "count_log_types",
+        lambda: _analyzer(customPath, recursive, include, exclude).count_log_types(
+            logLevel, since, until, fileLimit, mode, budgetSeconds, budgetBytes, sampleId
+        ),
+        key=(_path_key(customPath), logLevel, since, until, fileLimit,
+             _discovery_key(recursive, include, exclude), mode, budgetSeconds, budgetBytes, sampleId),
+        profile=profile
+    )
 
 @mcp.tool()
-def generate_statistics(
+async def generate_statistics(
     customPath: str = DEFAULT_LOG_DIR,
-    statsType: str = "summary"
+    statsType: str = "summary",
+    fileLimit: Optional[int] = None,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    mode: str = "exact",
+    budgetSeconds: Optional[float] = None,
+    budgetBytes: Optional[int] = None,
+    sampleId: Optional[str] = None,
+    profile: bool = False
 ) -> dict:
     """
     Generate log statistics.
@@ -60,37 +164,84 @@ def generate_statistics(
     Args:
         customPath: Path to log directory
         statsType: 'summary', 'detailed', or 'anomalies'
+        fileLimit: Only the newest N files (default: all files)
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        mode: 'exact', or 'approximate' (summary only) to estimate from sampled blocks (archives are read whole)
+        budgetSeconds: Approximate mode: seconds of reading (default 2 when no budget is given)
+        budgetBytes: Approximate mode: bytes to read
+        sampleId: Continue the sample of an earlier approximate call to narrow its intervals
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
         Dictionary with statistical analysis
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.generate_statistics(statsType)
+    return await TOOL_EXECUTOR.run(
+        "generate_statistics",
+        lambda: _analyzer(customPath, recursive, include, exclude).generate_statistics(
+            statsType, fileLimit, mode, budgetSeconds, budgetBytes, sampleId
+        ),
+        key=(_path_key(customPath), statsType, fileLimit, _discovery_key(recursive, include, exclude),
+             mode, budgetSeconds, budgetBytes, sampleId),
+        profile=profile
+    )
 
 @mcp.tool()
-def extract_critical_logs(
+async def extract_critical_logs(
     customPath: str = DEFAULT_LOG_DIR,
     severity: str = "CRITICAL",
-    outputPath: Optional[str] = None
+    outputPath: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    splitBySeverity: bool = False,
+    fileLimit: Optional[int] = None,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    profile: bool = False
 ) -> dict:
     """
     Extract critical/error logs to a separate file.
     
     Args:
         customPath: Path to log directory
-        severity: Log level to extract (CRITICAL, ERROR, WARNING)
+        severity: Log level(s) to extract, comma-separated (e.g. "ERROR,CRITICAL")
         outputPath: Where to save extracted logs
+        since: Only extract lines at or after this ISO timestamp
+        until: Only extract lines at or before this ISO timestamp
+        keywords: Only extract lines containing any of these (case-insensitive)
+        splitBySeverity: Write one file per level (e.g. out.ERROR.log)
+        fileLimit: Only the newest N files (default: all files)
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
         Dictionary with extracted log information
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.extract_critical_logs(severity, outputPath)
+    return await TOOL_EXECUTOR.run(
+        "extract_critical_logs",
+        lambda: _analyzer(customPath, recursive, include, exclude).extract_critical_logs(
+            severity, outputPath, since, until, keywords, splitBySeverity, fileLimit
+        ),
+        key=(_path_key(customPath), severity, outputPath, since, until,
+             tuple(keywords or ()), splitBySeverity, fileLimit,
+             _discovery_key(recursive, include, exclude)),
+        profile=profile
+    )
 
 @mcp.tool()
-def detect_anomalies(
+async def detect_anomalies(
     customPath: str = DEFAULT_LOG_DIR,
-    anomalyType: str = "spike"
+    anomalyType: str = "spike",
+    fileLimit: Optional[int] = None,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    profile: bool = False
 ) -> dict:
     """
     Detect anomalies in logs.
@@ -98,18 +249,32 @@ def detect_anomalies(
     Args:
         customPath: Path to log directory
         anomalyType: Type of anomaly detection ('spike', 'pattern', 'missing')
+        fileLimit: Only the newest N files (default: all files)
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
         Dictionary with detected anomalies
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.detect_anomalies(anomalyType)
+    return await TOOL_EXECUTOR.run(
+        "detect_anomalies",
+        lambda: _analyzer(customPath, recursive, include, exclude).detect_anomalies(anomalyType, fileLimit),
+        key=(_path_key(customPath), anomalyType, fileLimit, _discovery_key(recursive, include, exclude)),
+        profile=profile
+    )
 
 @mcp.tool()
-def generate_report(
+async def generate_report(
     customPath: str = DEFAULT_LOG_DIR,
     reportType: str = "summary",
-    outputPath: Optional[str] = None
+    outputPath: Optional[str] = None,
+    fileLimit: Optional[int] = None,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    profile: bool = False
 ) -> dict:
     """
     Generate comprehensive log analysis report.
@@ -118,15 +283,147 @@ def generate_report(
         customPath: Path to log directory
         reportType: 'summary', 'detailed', or 'html'
         outputPath: Where to save the report
+        fileLimit: Only the newest N files (default: all files)
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+        profile: Run under a profiler and add the hottest functions as 'profile'
     
     Returns:
         Dictionary with report information and preview
     """
-    analyzer = LogAnalyzer(customPath)
-    return analyzer.generate_report(reportType, outputPath)
+    return await TOOL_EXECUTOR.run(
+        "generate_report",
+        lambda: _analyzer(customPath, recursive, include, exclude).generate_report(
+            reportType, outputPath, fileLimit
+        ),
+        key=(_path_key(customPath), reportType, outputPath, fileLimit,
+             _discovery_key(recursive, include, exclude)),
+        profile=profile
+    )
+
+@mcp.tool()
+async def ingest_logs(
+    customPath: str = DEFAULT_LOG_DIR,
+    fileLimit: Optional[int] = None,
+    force: bool = False,
+    recursive: Optional[bool] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None
+) -> dict:
+    """
+    Parse log files once into a columnar store so that count_log_types,
+    generate_statistics, detect_anomalies and generate_report answer from
+    it instead of re-reading the text. Files changed since are read as text
+    until ingested again.
+    
+    Args:
+        customPath: Path to log directory
+        fileLimit: Only the newest N files (default: all files)
+        force: Re-ingest files that are already up to date
+        recursive: Also search subdirectories
+        include: Globs of files to analyze instead of *.log / *.txt and their rotations
+        exclude: Globs of files or subdirectories to skip
+    
+    Returns:
+        Dictionary with rows, templates and bytes stored per file
+    """
+    return await TOOL_EXECUTOR.run(
+        "ingest_logs",
+        lambda: _analyzer(customPath, recursive, include, exclude).ingest(fileLimit, force),
+        key=(_path_key(customPath), fileLimit, force, _discovery_key(recursive, include, exclude))
+    )
+
+@mcp.tool()
+async def start_follow(
+    customPath: str = DEFAULT_LOG_DIR,
+    pollInterval: float = FOLLOW_CONFIG["poll_interval"],
+    fromStart: bool = False,
+    fileLimit: int = 5
+) -> dict:
+    """
+    Start following log files for live per-level and per-template counts.
+    
+    Args:
+        customPath: Path to log directory
+        pollInterval: Seconds between checks for new lines
+        fromStart: Count existing lines too instead of only new ones
+        fileLimit: Max number of files to follow (newest first)
+    
+    Returns:
+        Dictionary with the watch id to pass to read_follow and stop_follow
+    """
+    return await TOOL_EXECUTOR.run(
+        "start_follow",
+        lambda: _analyzer(customPath).start_follow(pollInterval, fromStart, fileLimit)
+    )
+
+@mcp.tool()
+async def read_follow(
+    watchId: str,
+    topN: int = FOLLOW_CONFIG["top_templates"]
+) -> dict:
+    """
+    Read the current sliding-window counts of a follow session.
+    
+    Args:
+        watchId: Id returned by start_follow
+        topN: Number of top error templates per window
+    
+    Returns:
+        Dictionary with level counts and top templates per window
+    """
+    return await TOOL_EXECUTOR.run(
+        "read_follow", lambda: _analyzer_type().read_follow(watchId, topN), key=(watchId, topN)
+    )
+
+@mcp.tool()
+async def stop_follow(watchId: str) -> dict:
+    """
+    Stop a follow session.
+    
+    Args:
+        watchId: Id returned by start_follow
+    
+    Returns:
+        Dictionary confirming the session was stopped
+    """
+    return await TOOL_EXECUTOR.run("stop_follow", lambda: _analyzer_type().stop_follow(watchId))
+
+@mcp.tool()
+async def server_metrics(reset: bool = False, enabled: Optional[bool] = None) -> dict:
+    """
+    Show where the server spends its time: per-stage timings, bytes and
+    lines processed, cache hit rates and tool executor counters.
+    
+    Args:
+        reset: Clear the stage timings after reading them
+        enabled: Turn stage recording on or off
+    
+    Returns:
+        Dictionary with stages, caches and executor statistics
+    """
+    result = await TOOL_EXECUTOR.run("server_metrics", lambda: _analyzer_type().server_metrics(reset, enabled))
+    if "error" not in result:
+        result["executor"] = TOOL_EXECUTOR.stats()
+    return result
+
+@mcp.tool()
+async def warmup_status(customPath: Optional[str] = None) -> dict:
+    """
+    Show the background warm-up of the directories configured in
+    WARMUP_CONFIG: progress, and whether each is still warm (every file
+    cached or ingested and unchanged since).
+    
+    Args:
+        customPath: Only this directory (default: all configured directories)
+    
+    Returns:
+        Dictionary with state, files and bytes done, and warm per directory
+    """
+    return await TOOL_EXECUTOR.run("warmup_status", lambda: _analyzer_type().warmup_status(customPath))
 
 if __name__ == "__main__":
-    import uvicorn
     # Run server with: python mcp_server.py
     # Or use: mcp run mcp_server:mcp
     print("Log Analyzer MCP Server starting...")
@@ -0,0 +1,44 @@
+"""Anomaly detection over timelines with far-apart timestamps"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from log_analyzer import LogAnalyzer
+from utils.anomaly import AnomalyDetector
+from utils.statistics import Timeline
+
+
+class SparseTimelineTest(unittest.TestCase):
+    def test_stray_timestamp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, True)
+        (directory / "app.log").write_text(
+            "1900-01-01 00:00:00 ERROR clock not set\n"
+            "2026-01-03 10:00:00 ERROR disk full\n"
+            "2026-01-03 10:00:01 ERROR disk full\n"
+        )
+        analyzer = LogAnalyzer(str(directory))
+        gaps = analyzer.detect_anomalies("missing")["anomalies"]
+        self.assertEqual(gaps["gaps_detected"], 1)
+        self.assertEqual(gaps["gaps"][0]["start"], "1900-01-01 00:01:00")
+        self.assertEqual(gaps["gaps"][0]["end"], "2026-01-03 10:00:00")
+        for anomaly_type in ("spike", "pattern"):
+            with self.subTest(anomaly_type=anomaly_type):
+                self.assertNotIn("error", analyzer.detect_anomalies(anomaly_type)["anomalies"])
+
+    def test_spike_after_silence(self):
+        timeline = Timeline(bucket_seconds=60)
+        for bucket in range(10):
+            timeline.lines[bucket] = timeline.errors[bucket] = 1
+        timeline.lines[10**9] = timeline.errors[10**9] = 50
+        result = AnomalyDetector.detect_spikes(timeline)
+        self.assertEqual(result["spikes_detected"], 1)
+        self.assertEqual(result["buckets"], 10**9 + 1)
+        spike = result["spikes"][0]
+        self.assertEqual(spike["peak_errors"], 50)
+        self.assertEqual(spike["baseline_mean"], 0.0)
+        self.assertEqual(spike["ewma"], 15.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
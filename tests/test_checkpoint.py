@@ -0,0 +1,47 @@
+"""Checkpoints held in memory stay within their byte budget"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from utils.checkpoint import CheckpointStore
+from utils.scanner import LogScanner
+from utils.statistics import LogSummary
+
+
+class CheckpointBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.paths = []
+        for i in range(4):
+            path = self.directory / f"app{i}.log"
+            path.write_text("".join(f"2026-01-03 10:00:{s:02d} INFO job {i} step {s} done\n" for s in range(60)))
+            self.paths.append(str(path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_evicts_by_estimated_bytes(self):
+        size = LogSummary().estimated_size()
+        store = CheckpointStore(sidecar_dir=None, max_bytes=int(size * 2.5))
+        scan = LogScanner().scan_range
+        for path in self.paths:
+            store.summarize(path, scan)
+        stats = store.stats()
+        self.assertLessEqual(stats["bytes"], stats["max_bytes"])
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 2)
+        # The evicted file is simply scanned again
+        self.assertFalse(store.resumable(self.paths[0]))
+        self.assertTrue(store.resumable(self.paths[-1]))
+        summary = store.summarize(self.paths[0], scan)
+        self.assertEqual(summary.line_stats.to_dict()["total_lines"], 60)
+
+    def test_oversized_checkpoint_is_not_kept(self):
+        store = CheckpointStore(sidecar_dir=None, max_bytes=1024)
+        store.summarize(self.paths[0], LogScanner().scan_range)
+        self.assertEqual(store.stats()["entries"], 0)
+        self.assertEqual(store.stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Follow sessions across rotation and truncation"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from utils.follow import FollowManager, FollowSession
+
+
+def _append(path: Path, count: int, start: int = 0) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + count):
+            f.write(f"2026-01-03 10:00:{i % 60:02d} ERROR request {i} failed\n")
+
+
+class FollowRotationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.log = self.directory / "app.log"
+        _append(self.log, 4)
+
+    def session(self, **options) -> FollowSession:
+        return FollowSession(str(self.directory), idle_timeout=None, **options)
+
+    def test_rename_rotation_keeps_offset(self):
+        session = self.session()
+        _append(self.log, 2, 4)
+        session.poll()
+        self.assertEqual(session.result()["lines_seen"], 2)
+        # Lines written just before the rename are read from app.log.1
+        _append(self.log, 1, 6)
+        os.rename(self.log, self.directory / "app.log.1")
+        _append(self.log, 3, 7)
+        session.poll()
+        result = session.result()
+        self.assertEqual(result["lines_seen"], 6)
+        self.assertEqual(result["rotations"], 1)
+        self.assertEqual(sorted(result["files"]), ["app.log", "app.log.1"])
+        session.poll()
+        self.assertEqual(session.result()["lines_seen"], 6)
+
+    def test_from_start_reads_existing_lines_once(self):
+        session = self.session(from_start=True)
+        self.assertEqual(session.result()["lines_seen"], 4)
+        os.rename(self.log, self.directory / "app.log.1")
+        session.poll()
+        self.assertEqual(session.result()["lines_seen"], 4)
+
+    def test_truncation_restarts_file(self):
+        session = self.session()
+        with open(self.log, "w", encoding="utf-8"):
+            pass
+        _append(self.log, 2)
+        session.poll()
+        result = session.result()
+        self.assertEqual(result["lines_seen"], 2)
+        self.assertEqual(result["truncations"], 1)
+
+
+class FollowIdleTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        _append(self.directory / "app.log", 1)
+
+    def wait_until(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return condition()
+
+    def test_unread_session_is_reaped(self):
+        manager = FollowManager(idle_timeout=0.3)
+        watch_id = manager.start(str(self.directory), poll_interval=0.05)
+        session = manager.get(watch_id)
+        self.assertIn(watch_id, manager.list())
+        self.assertTrue(self.wait_until(lambda: watch_id not in manager.list()))
+        self.assertIsNone(manager.get(watch_id))
+        session._thread.join(1)
+        self.assertFalse(session._thread.is_alive())
+
+    def test_reads_keep_session_alive(self):
+        manager = FollowManager(idle_timeout=0.5)
+        watch_id = manager.start(str(self.directory), poll_interval=0.05)
+        self.addCleanup(manager.stop, watch_id)
+        session = manager.get(watch_id)
+        _append(self.directory / "app.log", 3, 1)
+        deadline = time.time() + 1.5
+        while time.time() < deadline:
+            session.result()
+            time.sleep(0.1)
+        self.assertIn(watch_id, manager.list())
+        self.assertEqual(session.result()["lines_seen"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Parallel scans of newline-aligned chunks must equal a serial scan"""
+import gzip
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from config import ARCHIVE_CONFIG
+from utils.archive import GZIP_INDEXES
+from utils.parallel import ParallelScanner, shutdown_pools
+from utils.scanner import LogScanner
+from utils.statistics import LevelCounter, LineCounter, LogSummary, Timeline
+
+_WORDS = ["disk", "user", "cache", "queue", "socket", "token", "lease", "shard", "index", "route",
+          "batch", "frame", "quota", "mount", "table", "session", "worker", "buffer", "stream", "lock"]
+_LEVELS = ["INFO"] * 5 + ["DEBUG", "WARNING", "ERROR", "ERROR", "CRITICAL"]
+
+
+def _write_logs(path: Path, lines: int, seed: int) -> None:
+    """Enough distinct messages to overflow the template and pattern caps"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 6)))
+            f.write(
+                f"2026-01-03 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d} "
+                f"{rng.choice(_LEVELS)} {words} failed after {rng.randint(1, 500)} ms\n"
+            )
+
+
+class ParallelScanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = Path(tempfile.mkdtemp())
+        cls.path = str(cls.directory / "app.log")
+        _write_logs(cls.directory / "app.log", 30000, 7)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_pools()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def scan(self, aggregator_type):
+        serial = aggregator_type()
+        LogScanner().scan_range(self.path, 0, None, serial)
+        parallel = aggregator_type()
+        ParallelScanner(chunk_bytes=256 * 1024, min_parallel_bytes=0).scan_range(self.path, 0, None, parallel)
+        return serial, parallel
+
+    def test_summary_matches_serial_scan(self):
+        serial, parallel = self.scan(LogSummary)
+        self.assertGreater(serial.templates.dropped, 0)
+        self.assertGreaterEqual(len(serial.timeline.patterns), serial.timeline.max_patterns)
+        for part in ("levels", "line_stats", "templates", "timeline"):
+            with self.subTest(part=part):
+                self.assertEqual(getattr(parallel, part).to_dict(), getattr(serial, part).to_dict())
+        self.assertEqual(parallel.sketch.cms.to_dict(), serial.sketch.cms.to_dict())
+
+    def test_timeline_matches_serial_scan(self):
+        serial, parallel = self.scan(Timeline)
+        self.assertEqual(parallel.to_dict(), serial.to_dict())
+
+    def test_summary_continues_after_merge(self):
+        # A checkpointed summary scanned further in parallel equals one serial scan
+        cut = 200 * 1024
+        with open(self.path, "rb") as f:
+            f.seek(cut)
+            cut += len(f.readline())
+        serial = LogSummary()
+        LogScanner().scan_range(self.path, 0, None, serial)
+        resumed = LogSummary()
+        LogScanner().scan_range(self.path, 0, cut, resumed)
+        resumed = resumed.copy()
+        ParallelScanner(chunk_bytes=256 * 1024, min_parallel_bytes=0).scan_range(self.path, cut, None, resumed)
+        self.assertEqual(resumed.templates.to_dict(), serial.templates.to_dict())
+
+    def test_archive_scan_keeps_gzip_index(self):
+        archive = str(self.directory / "app.log.1.gz")
+        with open(self.path, "rb") as source, gzip.open(archive, "wb") as target:
+            shutil.copyfileobj(source, target)
+        serial = LogSummary()
+        LogScanner().scan_range(self.path, 0, None, serial)
+        parallel = LogSummary()
+        with mock.patch.dict(ARCHIVE_CONFIG, {"min_parallel_bytes": 0, "piece_bytes": 256 * 1024}):
+            ParallelScanner().scan_range(archive, 0, None, parallel)
+        self.assertEqual(parallel.templates.to_dict(), serial.templates.to_dict())
+        self.assertEqual(parallel.line_stats.to_dict(), serial.line_stats.to_dict())
+        # Decoded here rather than in a worker, so the seek index is ours
+        index = GZIP_INDEXES.get(archive)
+        self.assertIsNotNone(index)
+        self.assertEqual(index.size, Path(self.path).stat().st_size)
+
+
+class ParallelSplitTest(unittest.TestCase):
+    """Chunk boundaries falling on CRLF lines, stack traces and an unterminated last line"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = Path(tempfile.mkdtemp())
+        cls.path = str(cls.directory / "mixed.log")
+        rng = random.Random(11)
+        with open(cls.path, "wb") as f:
+            for i in range(4000):
+                f.write(f"2026-01-03 10:{i // 60 % 60:02d}:{i % 60:02d} {rng.choice(_LEVELS)} job {i}".encode())
+                f.write(b"\r\n" if i % 3 else b"\n")
+                if i % 97 == 0:
+                    f.write(b"Traceback (most recent call last):\n  File \"app.py\", line 3\nValueError: bad\n")
+            f.write(b"2026-01-03 11:00:00 ERROR no newline at the end")
+        cls.size = Path(cls.path).stat().st_size
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_pools()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_split_range_is_newline_aligned(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for chunk_bytes in (1, 4096, 50000):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                ranges = ParallelScanner(chunk_bytes=chunk_bytes).split_range(self.path, 0, self.size)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1], self.size)
+                for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+                    self.assertEqual(stop, start)
+                    self.assertEqual(data[start - 1:start], b"\n")
+
+    def test_level_counts_match_serial_scan(self):
+        levels, lines = LevelCounter(), LineCounter()
+        LogScanner().scan_range(self.path, 0, None, levels, lines)
+        for chunk_bytes in (4096, 50000):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                parallel_levels, parallel_lines = LevelCounter(), LineCounter()
+                scanner = ParallelScanner(chunk_bytes=chunk_bytes, min_parallel_bytes=0)
+                scanner.scan_range(self.path, 0, None, parallel_levels, parallel_lines)
+                self.assertEqual(parallel_levels.result(), levels.result())
+                self.assertEqual(parallel_lines.result(), lines.result())
+
+    def test_map_files_keeps_order(self):
+        items = list(range(50))
+        self.assertEqual(ParallelScanner().map_files(lambda item: item * item, items), [i * i for i in items])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""read_logs totals and paging across merged files"""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from log_analyzer import LogAnalyzer
+
+
+def _write_logs(path: Path, lines: int, offset: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            level = "ERROR" if i % 10 == 0 else "INFO"
+            f.write(f"2026-01-03 10:{i // 60 % 60:02d}:{i % 60:02d}.{offset} {level} {path.stem} request {i}\n")
+
+
+class ReadLogsTotalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        _write_logs(self.directory / "app.log", 300, 1)
+        _write_logs(self.directory / "web.log", 40, 2)
+        self.analyzer = LogAnalyzer(str(self.directory))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_total_without_filter(self):
+        # web.log is shorter than the tail, so it is counted
+        result = self.analyzer.read_logs(lines=100, page_size=20)
+        self.assertEqual(result["total_found"], 140)
+        self.assertTrue(result["has_more"])
+
+    def test_filtered_total_on_last_page_only(self):
+        first = self.analyzer.read_logs(filter_text="error", lines=0, page_size=20)
+        self.assertIsNone(first["total_found"])
+        self.assertTrue(first["has_more"])
+        last = self.analyzer.read_logs(filter_text="error", lines=0, page_size=20, cursor=first["next_cursor"])
+        self.assertEqual(last["page"], 2)
+        self.assertEqual(last["total_found"], 34)
+        self.assertFalse(last["has_more"])
+        self.assertIsNone(last["next_cursor"])
+
+
+class ReadLogsCursorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        _write_logs(self.directory / "app.log", 300, 1)
+        _write_logs(self.directory / "web.log", 120, 2)
+        self.analyzer = LogAnalyzer(str(self.directory))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pages(self, **query):
+        result = self.analyzer.read_logs(**query)
+        pages = [result]
+        while result["next_cursor"]:
+            result = self.analyzer.read_logs(cursor=result["next_cursor"], **query)
+            pages.append(result)
+        return pages
+
+    def test_cursor_pages_equal_one_read(self):
+        for query in ({"lines": 0}, {"lines": 0, "filter_text": "error"}, {"lines": 50}):
+            with self.subTest(**query):
+                whole = self.analyzer.read_logs(page_size=1000, **query)["lines"]
+                pages = self.pages(page_size=7, **query)
+                self.assertEqual([line for page in pages for line in page["lines"]], whole)
+                self.assertEqual([page["page"] for page in pages], list(range(1, len(pages) + 1)))
+                # Page numbers read the same pages as cursors
+                third = self.analyzer.read_logs(page_size=7, page=3, **query)
+                self.assertEqual(third["lines"], pages[2]["lines"])
+
+    def test_lines_are_merged_by_timestamp(self):
+        lines = self.analyzer.read_logs(lines=0, page_size=1000)["lines"]
+        self.assertEqual(lines, sorted(lines, key=lambda line: line[:21]))
+
+    def test_stale_cursor_is_rejected(self):
+        cursor = self.analyzer.read_logs(lines=0, page_size=10)["next_cursor"]
+        other = self.analyzer.read_logs(lines=0, page_size=10, cursor=cursor, filter_text="error")
+        self.assertIn("does not belong", other["error"])
+        self.assertIn("Invalid", self.analyzer.read_logs(lines=0, cursor="not-a-cursor")["error"])
+        # Truncated
+        with open(self.directory / "web.log", "w", encoding="utf-8"):
+            pass
+        self.assertIn("expired", self.analyzer.read_logs(lines=0, page_size=10, cursor=cursor)["error"])
+        # Rotated: app.log is a new file under the same name
+        _write_logs(self.directory / "web.log", 120, 2)
+        cursor = self.analyzer.read_logs(lines=0, page_size=10)["next_cursor"]
+        os.rename(self.directory / "app.log", self.directory / "old.txt")
+        _write_logs(self.directory / "app.log", 300, 1)
+        self.assertIn("expired", self.analyzer.read_logs(lines=0, page_size=10, cursor=cursor)["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
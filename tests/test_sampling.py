@@ -0,0 +1,73 @@
+"""Approximate counts over a mix of plain log files and .gz archives"""
+import gzip
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from log_analyzer import LogAnalyzer
+from utils.sampling import Sample
+
+_LEVELS = ["INFO"] * 7 + ["DEBUG", "WARNING", "ERROR"]
+
+
+def _write_logs(path: Path, lines: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"2026-01-03 10:{i // 60 % 60:02d}:{i % 60:02d} {rng.choice(_LEVELS)} request {i} served\n")
+
+
+class SamplingArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.mixed = self.directory / "mixed"
+        self.plain = self.directory / "plain"
+        self.mixed.mkdir()
+        self.plain.mkdir()
+        _write_logs(self.plain / "app.log", 20000, 1)
+        _write_logs(self.plain / "web.log", 5000, 2)
+        for name in ("app.log", "web.log"):
+            shutil.copy(self.plain / name, self.mixed / name)
+        # A large archive: its compressed size must not be mixed with plain bytes
+        _write_logs(self.directory / "old.log", 40000, 3)
+        with open(self.directory / "old.log", "rb") as source, gzip.open(self.mixed / "app.log.1.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        self.plain_bytes = sum(path.stat().st_size for path in self.plain.iterdir())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_full_budget_matches_exact_counts(self):
+        analyzer = LogAnalyzer(str(self.mixed))
+        exact = analyzer.count_log_types()
+        approximate = analyzer.count_log_types(mode="approximate", budget_seconds=60)
+        self.assertEqual(approximate["counts"], exact["counts"])
+        self.assertEqual(approximate["total_logs"], exact["total_logs"])
+        sampled = approximate["sampled"]
+        self.assertEqual(sampled["archives"], 1)
+        self.assertEqual(sampled["archives_read"], 1)
+        self.assertTrue(sampled["exact"])
+        self.assertEqual(sampled["bytes_read"], sampled["total_bytes"])
+
+    def test_partial_estimate_includes_archives(self):
+        scanner = LogAnalyzer(str(self.mixed)).scanner
+        sample = Sample(sorted(self.mixed.iterdir()), block_bytes=32 * 1024, seed=7)
+        sample.extend(scanner.scan_range, seconds=None, max_bytes=self.plain_bytes // 3)
+        coverage = sample.coverage()
+        self.assertLess(coverage["bytes_read"], coverage["total_bytes"])
+        self.assertEqual(coverage["archives_read"], 1)
+        # 25000 lines in plain files and 40000 in the archive
+        estimate, _ = sample.total("lines")
+        self.assertAlmostEqual(estimate, 65000, delta=65000 * 0.05)
+
+    def test_archives_only(self):
+        analyzer = LogAnalyzer(str(self.mixed), include=["*.gz"])
+        exact = analyzer.count_log_types()
+        approximate = analyzer.count_log_types(mode="approximate", budget_seconds=60)
+        self.assertEqual(approximate["counts"], exact["counts"])
+        self.assertEqual(approximate["total_logs"], 40000)
+
+
+if __name__ == "__main__":
+    unittest.main()
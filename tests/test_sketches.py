@@ -0,0 +1,31 @@
+"""SpaceSaving replaces the smallest key like a full scan would"""
+import random
+import unittest
+from utils.sketches import SpaceSaving
+
+
+class SpaceSavingTest(unittest.TestCase):
+    def test_matches_full_scan(self):
+        rng = random.Random(5)
+        sketch = SpaceSaving(16)
+        counts, errors = {}, {}
+        for _ in range(5000):
+            key = str(int(rng.paretovariate(1.2)) % 300)
+            sketch.add(key)
+            if key in counts:
+                counts[key] += 1
+            elif len(counts) < 16:
+                counts[key], errors[key] = 1, 0
+            else:
+                victim = min(counts, key=lambda k: (counts[k], k))
+                floor = counts.pop(victim)
+                errors.pop(victim)
+                counts[key], errors[key] = floor + 1, floor
+            if rng.random() < 0.01:
+                sketch = SpaceSaving.from_dict(sketch.to_dict())
+        self.assertEqual(sketch.counts, counts)
+        self.assertEqual(sketch.errors, errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
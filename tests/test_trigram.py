@@ -0,0 +1,81 @@
+"""Indexed and linear read_logs filters must return the same lines"""
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from utils.file_handler import FileHandler
+from utils.trigram import TrigramIndex, required_literals
+
+# Lines whose non-ASCII characters match ASCII filters once case-folded
+_FOLDING_LINES = [
+    "2026-01-03 10:00:00 ERROR ﬁle not found",  # fi ligature
+    "2026-01-03 10:00:01 WARNING ſtatus degraded",  # long s
+    "2026-01-03 10:00:02 ERROR dısk full",  # dotless i
+    "2026-01-03 10:00:03 INFO straße updated",  # sharp s
+    "2026-01-03 10:00:04 INFO İd assigned",  # capital I with dot
+    "2026-01-03 10:00:05 DEBUG 300 Kelvin reached",  # Kelvin sign
+]
+_FILTERS = ["file", "status", "disk", "strasse", "not found"]
+_REGEX_FILTERS = ["status degraded", "disk ful+", "id assigned", "kelvin reached", "\\d+ kelvin"]
+_ESCAPE_LINE = "2026-01-03 10:00:06 ERROR payment failed (code 12)"
+# Escapes whose arguments are not literal text of the match
+_ESCAPE_FILTERS = [
+    r"p\x61yment failed",
+    r"p\u0061yment failed",
+    r"p\U00000061yment failed",
+    r"p\N{LATIN SMALL LETTER A}yment failed",
+    r"p\141yment failed",
+    r"p(a)yment f\1iled",
+    r"failed \(code \d\d\)",
+]
+
+
+class TrigramConsistencyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = str(Path(self.directory) / "app.log")
+        with open(self.path, "w", encoding="utf-8") as f:
+            for i in range(3000):
+                f.write(f"2026-01-03 09:00:00 INFO request {i} served\n")
+                if i % 500 == 0:
+                    f.write(_FOLDING_LINES[(i // 500) % len(_FOLDING_LINES)] + "\n")
+                if i % 700 == 0:
+                    f.write(_ESCAPE_LINE + "\n")
+            f.write("\n".join(_FOLDING_LINES) + "\n")
+            f.write(_ESCAPE_LINE + "\n")
+        self.index = TrigramIndex(
+            index_dir=str(Path(self.directory) / "index"), min_file_bytes=0, page_bytes=1024
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def assert_same(self, predicate, literals):
+        linear = [line for line in FileHandler.iter_lines(self.path) if predicate(line)]
+        indexed = self.index.search(self.path, predicate, literals)
+        self.assertIsNotNone(indexed)
+        self.assertEqual(indexed, linear)
+        self.assertTrue(linear)
+
+    def test_substring_filters(self):
+        for filter_text in _FILTERS:
+            with self.subTest(filter_text=filter_text):
+                needle = filter_text.upper()
+                self.assert_same(lambda line: needle in line.upper(), [needle])
+
+    def test_regex_filters(self):
+        for filter_text in _REGEX_FILTERS:
+            with self.subTest(filter_text=filter_text):
+                search = re.compile(filter_text, re.IGNORECASE).search
+                self.assert_same(search, required_literals(filter_text))
+
+    def test_regex_escapes(self):
+        for filter_text in _ESCAPE_FILTERS:
+            with self.subTest(filter_text=filter_text):
+                search = re.compile(filter_text, re.IGNORECASE).search
+                self.assert_same(search, required_literals(filter_text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,261 @@
+"""Time-bucketed anomaly detection
+
+Works on a Timeline (see utils.statistics), which is filled during the
+normal streaming scan, so detection needs no extra pass over the logs.
+Statistics cover every bucket between the first and last timestamped
+one, but only occupied buckets are stored and computed on (sorted NumPy
+arrays): sums over a trailing window come from prefix sums located with
+searchsorted, and empty buckets enter means and deviations as zeros. A
+stray timestamp years away from the rest therefore costs nothing.
+
+    spike    ERROR/CRITICAL buckets whose z-score against the trailing
+             rolling mean/stddev reaches z_threshold
+    missing  runs of buckets with no timestamped lines at all (silence)
+    pattern  error templates with a burst well above their own per-bucket
+             rate
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+import numpy as np
+from config import ANOMALY_CONFIG
+from utils.templates import mine_templates
+
+_EPOCH = datetime(1970, 1, 1)
+ANOMALY_TYPES = ("spike", "missing", "pattern")
+
+
+class AnomalyDetector:
+    @staticmethod
+    def detect(timeline, anomaly_type: str = "spike") -> Dict:
+        if anomaly_type == "spike":
+            return AnomalyDetector.detect_spikes(timeline)
+        if anomaly_type == "missing":
+            return AnomalyDetector.detect_gaps(timeline)
+        if anomaly_type == "pattern":
+            return AnomalyDetector.detect_pattern_bursts(timeline)
+        return {"error": "Invalid anomaly type"}
+
+    @staticmethod
+    def occupied(counts: Dict[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted buckets with a count, and their counts"""
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        order = np.argsort(buckets, kind="stable")
+        return buckets[order], values[order]
+
+    @staticmethod
+    def rolling_baseline(
+        buckets: np.ndarray,
+        values: np.ndarray,
+        first: int,
+        window: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mean, stddev and bucket count of the trailing window before each
+        occupied bucket, empty buckets since first counting as zeros"""
+        x = values.astype(np.float64)
+        csum = np.concatenate(([0.0], np.cumsum(x)))
+        csq = np.concatenate(([0.0], np.cumsum(x * x)))
+        index = np.arange(len(x))
+        lower = np.searchsorted(buckets, buckets - window)
+        n = (buckets - np.maximum(buckets - window, first)).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, (csum[index] - csum[lower]) / n, 0.0)
+            var = np.where(n > 0, (csq[index] - csq[lower]) / n - mean * mean, 0.0)
+        return mean, np.sqrt(np.maximum(var, 0.0)), n
+
+    @staticmethod
+    def ewma(
+        buckets: np.ndarray,
+        values: np.ndarray,
+        first: int,
+        points: np.ndarray,
+        alpha: float
+    ) -> np.ndarray:
+        """EWMA of the zero-filled series starting at first, at the given buckets.
+
+        Seeded with the first bucket's count like a dense recursion. Weights
+        decay by (1 - alpha) per bucket, so only the buckets within the
+        horizon where they stay above float precision are summed.
+        """
+        decay = 1.0 - alpha
+        seed = float(values[0]) if len(values) and buckets[0] == first else 0.0
+        horizon = int(np.ceil(np.log(1e-17) / np.log(decay))) if 0.0 < decay < 1.0 else None
+        out = np.empty(len(points), dtype=np.float64)
+        for i, point in enumerate(points.tolist()):
+            low = 0 if horizon is None else np.searchsorted(buckets, point - horizon)
+            high = np.searchsorted(buckets, point, side="right")
+            age = (point - buckets[low:high]).astype(np.float64)
+            out[i] = alpha * float(np.sum(values[low:high] * decay ** age)) + seed * decay ** (point - first + 1)
+        return out
+
+    @staticmethod
+    def z_scores(values: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+        # Poisson floor keeps flat or sparse baselines from exploding z
+        scale = np.maximum(std, np.sqrt(np.maximum(mean, 1.0)))
+        return (values - mean) / scale
+
+    @staticmethod
+    def moments(values: np.ndarray, size: int) -> Tuple[float, float]:
+        """Mean and stddev of size buckets, the ones not in values being zero"""
+        mean = float(values.sum()) / size
+        squares = float(np.sum((values - mean) ** 2)) + (size - len(values)) * mean * mean
+        return mean, float(np.sqrt(squares / size))
+
+    @staticmethod
+    def detect_spikes(
+        timeline,
+        window_buckets: int = ANOMALY_CONFIG["window_buckets"],
+        z_threshold: float = ANOMALY_CONFIG["z_threshold"],
+        min_count: int = ANOMALY_CONFIG["min_count"],
+        alpha: float = ANOMALY_CONFIG["ewma_alpha"],
+        max_results: int = ANOMALY_CONFIG["max_results"]
+    ) -> Dict:
+        """Find ERROR/CRITICAL spike windows using rolling z-scores"""
+        if not timeline.errors:
+            return {"spike_detected": False, "spikes_detected": 0,
+                    "message": "No timestamped ERROR/CRITICAL logs to analyze"}
+        first, last = AnomalyDetector._span(timeline)
+        buckets, errors = AnomalyDetector.occupied(timeline.errors)
+        mean, std, n = AnomalyDetector.rolling_baseline(buckets, errors, first, window_buckets)
+        z = AnomalyDetector.z_scores(errors, mean, std)
+        # An empty bucket is never at or above the baseline, so only occupied ones can spike
+        flagged = np.flatnonzero((n > 0) & (errors >= min_count) & (z >= z_threshold))
+
+        runs = AnomalyDetector._runs(buckets[flagged])
+        peaks = [start + int(np.argmax(z[flagged[start:stop]])) for start, stop in runs]
+        smoothed = AnomalyDetector.ewma(buckets, errors, first, buckets[flagged[peaks]], alpha)
+        spikes = []
+        for (start, stop), peak, ewma in zip(runs, peaks, smoothed.tolist()):
+            peak = flagged[peak]
+            spikes.append({
+                "start": AnomalyDetector._time(timeline, int(buckets[flagged[start]])),
+                "end": AnomalyDetector._time(timeline, int(buckets[flagged[stop - 1]]) + 1),
+                "errors": int(errors[flagged[start:stop]].sum()),
+                "peak_errors": int(errors[peak]),
+                "peak_z_score": round(float(z[peak]), 2),
+                "baseline_mean": round(float(mean[peak]), 2),
+                "baseline_stddev": round(float(std[peak]), 2),
+                "ewma": round(ewma, 2),
+            })
+        spikes.sort(key=lambda spike: -spike["peak_z_score"])
+        size = last - first + 1
+        mean_per_bucket, stddev_per_bucket = AnomalyDetector.moments(errors, size)
+        return {
+            "spike_detected": bool(spikes),
+            "spikes_detected": len(spikes),
+            "bucket_seconds": timeline.bucket_seconds,
+            "buckets": size,
+            "total_errors": int(errors.sum()),
+            "mean_per_bucket": round(mean_per_bucket, 3),
+            "stddev_per_bucket": round(stddev_per_bucket, 3),
+            "spikes": spikes[:max_results],
+        }
+
+    @staticmethod
+    def detect_gaps(
+        timeline,
+        min_gap_buckets: int = ANOMALY_CONFIG["min_gap_buckets"],
+        max_results: int = ANOMALY_CONFIG["max_results"]
+    ) -> Dict:
+        """Find silent periods with no timestamped lines at all"""
+        if not timeline.lines:
+            return {"gaps_detected": 0, "message": "No timestamped logs to analyze"}
+        first, last = AnomalyDetector._span(timeline)
+        buckets, lines = AnomalyDetector.occupied(timeline.lines)
+        active = lines > 0
+        buckets, lines = buckets[active], lines[active]
+        # Empty buckets between consecutive active ones
+        silent = np.diff(buckets) - 1
+        gaps = [
+            {
+                "start": AnomalyDetector._time(timeline, int(buckets[i]) + 1),
+                "end": AnomalyDetector._time(timeline, int(buckets[i + 1])),
+                "duration_seconds": int(silent[i]) * timeline.bucket_seconds,
+            }
+            for i in np.flatnonzero(silent >= max(min_gap_buckets, 1)).tolist()
+        ]
+        gaps.sort(key=lambda gap: -gap["duration_seconds"])
+        return {
+            "gaps_detected": len(gaps),
+            "bucket_seconds": timeline.bucket_seconds,
+            "buckets": last - first + 1,
+            "active_buckets": int(len(lines)),
+            "mean_lines_per_active_bucket": round(float(lines.mean()), 3),
+            "gaps": gaps[:max_results],
+        }
+
+    @staticmethod
+    def detect_pattern_bursts(
+        timeline,
+        z_threshold: float = ANOMALY_CONFIG["z_threshold"],
+        min_count: int = ANOMALY_CONFIG["min_count"],
+        max_results: int = ANOMALY_CONFIG["max_results"]
+    ) -> Dict:
+        """Find error templates whose busiest bucket is far above their usual rate"""
+        if not timeline.patterns:
+            return {"patterns_detected": 0, "message": "No timestamped error/warning patterns to analyze"}
+        first, last = AnomalyDetector._span(timeline)
+        size = last - first + 1
+        messages = [
+            (key, sum(counts.values()), key) for key, counts in timeline.patterns.items()
+        ]
+        miner, assignment = mine_templates(messages)
+        series = {}
+        for key, counts in timeline.patterns.items():
+            template_id = assignment[key]
+            if template_id in series:
+                merged = series[template_id][1]
+                for bucket, count in counts.items():
+                    merged[bucket] = merged.get(bucket, 0) + count
+            else:
+                cluster = miner.clusters.get(template_id)
+                series[template_id] = [cluster.template if cluster else key, dict(counts)]
+
+        bursts = []
+        for template_id, (template, counts) in series.items():
+            buckets, values = AnomalyDetector.occupied(counts)
+            inside = (buckets >= first) & (buckets <= last)
+            buckets, values = buckets[inside], values[inside]
+            if not len(values):
+                continue
+            peak = int(np.argmax(values))
+            if values[peak] < min_count:
+                continue
+            mean, std = AnomalyDetector.moments(values, size)
+            z = float(AnomalyDetector.z_scores(
+                values[peak:peak + 1], np.array([mean]), np.array([std])
+            )[0])
+            if z >= z_threshold:
+                bursts.append({
+                    "template_id": template_id,
+                    "template": template,
+                    "total": int(values.sum()),
+                    "peak_count": int(values[peak]),
+                    "peak_time": AnomalyDetector._time(timeline, int(buckets[peak])),
+                    "first_seen": AnomalyDetector._time(timeline, int(buckets[np.argmax(values > 0)])),
+                    "z_score": round(z, 2),
+                })
+        bursts.sort(key=lambda burst: (-burst["z_score"], burst["template_id"]))
+        return {
+            "patterns_detected": len(bursts),
+            "bucket_seconds": timeline.bucket_seconds,
+            "templates_tracked": len(series),
+            "patterns": bursts[:max_results],
+        }
+
+    @staticmethod
+    def _span(timeline) -> Tuple[int, int]:
+        buckets = timeline.lines.keys()
+        return min(buckets), max(buckets)
+
+    @staticmethod
+    def _runs(buckets: np.ndarray) -> List[Tuple[int, int]]:
+        """[start, stop) index pairs of runs of consecutive sorted buckets"""
+        if not len(buckets):
+            return []
+        breaks = np.flatnonzero(np.diff(buckets) != 1) + 1
+        return list(zip([0] + breaks.tolist(), breaks.tolist() + [len(buckets)]))
+
+    @staticmethod
+    def _time(timeline, bucket: int) -> str:
+        return str(_EPOCH + timedelta(seconds=bucket * timeline.bucket_seconds))
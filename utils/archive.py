@@ -0,0 +1,224 @@
+"""Rotated and compressed log archives
+
+Rotation chains (app.log, app.log.1, app.log.2.gz, ...) are recognised
+by name, and compressed members (.gz, .bz2, .xz) are decoded as streams
+without temporary files. All offsets of a compressed file refer to its
+decompressed content.
+
+While a gzip file is inflated from the start, a seek index is built:
+every ARCHIVE_CONFIG["gzip_index_span"] bytes of output the inflater
+state is copied along with the compressed offset and the first line
+start after it. Later reads that start past the beginning (tails, resumed
+reads) restart from the nearest point instead of inflating everything.
+zlib states cannot be serialized, so the index lives in the memory of
+the process that inflated the file (see ParallelScanner._scan_archive).
+
+Each decode step produces at most ARCHIVE_CONFIG["decoded_size"] bytes,
+however well the input compresses; input left over is fed to the next
+step.
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+import bz2
+import lzma
+import os
+import re
+import threading
+import zlib
+from config import ARCHIVE_CONFIG, LOG_FORMATS
+from utils.cancellation import check_cancelled
+
+COMPRESSED_SUFFIXES = {
+    ".gz": lambda: zlib.decompressobj(zlib.MAX_WBITS | 16),
+    ".bz2": bz2.BZ2Decompressor,
+    ".xz": lzma.LZMADecompressor,
+}
+
+_FORMATS = "|".join(re.escape(fmt) for fmt in LOG_FORMATS)
+_COMPRESSIONS = "|".join(re.escape(suffix) for suffix in COMPRESSED_SUFFIXES)
+LOG_NAME_RE = re.compile(
+    rf'(?P<base>.+(?:{_FORMATS}))(?:\.(?P<index>\d+))?(?P<compression>{_COMPRESSIONS})?', re.I
+)
+
+
+def is_log_name(name: str, rotated: bool = ARCHIVE_CONFIG["rotated"]) -> bool:
+    """app.log / app.txt, or with rotation and compression suffixes when rotated"""
+    match = LOG_NAME_RE.fullmatch(name)
+    if match is None:
+        return False
+    return rotated or (match.group("index") is None and match.group("compression") is None)
+
+
+def rotation_key(name: str) -> Tuple[str, int]:
+    """(chain base name, rotation number); the live file is number 0"""
+    match = LOG_NAME_RE.fullmatch(name)
+    if match is None:
+        return name, 0
+    return match.group("base"), int(match.group("index") or 0)
+
+
+def compression(file_path: str) -> Optional[str]:
+    suffix = Path(file_path).suffix.lower()
+    return suffix if suffix in COMPRESSED_SUFFIXES else None
+
+
+def is_compressed(file_path: str) -> bool:
+    return compression(file_path) is not None
+
+
+class _IndexPoint:
+    __slots__ = ("compressed", "offset", "line_start", "state")
+
+    def __init__(self, compressed: int, offset: int, state):
+        self.compressed = compressed  # compressed bytes consumed
+        self.offset = offset  # decompressed bytes produced
+        self.line_start = None  # first line start at or after offset
+        self.state = state  # inflater copy at this point
+
+
+class GzipIndex:
+    def __init__(self):
+        self.points = []  # _IndexPoint, by offset
+        self.size = None  # decompressed size once fully read
+
+    def point_for(self, offset: int) -> Optional[_IndexPoint]:
+        """Last point whose line start is at or before offset"""
+        starts = [point.line_start for point in self.points]
+        position = bisect_right(starts, offset)
+        return self.points[position - 1] if position else None
+
+    def line_starts(self) -> List[int]:
+        return [point.line_start for point in self.points]
+
+
+class _IndexRegistry:
+    """LRU of gzip indexes, valid while the file is unchanged"""
+
+    def __init__(self, max_entries: int = ARCHIVE_CONFIG["max_indexes"]):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # path -> (identity, GzipIndex)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def identity(file_path: str) -> Tuple[int, int, int]:
+        st = os.stat(file_path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, file_path: str) -> Optional[GzipIndex]:
+        identity = self.identity(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry[0] != identity:
+                return None
+            self._entries.move_to_end(file_path)
+            return entry[1]
+
+    def put(self, file_path: str, index: GzipIndex) -> None:
+        identity = self.identity(file_path)
+        with self._lock:
+            self._entries[file_path] = (identity, index)
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+GZIP_INDEXES = _IndexRegistry()
+
+
+def iter_decompressed(
+    file_path: str,
+    start: int = 0,
+    read_size: int = ARCHIVE_CONFIG["read_size"],
+    span: int = ARCHIVE_CONFIG["gzip_index_span"],
+    decoded_size: int = ARCHIVE_CONFIG["decoded_size"]
+) -> Iterator[bytes]:
+    """Stream the decompressed content of file_path from offset start"""
+    suffix = compression(file_path)
+    factory = COMPRESSED_SUFFIXES[suffix]
+    index = GZIP_INDEXES.get(file_path) if suffix == ".gz" and start > 0 else None
+    point = index.point_for(start) if index is not None else None
+    if point is not None:
+        yield from _inflate(
+            file_path, factory, start, point.compressed, point.offset, point.state.copy(), read_size, decoded_size
+        )
+    else:
+        # From the beginning; gzip streams record an index on the way
+        building = GzipIndex() if suffix == ".gz" else None
+        yield from _inflate(file_path, factory, start, 0, 0, factory(), read_size, decoded_size, building, span)
+
+
+def _decode(
+    f,
+    factory: Callable,
+    decompressor,
+    compressed: int,
+    read_size: int,
+    decoded_size: int
+) -> Iterator[Tuple[bytes, int, object]]:
+    """(output, compressed bytes consumed, decompressor) per step of at most decoded_size bytes"""
+    while True:
+        check_cancelled()
+        data = f.read(read_size)
+        if not data:
+            break
+        compressed += len(data)
+        while True:
+            out = decompressor.decompress(data, decoded_size)
+            # zlib hands back the input it did not get to; bz2 and lzma keep it until needs_input
+            data = getattr(decompressor, "unconsumed_tail", b"")
+            more = bool(data) or not getattr(decompressor, "needs_input", True)
+            if decompressor.eof:
+                # Concatenated streams: continue with a fresh decompressor
+                data = decompressor.unused_data
+                if not data.strip(b"\0"):
+                    data = b""
+                decompressor = factory()
+                more = bool(data)
+            yield out, compressed - len(data), decompressor
+            if not more:
+                break
+    flush = getattr(decompressor, "flush", None)
+    if flush is not None:
+        # Output zlib still holds after the last input (a truncated stream)
+        yield flush(), compressed, decompressor
+
+
+def _inflate(
+    file_path: str,
+    factory: Callable,
+    start: int,
+    compressed: int,
+    offset: int,
+    decompressor,
+    read_size: int,
+    decoded_size: int,
+    index: Optional[GzipIndex] = None,
+    span: int = 0
+) -> Iterator[bytes]:
+    skip = start - offset
+    next_point = span
+    pending = None  # point still waiting for its first line start
+    with open(file_path, 'rb') as f:
+        f.seek(compressed)
+        for out, consumed, decompressor in _decode(f, factory, decompressor, compressed, read_size, decoded_size):
+            if index is not None:
+                if pending is not None:
+                    newline = out.find(b"\n")
+                    if newline >= 0:
+                        pending.line_start = offset + newline + 1
+                        index.points.append(pending)
+                        pending = None
+                if offset + len(out) >= next_point and pending is None:
+                    pending = _IndexPoint(consumed, offset + len(out), decompressor.copy())
+                    next_point = pending.offset + span
+            offset += len(out)
+            if skip >= len(out):
+                skip -= len(out)
+                continue
+            yield out[skip:] if skip else out
+            skip = 0
+    if index is not None:
+        index.size = offset
+        GZIP_INDEXES.put(file_path, index)
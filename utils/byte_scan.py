@@ -0,0 +1,202 @@
+"""Level counts and level filtering on raw bytes
+
+count_log_types and extract_critical_logs only need each line's level,
+and level tokens and timestamps are ASCII. ByteScanner classifies whole
+newline-aligned buffers with one bytes pattern that mirrors
+the parser's precedence (plain, then bracketed, then the first
+standalone level token), so lines are not decoded, upper-cased or turned
+into records one by one. The pattern starts with a literal newline, which
+lets the regex engine jump from line to line instead of trying every
+byte. Lines are counted on a NumPy view of the buffer. Only the lines
+handed back to the caller are decoded and parsed.
+
+Lines that bytes cannot classify exactly like text are decoded and
+parsed one at a time: non-ASCII lines, lone carriage returns, the
+\\x1c-\\x1f separators that str patterns treat as whitespace and, in
+auto mode, JSON objects. A few substring tests clear most buffers of
+these at once. The json format has no byte path.
+
+Buffers are read rather than memory-mapped: a log truncated in place
+(copytruncate) while mapped would raise SIGBUS.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+import re
+import numpy as np
+from config import SCAN_CONFIG
+from utils.file_handler import FileHandler
+from utils.metrics import METRICS
+from utils.parser import LEVEL_ALIASES, LEVEL_PATTERN, TIMESTAMP_PATTERN, LogParser, LogRecord
+from utils.statistics import LevelCounter, LineCounter
+
+_TIMESTAMP = rb"\[?(?:" + TIMESTAMP_PATTERN.encode() + rb")\]?"
+_SPACE = rb"[ \t\x0b\x0c]+"  # \s within a line; \r and \x1c-\x1f go the slow way
+_CI_LEVEL = rb"(?i:" + LEVEL_PATTERN.encode() + rb")"
+
+# Zero-width prefixes that end right before the level token, in parser order
+_PREFIXES = {
+    "plain": _TIMESTAMP + _SPACE + rb"(?=" + _CI_LEVEL + rb"\b)",
+    "bracketed": rb"(?:" + _TIMESTAMP + _SPACE + rb")?\[(?=" + _CI_LEVEL + rb"\])",
+    "token": rb"[^\n]*?\b(?=(?:" + LEVEL_PATTERN.encode() + rb")\b)",
+}
+_CONTROLS = (b"\r", b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+_MIN_FAST_RUN = 4096  # shorter stretches between slow lines are parsed with them
+_FORMATS = {
+    "plain": ("plain",),
+    "bracketed": ("bracketed",),
+    # LEADING_LEVEL_RE finds the same token as the standalone token search
+    "auto": ("plain", "bracketed", "token"),
+}
+
+
+class ByteScanner:
+    # Aggregators a byte scan can fill
+    AGGREGATORS = (LevelCounter, LineCounter)
+
+    def __init__(
+        self,
+        parser: LogParser,
+        chunk_size: int = SCAN_CONFIG["byte_chunk_size"],
+        enabled: bool = SCAN_CONFIG["raw_bytes"]
+    ):
+        self.parser = parser
+        self.chunk_size = chunk_size
+        prefixes = _FORMATS.get(parser.log_format)
+        self.enabled = enabled and prefixes is not None
+        if self.enabled:
+            # The prefixes have checked the token, so letters capture exactly it
+            level = rb"(?:" + b"|".join(_PREFIXES[prefix] for prefix in prefixes) + rb")([A-Za-z]+)"
+            self.first = re.compile(level)  # first line of a run, matched at its start
+            self.pattern = re.compile(rb"\n" + level)  # every later line
+            self.json = parser.log_format == "auto"
+            slow = rb"[\r\x1c-\x1f\x80-\xff]" + (rb"|^\{" if self.json else b"")
+            self.slow = re.compile(slow, re.M)
+        self._levels = {}  # raw token -> level
+
+    def handles(self, aggregators) -> bool:
+        return self.enabled and all(type(aggregator) in self.AGGREGATORS for aggregator in aggregators)
+
+    def scan_range(self, file_path: str, start: int, end: Optional[int], *aggregators) -> None:
+        """Feed level and line counts of [start, end) to LevelCounter/LineCounter aggregators"""
+        self.scan_buffers(self._buffers(file_path, start, end), *aggregators)
+
+    def scan_buffers(self, buffers: Iterable[bytes], *aggregators) -> None:
+        """scan_range() over newline-aligned buffers already in memory"""
+        levels, lines = self.count_buffers(buffers)
+        for aggregator in aggregators:
+            if isinstance(aggregator, LevelCounter):
+                for level, count in levels.items():
+                    aggregator.counts[level] += count
+            else:
+                aggregator.count += lines
+
+    def count_range(self, file_path: str, start: int = 0, end: Optional[int] = None) -> Tuple[Dict[str, int], int]:
+        """Per-level counts and number of lines of [start, end)"""
+        return self.count_buffers(self._buffers(file_path, start, end))
+
+    def count_buffers(self, buffers: Iterable[bytes]) -> Tuple[Dict[str, int], int]:
+        """Per-level counts and number of lines of newline-aligned buffers"""
+        tokens = Counter()
+        levels = Counter()
+        lines = 0
+        parse = self.parser.parse
+        with METRICS.stage("byte_scan") as stats:
+            for buffer in buffers:
+                stats.bytes += len(buffer)
+                for begin, stop, fast in self._segments(buffer):
+                    if fast:
+                        view = np.frombuffer(buffer, np.uint8, stop - begin, begin)
+                        lines += int(np.count_nonzero(view == 10)) + (buffer[stop - 1] != 10)
+                        first = self.first.match(buffer, begin, stop)
+                        if first is not None:
+                            tokens[first.group(1)] += 1
+                        tokens.update(self.pattern.findall(buffer, begin, stop))
+                        continue
+                    for line in FileHandler._split_lines(buffer[begin:stop]):
+                        lines += 1
+                        level = parse(line).level
+                        if level:
+                            levels[level] += 1
+            stats.lines = lines
+        for token, count in tokens.items():
+            levels[self._level(token)] += count
+        return dict(levels), lines
+
+    def records(
+        self,
+        file_path: str,
+        wanted: Set[str],
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[LogRecord]:
+        """Records of the lines of [start, end) whose level is in wanted, in file order"""
+        parse = self.parser.parse
+        for buffer in self._buffers(file_path, start, end):
+            for begin, stop, fast in self._segments(buffer):
+                if not fast:
+                    for line in FileHandler._split_lines(buffer[begin:stop]):
+                        record = parse(line)
+                        if record.level in wanted:
+                            yield record
+                    continue
+                for line_start, token in self._tokens(buffer, begin, stop):
+                    if self._level(token) in wanted:
+                        line_end = buffer.find(b"\n", line_start, stop) + 1 or stop
+                        yield parse(buffer[line_start:line_end].decode("ascii"))
+
+    def _tokens(self, buffer: bytes, begin: int, stop: int) -> Iterator[Tuple[int, bytes]]:
+        """(line start, level token) of the leveled lines of a fast run"""
+        first = self.first.match(buffer, begin, stop)
+        if first is not None:
+            yield begin, first.group(1)
+        for match in self.pattern.finditer(buffer, begin, stop):
+            yield match.start() + 1, match.group(1)
+
+    def _level(self, token: bytes) -> str:
+        level = self._levels.get(token)
+        if level is None:
+            level = self._levels[token] = LEVEL_ALIASES[token.decode("ascii").upper()]
+        return level
+
+    def _buffers(self, file_path: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+        """Newline-aligned buffers of [start, end); the last may lack a newline"""
+        remainder = b""
+        for chunk in FileHandler._chunks(file_path, start, end, self.chunk_size):
+            buffer = remainder + chunk if remainder else chunk
+            cut = buffer.rfind(b"\n") + 1
+            if not cut:
+                remainder = buffer
+                continue
+            remainder = buffer[cut:]
+            yield buffer[:cut] if cut < len(buffer) else buffer
+        if remainder:
+            yield remainder
+
+    def _clean(self, buffer: bytes) -> bool:
+        """True if no line of buffer needs the slow path"""
+        if not buffer.isascii() or any(control in buffer for control in _CONTROLS):
+            return False
+        return not self.json or (b"\n{" not in buffer and buffer[:1] != b"{")
+
+    def _segments(self, buffer: bytes) -> Iterator[Tuple[int, int, bool]]:
+        """(start, end, fast) runs of whole lines covering buffer"""
+        position, end = 0, len(buffer)
+        if self._clean(buffer):
+            yield position, end, True
+            return
+        search = self.slow.search
+        slow = search(buffer)
+        while position < end:
+            if slow is None:
+                yield position, end, True
+                return
+            line_start = buffer.rfind(b"\n", position, slow.start()) + 1 or position
+            if line_start > position:
+                yield position, line_start, True
+            # Slow lines run together unless a long enough fast stretch separates them
+            line_end = line_start
+            while slow is not None and slow.start() < line_end + _MIN_FAST_RUN:
+                line_end = buffer.find(b"\n", slow.start()) + 1 or end
+                slow = search(buffer, line_end)
+            yield line_start, line_end, False
+            position = line_end
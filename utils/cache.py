@@ -0,0 +1,106 @@
+"""Process-wide cache of per-file analysis results"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+import os
+import threading
+from config import CACHE_CONFIG
+from utils.statistics import LogSummary
+
+FileIdentity = Tuple[int, int, int]  # (inode, size, mtime_ns)
+
+
+class AnalysisCache:
+    """LRU map of file path -> LogSummary, valid while the file is unchanged.
+
+    Entries are keyed on (path, inode, size, mtime); a file whose identity
+    changed is treated as a miss and rescanned. The least recently used
+    entries are evicted once the estimated footprint exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_CONFIG["max_bytes"], enabled: bool = CACHE_CONFIG["enabled"]):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = OrderedDict()  # path -> (identity, summary, size)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def identity(file_path: str) -> FileIdentity:
+        st = os.stat(file_path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, file_path: str, identity: FileIdentity) -> Optional[LogSummary]:
+        """Return the cached summary if the file is unchanged"""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry[0] != identity:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(file_path)
+            self.hits += 1
+            return entry[1]
+
+    def contains(self, file_path: str) -> bool:
+        """True if the file has an entry and is unchanged since; not counted as a lookup"""
+        path = str(Path(file_path).resolve())
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry is not None and entry[0] == self.identity(path)
+
+    def put(self, file_path: str, identity: FileIdentity, summary: LogSummary) -> None:
+        size = summary.estimated_size()
+        with self._lock:
+            self._discard(file_path)
+            if size > self.max_bytes:
+                return
+            self._entries[file_path] = (identity, summary, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def summarize(self, file_path: Path, scan: Callable[[str], LogSummary]) -> LogSummary:
+        """Return the summary of a file, scanning it only on a cache miss"""
+        path = str(Path(file_path).resolve())
+        if not self.enabled:
+            return scan(path)
+        before = self.identity(path)
+        summary = self.get(path, before)
+        if summary is None:
+            summary = scan(path)
+            # Only cache results of a scan that saw a stable file
+            if self.identity(path) == before:
+                self.put(path, before, summary)
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _discard(self, file_path: str) -> None:
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+
+# Shared by every LogAnalyzer in the process
+ANALYSIS_CACHE = AnalysisCache()
@@ -0,0 +1,69 @@
+"""Cooperative cancellation of long-running scans
+
+A CancelToken is installed in a context variable for the duration of a
+tool call. Read loops call check_cancelled() once per chunk, which raises
+ScanCancelled after the token was cancelled, so a timed-out or abandoned
+call stops at the next chunk boundary instead of scanning to the end.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+import functools
+import threading
+
+
+class ScanCancelled(Exception):
+    """Raised inside a scan whose tool call was cancelled or timed out"""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise ScanCancelled("Scan cancelled")
+
+
+_CURRENT = ContextVar("cancel_token", default=None)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _CURRENT.get()
+
+
+def check_cancelled() -> None:
+    """Raise ScanCancelled if the current call was cancelled"""
+    token = _CURRENT.get()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def cancellable(token: Optional[CancelToken]) -> Iterator[None]:
+    """Make token the current token within the block"""
+    reset = _CURRENT.set(token)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(reset)
+
+
+def bind(function: Callable, token: Optional[CancelToken] = None) -> Callable:
+    """Wrap function so it runs under token (default: the current one) in any thread"""
+    token = token if token is not None else _CURRENT.get()
+    if token is None:
+        return function
+
+    @functools.wraps(function)
+    def run(*args, **kwargs):
+        with cancellable(token):
+            return function(*args, **kwargs)
+    return run
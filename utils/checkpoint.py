@@ -0,0 +1,245 @@
+"""Incremental indexing of append-only log files
+
+A checkpoint remembers how far a file has been scanned (always just past
+a newline) together with the aggregates up to that offset and a hash of
+the file head. When the same file is seen again with the same inode and
+head, only the bytes appended since the checkpoint are scanned and merged.
+Rotation or truncation fails these checks and triggers a full rescan.
+Compressed archives do not grow, so their checkpoint covers the whole
+file (offset = compressed size) or is discarded.
+
+Checkpoints in memory are bounded by count and by the estimated size of
+their summaries (LogSummary.estimated_size, as in the analysis cache);
+the least recently used are evicted, and reloaded from their sidecar
+file when there is one.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import hashlib
+import json
+import os
+import threading
+from config import CHECKPOINT_CONFIG
+from utils.archive import is_compressed
+from utils.file_handler import FileHandler
+from utils.statistics import LogSummary
+
+
+class FileCheckpoint:
+    __slots__ = ("inode", "offset", "head_length", "head_hash", "summary")
+
+    def __init__(self, inode: int, offset: int, head_length: int, head_hash: str, summary: LogSummary):
+        self.inode = inode
+        self.offset = offset
+        self.head_length = head_length
+        self.head_hash = head_hash
+        self.summary = summary
+
+    def to_dict(self) -> Dict:
+        return {
+            "inode": self.inode,
+            "offset": self.offset,
+            "head_length": self.head_length,
+            "head_hash": self.head_hash,
+            "summary": self.summary.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FileCheckpoint":
+        return cls(
+            data["inode"],
+            data["offset"],
+            data["head_length"],
+            data["head_hash"],
+            LogSummary.from_dict(data["summary"]),
+        )
+
+
+class CheckpointStore:
+    def __init__(
+        self,
+        sidecar_dir: Optional[str] = CHECKPOINT_CONFIG["sidecar_dir"],
+        head_bytes: int = CHECKPOINT_CONFIG["head_bytes"],
+        max_entries: int = CHECKPOINT_CONFIG["max_entries"],
+        max_bytes: int = CHECKPOINT_CONFIG["max_bytes"],
+        enabled: bool = CHECKPOINT_CONFIG["enabled"]
+    ):
+        self.sidecar_dir = sidecar_dir
+        self.head_bytes = head_bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._checkpoints = OrderedDict()  # path -> (FileCheckpoint, estimated bytes)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.evictions = 0
+        self.resumed = 0
+        self.rescanned = 0
+        self.bytes_skipped = 0
+
+    @staticmethod
+    def head_hash(file_path: str, length: int) -> str:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha1(f.read(length)).hexdigest()
+
+    def summarize(self, file_path: str, scan: Callable[..., None]) -> LogSummary:
+        """Summarize a file, resuming from its checkpoint when still valid.
+
+        scan(file_path, start, end, *aggregators) must feed the lines of
+        the byte range [start, end) into the given aggregators.
+        """
+        if not self.enabled:
+            summary = LogSummary()
+            scan(file_path, 0, None, summary)
+            return summary
+
+        st = os.stat(file_path)
+        size = st.st_size
+        checkpoint = self._load(file_path)
+        if is_compressed(file_path):
+            return self._summarize_archive(file_path, st, checkpoint, scan)
+        start = 0
+        if checkpoint is not None and self._is_valid(file_path, checkpoint, st):
+            body = checkpoint.summary.copy()
+            start = checkpoint.offset
+            with self._lock:
+                self.resumed += 1
+                self.bytes_skipped += start
+        else:
+            body = LogSummary()
+            with self._lock:
+                self.rescanned += 1
+
+        # Only complete lines go into the checkpoint; a trailing line
+        # without newline may still grow, so it is summarized separately.
+        line_end = FileHandler.last_line_end(file_path, start, size)
+        scan(file_path, start, line_end, body)
+        tail = LogSummary()
+        if line_end < size:
+            scan(file_path, line_end, size, tail)
+
+        if start == 0 or line_end > start:
+            head_length = min(self.head_bytes, line_end)
+            self._store(file_path, FileCheckpoint(
+                st.st_ino, line_end, head_length,
+                self.head_hash(file_path, head_length), body
+            ))
+
+        summary = body.copy()
+        summary.merge(tail)
+        return summary
+
+    def _summarize_archive(
+        self,
+        file_path: str,
+        st: os.stat_result,
+        checkpoint: Optional[FileCheckpoint],
+        scan: Callable[..., None]
+    ) -> LogSummary:
+        if (
+            checkpoint is not None
+            and checkpoint.offset == st.st_size
+            and self._is_valid(file_path, checkpoint, st)
+        ):
+            with self._lock:
+                self.resumed += 1
+                self.bytes_skipped += st.st_size
+            return checkpoint.summary.copy()
+        with self._lock:
+            self.rescanned += 1
+        summary = LogSummary()
+        scan(file_path, 0, None, summary)
+        head_length = min(self.head_bytes, st.st_size)
+        self._store(file_path, FileCheckpoint(
+            st.st_ino, st.st_size, head_length,
+            self.head_hash(file_path, head_length), summary
+        ))
+        return summary.copy()
+
+    def resumable(self, file_path: str) -> bool:
+        """True if a plain file has a valid checkpoint to resume from"""
+        if not self.enabled or is_compressed(file_path):
+            return False
+        checkpoint = self._load(file_path)
+        return checkpoint is not None and self._is_valid(file_path, checkpoint, os.stat(file_path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._checkpoints.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = len(self._checkpoints)
+            current_bytes = self.current_bytes
+        lookups = self.resumed + self.rescanned
+        return {
+            "entries": entries,
+            "bytes": current_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "resumed": self.resumed,
+            "rescanned": self.rescanned,
+            "hit_rate": round(self.resumed / lookups, 4) if lookups else 0.0,
+            "bytes_skipped": self.bytes_skipped,
+            "sidecar_dir": self.sidecar_dir,
+        }
+
+    def _is_valid(self, file_path: str, checkpoint: FileCheckpoint, st: os.stat_result) -> bool:
+        """Same file, not truncated, and head bytes unchanged"""
+        if checkpoint.inode != st.st_ino or st.st_size < checkpoint.offset:
+            return False
+        return self.head_hash(file_path, checkpoint.head_length) == checkpoint.head_hash
+
+    def _load(self, file_path: str) -> Optional[FileCheckpoint]:
+        with self._lock:
+            entry = self._checkpoints.get(file_path)
+            if entry is not None:
+                self._checkpoints.move_to_end(file_path)
+                return entry[0]
+        if not self.sidecar_dir:
+            return None
+        try:
+            with open(self._sidecar_path(file_path), 'r', encoding='utf-8') as f:
+                checkpoint = FileCheckpoint.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._remember(file_path, checkpoint)
+        return checkpoint
+
+    def _store(self, file_path: str, checkpoint: FileCheckpoint) -> None:
+        self._remember(file_path, checkpoint)
+        if not self.sidecar_dir:
+            return
+        Path(self.sidecar_dir).mkdir(parents=True, exist_ok=True)
+        target = self._sidecar_path(file_path)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint.to_dict(), f)
+        os.replace(temp, target)
+
+    def _remember(self, file_path: str, checkpoint: FileCheckpoint) -> None:
+        size = checkpoint.summary.estimated_size()
+        with self._lock:
+            self._discard(file_path)
+            if size > self.max_bytes:
+                return
+            self._checkpoints[file_path] = (checkpoint, size)
+            self.current_bytes += size
+            while len(self._checkpoints) > self.max_entries or self.current_bytes > self.max_bytes:
+                self._discard(next(iter(self._checkpoints)))
+                self.evictions += 1
+
+    def _discard(self, file_path: str) -> None:
+        entry = self._checkpoints.pop(file_path, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+    def _sidecar_path(self, file_path: str) -> str:
+        name = hashlib.sha1(file_path.encode('utf-8', errors='ignore')).hexdigest()
+        return str(Path(self.sidecar_dir) / f"{name}.json")
+
+
+# Shared by every LogAnalyzer in the process
+CHECKPOINTS = CheckpointStore()
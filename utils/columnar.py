@@ -0,0 +1,377 @@
+"""Columnar store of parsed log lines for repeated aggregate queries
+
+ingest() parses each file once and writes one NumPy array per column,
+plus a JSON manifest:
+
+    timestamp  int64   milliseconds since epoch, NO_TIMESTAMP if none
+    level      uint8   0 for none, else 1 + index in LEVELS
+    template   uint32  0 for none, else 1 + index of the masked
+                       ERROR/WARNING/CRITICAL message in meta["templates"]
+    length     uint32  stripped line length, as LineStats measures it
+    offset     uint64  byte offset of the line (decompressed, for archives)
+
+Queries memory-map the columns. Vectorized reductions over them rebuild
+the same aggregators a text scan fills (LevelCounter, LineStats,
+TemplateCounter, Timeline). Columnar and text results therefore merge
+and read identically. The message sketch and the online template miner
+cannot be rebuilt from these columns, so both are saved whole in the
+manifest; a time window rebuilds templates from its masked messages.
+
+A file's columns are used only while its inode, size and mtime match
+the ones recorded at ingest. Otherwise summarize() returns None and the
+caller falls back to the text path. Only the first
+max(TEMPLATE_CONFIG["max_messages"], ANOMALY_CONFIG["max_patterns"])
+distinct masked messages of a file keep their text; lines of later ones
+are reported as dropped template lines. Time windows are
+applied at millisecond resolution and, like TimeIndex, assume that
+timestamps are monotonic within a file.
+"""
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from config import ANOMALY_CONFIG, COLUMNAR_CONFIG, PARSER_CONFIG, SCAN_CONFIG, TEMPLATE_CONFIG
+from utils.archive import is_compressed
+from utils.cancellation import check_cancelled
+from utils.file_handler import FileHandler
+from utils.parallel import get_process_pool
+from utils.parser import LogParser
+from utils.statistics import (
+    LEVELS, SUMMARY_VERSION, LevelCounter, LineStats, LogSummary, MessageSketch, TemplateCounter, Timeline
+)
+
+STORE_VERSION = 1
+NO_TIMESTAMP = np.iinfo(np.int64).min
+COLUMNS = {
+    "timestamp": np.int64,
+    "level": np.uint8,
+    "template": np.uint32,
+    "length": np.uint32,
+    "offset": np.uint64,
+}
+PARTS = ("levels", "line_stats", "templates", "timeline", "sketch")
+_LEVEL_CODES = {level: code for code, level in enumerate(LEVELS, 1)}
+_ERROR_CODES = (_LEVEL_CODES["ERROR"], _LEVEL_CODES["CRITICAL"])
+
+
+def _millis(timestamp: float) -> int:
+    # The small offset keeps float error from moving whole milliseconds down
+    return math.floor(timestamp * 1000 + 1e-3)
+
+
+def _identity(st: os.stat_result) -> List[int]:
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _ingest_task(file_path: str, target: str, log_format: str, max_templates: int) -> Dict:
+    """Worker entry point: parse one file into columns under target"""
+    started = time.perf_counter()
+    st = os.stat(file_path)
+    parser = LogParser(log_format)
+    columns = {"timestamp": array('q'), "level": array('B'), "template": array('L'), "length": array('L'), "offset": array('Q')}
+    add_timestamp, add_level = columns["timestamp"].append, columns["level"].append
+    add_template, add_length, add_offset = columns["template"].append, columns["length"].append, columns["offset"].append
+    templates = {}  # masked message -> id, in first-seen order
+    examples = []
+    overflow_id = max_templates + 1
+    sketch = MessageSketch()
+    counter = TemplateCounter()
+    # Only the bytes present now; later appends make the columns stale anyway
+    end = None if is_compressed(file_path) else st.st_size
+    for offset, raw in FileHandler.iter_raw_lines(file_path, 0, end, SCAN_CONFIG["chunk_size"]):
+        for line in FileHandler._split_lines(raw):
+            record = parser.parse(line)
+            timestamp = record.timestamp
+            add_timestamp(NO_TIMESTAMP if timestamp is None else _millis(timestamp))
+            add_level(_LEVEL_CODES.get(record.level, 0))
+            key = TemplateCounter.key(record)
+            if key is None:
+                add_template(0)
+            else:
+                template_id = templates.get(key)
+                if template_id is None:
+                    if len(templates) < max_templates:
+                        template_id = templates[key] = len(templates) + 1
+                        examples.append(record.message[:200])
+                    else:
+                        template_id = overflow_id
+                add_template(template_id)
+                counter.add_keyed(record, key)
+            add_length(len(line.strip()))
+            add_offset(offset)
+            sketch.add_keyed(record, key if key is not None else MessageSketch.key(record))
+
+    temp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+    for name, dtype in COLUMNS.items():
+        values = columns[name]
+        np.save(os.path.join(temp, f"{name}.npy"), np.frombuffer(values, dtype=values.typecode).astype(dtype))
+    meta = {
+        "version": STORE_VERSION,
+        "summary_version": SUMMARY_VERSION,
+        "path": file_path,
+        "identity": _identity(st),
+        "log_format": log_format,
+        "rows": len(columns["level"]),
+        "templates": list(templates),
+        "examples": examples,
+        "overflow_id": overflow_id,
+        "sketch": sketch.to_dict(),
+        "miner": counter.to_dict(),
+    }
+    with open(os.path.join(temp, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(temp, target)
+    return {
+        "file": Path(file_path).name,
+        "rows": meta["rows"],
+        "templates": len(templates),
+        "bytes_read": st.st_size,
+        "bytes_stored": sum(entry.stat().st_size for entry in os.scandir(target)),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class FileColumns:
+    """Memory-mapped columns of one ingested file"""
+
+    def __init__(self, directory: str, meta: Dict):
+        self.meta = meta
+        self.rows = meta["rows"]
+        for name in COLUMNS:
+            path = os.path.join(directory, f"{name}.npy")
+            # Empty arrays cannot be mapped
+            setattr(self, name, np.load(path, mmap_mode='r') if self.rows else np.load(path))
+
+    def select(self, window) -> Optional[np.ndarray]:
+        """Row indexes inside window (None selects every row)"""
+        if window is None:
+            return None
+        timestamp = np.asarray(self.timestamp)
+        timed = timestamp != NO_TIMESTAMP
+        stop = self.rows
+        if window.until is not None:
+            # Reading stops at the first record past the window, as in TimeIndex
+            past = np.flatnonzero(timed & (timestamp > _millis(window.until)))
+            if len(past):
+                stop = int(past[0])
+        if window.since is None:
+            return np.arange(stop)
+        # Untimed lines belong to the window of the last timestamp before them
+        last = np.where(timed[:stop], np.arange(stop), -1)
+        np.maximum.accumulate(last, out=last)
+        current = np.where(last >= 0, timestamp[np.maximum(last, 0)], NO_TIMESTAMP)
+        return np.flatnonzero(current >= _millis(window.since))
+
+    @staticmethod
+    def _take(column: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        return np.asarray(column) if rows is None else np.asarray(column)[rows]
+
+    def levels(self, rows: Optional[np.ndarray]) -> LevelCounter:
+        counts = np.bincount(self._take(self.level, rows), minlength=len(LEVELS) + 1)
+        counter = LevelCounter()
+        for level, code in _LEVEL_CODES.items():
+            counter.counts[level] = int(counts[code])
+        return counter
+
+    def line_stats(self, rows: Optional[np.ndarray]) -> LineStats:
+        length = self._take(self.length, rows)
+        stats = LineStats()
+        if len(length):
+            stats.total_lines = int(len(length))
+            stats.non_empty_lines = int(np.count_nonzero(length))
+            stats.length_total = int(length.sum(dtype=np.uint64))
+            stats.min_length = int(length.min())
+            stats.max_length = int(length.max())
+        return stats
+
+    def _first_seen(self, ids: np.ndarray) -> np.ndarray:
+        """Distinct non-zero ids in order of first occurrence"""
+        distinct, first = np.unique(ids, return_index=True)
+        ordered = distinct[np.argsort(first, kind="stable")]
+        return ordered[(ordered != 0) & (ordered != self.meta["overflow_id"])]
+
+    def templates(self, rows: Optional[np.ndarray]) -> TemplateCounter:
+        if rows is None:
+            return TemplateCounter.from_dict(self.meta["miner"])
+        ids = self._take(self.template, rows)
+        counts = np.bincount(ids, minlength=self.meta["overflow_id"] + 1)
+        keys, examples = self.meta["templates"], self.meta["examples"]
+        counter = TemplateCounter()
+        for template_id in self._first_seen(ids).tolist():
+            counter.add_count(keys[template_id - 1], int(counts[template_id]), examples[template_id - 1])
+        counter.miner.dropped += int(counts[self.meta["overflow_id"]])
+        return counter
+
+    def timeline(self, rows: Optional[np.ndarray]) -> Timeline:
+        timeline = Timeline()
+        timestamp = self._take(self.timestamp, rows)
+        timed = timestamp != NO_TIMESTAMP
+        buckets = timestamp[timed] // (timeline.bucket_seconds * 1000)
+        levels = self._take(self.level, rows)[timed]
+        ids = self._take(self.template, rows)[timed]
+        timeline.lines = self._bucket_counts(buckets)
+        timeline.errors = self._bucket_counts(buckets[np.isin(levels, _ERROR_CODES)])
+        leveled = levels != 0
+        pairs, counts = np.unique(buckets[leveled] * 8 + (levels[leveled] - 1), return_counts=True)
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            bucket, index = divmod(pair, 8)
+            timeline.levels.setdefault(bucket, [0] * len(LEVELS))[index] = count
+        # Patterns are admitted in order of first timestamped occurrence
+        keys = self.meta["templates"]
+        admitted = self._first_seen(ids)[:timeline.max_patterns]
+        tracked = np.isin(ids, admitted)
+        pairs, counts = np.unique(
+            (ids[tracked].astype(np.int64) << 32) | (buckets[tracked] & 0xFFFFFFFF), return_counts=True
+        )
+        series = {}
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            bucket = pair & 0xFFFFFFFF
+            series.setdefault(pair >> 32, {})[bucket - (1 << 32) if bucket >= 1 << 31 else bucket] = count
+        timeline.patterns = {keys[template_id - 1]: series[template_id] for template_id in admitted.tolist()}
+        return timeline
+
+    @staticmethod
+    def _bucket_counts(buckets: np.ndarray) -> Dict[int, int]:
+        distinct, counts = np.unique(buckets, return_counts=True)
+        return dict(zip(distinct.tolist(), counts.tolist()))
+
+    def sketch(self, rows: Optional[np.ndarray]) -> Optional[MessageSketch]:
+        # Saved for the whole file only
+        return MessageSketch.from_dict(self.meta["sketch"]) if rows is None else None
+
+
+class ColumnStore:
+    def __init__(
+        self,
+        store_dir: Optional[str] = COLUMNAR_CONFIG["store_dir"],
+        enabled: bool = COLUMNAR_CONFIG["enabled"],
+        max_open: int = COLUMNAR_CONFIG["max_open"],
+        max_templates: int = max(TEMPLATE_CONFIG["max_messages"], ANOMALY_CONFIG["max_patterns"])
+    ):
+        self.store_dir = store_dir or os.path.join(tempfile.gettempdir(), "log_analyzer_columns")
+        self.enabled = enabled
+        self.max_open = max_open
+        self.max_templates = max_templates
+        self._open = OrderedDict()  # file path -> (identity, FileColumns)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.missing = 0
+
+    def _directory(self, file_path: str) -> str:
+        name = hashlib.sha1(str(Path(file_path).resolve()).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.store_dir, name)
+
+    def ingest(self, log_files: Sequence, log_format: str = PARSER_CONFIG["format"], force: bool = False) -> List[Dict]:
+        """Parse files into columns, in worker processes; fresh files are skipped unless force"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        results = {}
+        futures = {}
+        pool = get_process_pool()
+        for log_file in log_files:
+            path = str(log_file)
+            if not force and self.columns(path, log_format, count=False) is not None:
+                results[path] = {"file": Path(path).name, "skipped": "up to date"}
+                continue
+            futures[path] = pool.submit(_ingest_task, path, self._directory(path), log_format, self.max_templates)
+        try:
+            for path, future in futures.items():
+                check_cancelled()
+                results[path] = future.result()
+                with self._lock:
+                    self._open.pop(path, None)
+        finally:
+            for future in futures.values():
+                future.cancel()
+        return [results[str(log_file)] for log_file in log_files]
+
+    def columns(self, file_path: str, log_format: str = PARSER_CONFIG["format"], count: bool = True) -> Optional[FileColumns]:
+        """Columns of file_path if ingested and unchanged since, else None"""
+        if not self.enabled:
+            return None
+        try:
+            identity = _identity(os.stat(file_path))
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._open.get(file_path)
+            if entry is not None and entry[0] == identity:
+                self._open.move_to_end(file_path)
+                self.hits += count
+                return entry[1]
+        directory = self._directory(file_path)
+        try:
+            with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self.missing += count
+            return None
+        if (
+            meta.get("version") != STORE_VERSION
+            or meta.get("summary_version") != SUMMARY_VERSION
+            or meta.get("identity") != identity
+            or meta.get("log_format") != log_format
+        ):
+            self.stale += count
+            return None
+        try:
+            columns = FileColumns(directory, meta)
+        except (OSError, ValueError):
+            self.missing += count
+            return None
+        with self._lock:
+            self._open[file_path] = (identity, columns)
+            self._open.move_to_end(file_path)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+            self.hits += count
+        return columns
+
+    def summarize(
+        self,
+        file_path: str,
+        parts: Sequence[str],
+        window=None,
+        log_format: str = PARSER_CONFIG["format"]
+    ) -> Optional[LogSummary]:
+        """LogSummary with parts filled from columns; None if the text path must be used"""
+        columns = self.columns(file_path, log_format)
+        if columns is None:
+            return None
+        rows = columns.select(window)
+        summary = LogSummary()
+        for part in parts:
+            value = getattr(columns, part)(rows)
+            if value is None:
+                return None
+            setattr(summary, part, value)
+        return summary
+
+    def stats(self) -> Dict:
+        with self._lock:
+            opened = len(self._open)
+        lookups = self.hits + self.stale + self.missing
+        return {
+            "open": opened,
+            "hits": self.hits,
+            "stale": self.stale,
+            "missing": self.missing,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "store_dir": self.store_dir,
+        }
+
+
+# Shared by every LogAnalyzer in the process
+COLUMN_STORE = ColumnStore()
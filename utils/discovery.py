@@ -0,0 +1,214 @@
+"""Log file discovery
+
+Directories are walked with os.scandir (optionally recursively) and each
+candidate is stat'ed once; that stat is reused for ordering. The result
+is kept as a manifest together with the mtime of every directory walked.
+Adding, removing or renaming a file changes its directory's mtime, so a
+manifest whose directories all kept their mtimes still lists the right
+files and is reused without walking again. Directories modified within
+RACY_NS of the walk are not trusted, since a later change in the same
+timestamp tick would go unnoticed.
+"""
+from collections import OrderedDict
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import time
+from config import DISCOVERY_CONFIG
+from utils.archive import is_log_name, rotation_key
+
+RACY_NS = 1_000_000_000
+
+
+class LogFileEntry:
+    __slots__ = ("path", "chain", "rotation", "size", "mtime", "inode")
+
+    def __init__(self, path: str, chain: Tuple[str, str], rotation: int, st: os.stat_result):
+        self.path = path
+        self.chain = chain  # (relative directory, rotation base name)
+        self.rotation = rotation  # 0 for the live file
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self.inode = st.st_ino
+
+    def restat(self) -> "LogFileEntry":
+        return LogFileEntry(self.path, self.chain, self.rotation, os.stat(self.path))
+
+
+class _Manifest:
+    __slots__ = ("directories", "entries", "trusted", "_paths")
+
+    def __init__(self, directories: Dict[str, int], entries: List[LogFileEntry], trusted: bool):
+        self.directories = directories  # directory -> mtime_ns when walked
+        self.entries = LogDiscovery.order(entries)
+        self.trusted = trusted
+        self._paths = None
+
+    def paths(self, file_limit: Optional[int] = None) -> List[Path]:
+        if file_limit is not None:
+            return [Path(entry.path) for entry in self.entries[:file_limit]]
+        if self._paths is None:
+            self._paths = [Path(entry.path) for entry in self.entries]
+        return list(self._paths)
+
+
+class LogDiscovery:
+    def __init__(
+        self,
+        recursive: bool = DISCOVERY_CONFIG["recursive"],
+        include: Optional[Sequence[str]] = DISCOVERY_CONFIG["include"],
+        exclude: Sequence[str] = DISCOVERY_CONFIG["exclude"],
+        max_depth: Optional[int] = DISCOVERY_CONFIG["max_depth"],
+        max_manifests: int = DISCOVERY_CONFIG["max_manifests"],
+        enabled: bool = DISCOVERY_CONFIG["manifest"]
+    ):
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.max_manifests = max_manifests
+        self.enabled = enabled
+        self._manifests = OrderedDict()  # (root, options) -> _Manifest
+        self._lock = threading.Lock()
+        self.walks = 0
+        self.reuses = 0
+
+    def find(
+        self,
+        directory: str,
+        file_limit: Optional[int] = None,
+        recursive: Optional[bool] = None,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None
+    ) -> List[Path]:
+        """Log files under directory, newest rotation chain first.
+
+        file_limit=None returns every file; a number returns the newest N.
+        """
+        root = Path(directory)
+        if not root.is_dir():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+        recursive = self.recursive if recursive is None else recursive
+        include = tuple((self.include if include is None else include) or ())
+        exclude = tuple((self.exclude if exclude is None else exclude) or ())
+        key = (str(root.resolve()), recursive, include, exclude)
+
+        manifest = self._cached(key)
+        if manifest is None:
+            manifest = self._walk(str(root), recursive, include, exclude)
+            self._remember(key, manifest)
+        elif file_limit is not None:
+            # Same files, but appends may have changed which are newest
+            entries = self.order(self._restat(manifest.entries))
+            return [Path(entry.path) for entry in entries[:file_limit]]
+        return manifest.paths(file_limit)
+
+    @staticmethod
+    def order(entries: List[LogFileEntry]) -> List[LogFileEntry]:
+        """Chains by their newest member; live file, .1, .2, ... within a chain"""
+        newest = {}
+        for entry in entries:
+            if entry.mtime > newest.get(entry.chain, -1.0):
+                newest[entry.chain] = entry.mtime
+        return sorted(entries, key=lambda entry: (-newest[entry.chain], entry.chain, entry.rotation, -entry.mtime))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._manifests.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            manifests = len(self._manifests)
+        lookups = self.walks + self.reuses
+        return {
+            "manifests": manifests,
+            "walks": self.walks,
+            "reuses": self.reuses,
+            "hit_rate": round(self.reuses / lookups, 4) if lookups else 0.0,
+        }
+
+    def _cached(self, key: Tuple) -> Optional[_Manifest]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            manifest = self._manifests.get(key)
+        if manifest is None or not manifest.trusted:
+            return None
+        for directory, mtime_ns in manifest.directories.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime_ns:
+                    return None
+            except OSError:
+                return None
+        with self._lock:
+            self._manifests.move_to_end(key)
+            self.reuses += 1
+        return manifest
+
+    def _remember(self, key: Tuple, manifest: _Manifest) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._manifests[key] = manifest
+            self._manifests.move_to_end(key)
+            while len(self._manifests) > self.max_manifests:
+                self._manifests.popitem(last=False)
+
+    def _walk(self, root: str, recursive: bool, include: Tuple, exclude: Tuple) -> _Manifest:
+        started = time.time_ns()
+        directories = {}
+        entries = []
+        pending = [(root, "", 0)]
+        while pending:
+            directory, prefix, depth = pending.pop()
+            try:
+                directories[directory] = os.stat(directory).st_mtime_ns
+                scan = os.scandir(directory)
+            except OSError:
+                continue  # vanished or unreadable
+            with scan:
+                for item in scan:
+                    relative = f"{prefix}{item.name}"
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            if recursive and (self.max_depth is None or depth < self.max_depth):
+                                if not self._excluded(relative, item.name, exclude):
+                                    pending.append((item.path, f"{relative}/", depth + 1))
+                            continue
+                        if not item.is_file() or not self._selected(relative, item.name, include, exclude):
+                            continue
+                        base, rotation = rotation_key(item.name)
+                        entries.append(LogFileEntry(item.path, (prefix, base), rotation, item.stat()))
+                    except OSError:
+                        continue
+        self.walks += 1
+        trusted = all(mtime_ns < started - RACY_NS for mtime_ns in directories.values())
+        return _Manifest(directories, entries, trusted)
+
+    @staticmethod
+    def _restat(entries: List[LogFileEntry]) -> List[LogFileEntry]:
+        fresh = []
+        for entry in entries:
+            try:
+                fresh.append(entry.restat())
+            except OSError:
+                continue
+        return fresh
+
+    @staticmethod
+    def _excluded(relative: str, name: str, exclude: Tuple) -> bool:
+        return any(fnmatch(relative, pattern) or fnmatch(name, pattern) for pattern in exclude)
+
+    @staticmethod
+    def _selected(relative: str, name: str, include: Tuple, exclude: Tuple) -> bool:
+        if LogDiscovery._excluded(relative, name, exclude):
+            return False
+        if include:
+            return any(fnmatch(relative, pattern) or fnmatch(name, pattern) for pattern in include)
+        return is_log_name(name)
+
+
+# Shared by every LogAnalyzer in the process
+DISCOVERY = LogDiscovery()
@@ -0,0 +1,154 @@
+"""Async execution of tool calls on a bounded thread pool
+
+Each call runs in a worker thread under its own CancelToken, behind a
+per-tool semaphore. A call that exceeds its timeout, or whose every
+caller went away, is cancelled cooperatively: the scan stops at its next
+chunk and the slot is released once the thread has actually finished.
+Identical concurrent calls (same tool, same arguments) share one run.
+A profiled call always runs on its own and returns its hot functions
+under "profile".
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import threading
+from config import EXECUTOR_CONFIG
+from utils.cancellation import CancelToken, bind
+from utils.metrics import profile_call
+
+
+class _Call:
+    __slots__ = ("task", "token", "waiters")
+
+    def __init__(self, token: CancelToken):
+        self.task = None
+        self.token = token
+        self.waiters = 0
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        workers: int = EXECUTOR_CONFIG["workers"],
+        limits: Dict = EXECUTOR_CONFIG["tools"],
+        default_timeout: Optional[float] = EXECUTOR_CONFIG["default_timeout"],
+        default_max_concurrent: int = EXECUTOR_CONFIG["default_max_concurrent"]
+    ):
+        self.workers = workers
+        self.limits = limits
+        self.default_timeout = default_timeout
+        self.default_max_concurrent = default_max_concurrent
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._semaphores = {}  # tool name -> asyncio.Semaphore
+        self._inflight = {}  # (tool name, key) -> _Call
+        self.calls = 0
+        self.deduplicated = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="log-tool")
+            return self._pool
+
+    def _limits(self, name: str) -> Tuple[int, Optional[float], bool]:
+        """(max concurrent, timeout, dedup) of a tool"""
+        limits = self.limits.get(name, {})
+        return (
+            limits.get("max_concurrent", self.default_max_concurrent),
+            limits.get("timeout", self.default_timeout),
+            limits.get("dedup", True),
+        )
+
+    async def run(self, name: str, function: Callable, *args, key: Optional[Hashable] = None, profile: bool = False):
+        """Run function(*args) off the event loop under the limits of tool name.
+
+        Calls with the same name and key while one is running share its result.
+        """
+        max_concurrent, timeout, dedup = self._limits(name)
+        if profile:
+            function = self._profiled(function)
+            dedup = False
+        inflight_key = (name, key) if dedup and key is not None else None
+        call = self._inflight.get(inflight_key) if inflight_key is not None else None
+        if call is None:
+            call = _Call(CancelToken())
+            call.task = asyncio.ensure_future(
+                self._execute(name, function, args, call.token, max_concurrent, timeout)
+            )
+            if inflight_key is not None:
+                self._inflight[inflight_key] = call
+                call.task.add_done_callback(lambda _: self._forget(inflight_key, call))
+            self.calls += 1
+        else:
+            self.deduplicated += 1
+
+        call.waiters += 1
+        try:
+            # Shielded so one caller going away does not cancel the shared run
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.token.cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def _execute(
+        self,
+        name: str,
+        function: Callable,
+        args: tuple,
+        token: CancelToken,
+        max_concurrent: int,
+        timeout: Optional[float]
+    ):
+        async with self._semaphore(name, max_concurrent):
+            if token.cancelled:
+                return {"error": f"{name} was cancelled"}
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), bind(function, token), *args)
+            done, _ = await asyncio.wait({future}, timeout=timeout)
+            if not done:
+                token.cancel()
+                self.timeouts += 1
+                # Hold the slot until the scan notices and stops
+                await asyncio.wait({future})
+                return {"error": f"{name} timed out after {timeout} seconds"}
+            return future.result()
+
+    @staticmethod
+    def _profiled(function: Callable) -> Callable:
+        def run(*args):
+            result, profile = profile_call(function, *args)
+            if not isinstance(result, dict):
+                result = {"result": result}
+            return {**result, "profile": profile}
+        return run
+
+    def _semaphore(self, name: str, max_concurrent: int) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(max_concurrent)
+        return semaphore
+
+    def _forget(self, inflight_key: Tuple, call: _Call) -> None:
+        if self._inflight.get(inflight_key) is call:
+            del self._inflight[inflight_key]
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
+
+
+# Shared by every tool of the server
+TOOL_EXECUTOR = ToolExecutor()
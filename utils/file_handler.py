@@ -1,41 +1,117 @@
 """File handling utilities"""
+from collections import deque
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import io
 import os
+from config import SCAN_CONFIG, EXTRACT_CONFIG
+from utils.archive import GZIP_INDEXES, is_compressed, iter_decompressed
+from utils.cancellation import ScanCancelled, check_cancelled
+from utils.discovery import DISCOVERY
+from utils.metrics import METRICS
 
 class FileHandler:
     @staticmethod
-    def get_log_files(directory: str, file_limit: int = 5) -> List[Path]:
-        """Get log files from directory, sorted by modification time (newest first)"""
-        log_dir = Path(directory)
-        
-        if not log_dir.exists():
-            raise FileNotFoundError(f"Directory not found: {directory}")
-        
-        # Find all .log and .txt files
-        log_files = list(log_dir.glob("*.log")) + list(log_dir.glob("*.txt"))
-        
-        # Sort by modification time (newest first)
-        log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-        
-        # Limit results
-        return log_files[:file_limit]
+    @METRICS.timed("discovery")
+    def get_log_files(directory: str, file_limit: Optional[int] = None, **options) -> List[Path]:
+        """Get log files from directory, newest rotation chain first.
+
+        file_limit=None returns all files, a number the newest N; options
+        (recursive, include, exclude) override DISCOVERY_CONFIG.
+        """
+        return DISCOVERY.find(directory, file_limit, **options)
 
     @staticmethod
     def read_file(file_path: str, lines: int = 100) -> List[str]:
         """Read last N lines from file"""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                all_lines = f.readlines()
-            
-            # Get last N lines
-            return all_lines[-lines:] if len(all_lines) > lines else all_lines
+            if lines <= 0:
+                # Slicing semantics of the full read for non-positive counts
+                all_lines = FileHandler.read_all_lines(file_path)
+                return all_lines[-lines:] if len(all_lines) > lines else all_lines
+            if is_compressed(file_path):
+                return FileHandler._tail_compressed(file_path, lines)
+            return FileHandler._tail(file_path, lines)
         except Exception as e:
             raise IOError(f"Error reading file {file_path}: {str(e)}")
 
     @staticmethod
-    def write_file(file_path: str, content: List[str]) -> bool:
-        """Write content to file"""
+    def _tail(
+        file_path: str,
+        lines: int,
+        block_size: int = SCAN_CONFIG["tail_block_size"]
+    ) -> List[str]:
+        """Read blocks backwards from EOF until N lines are available"""
+        with open(file_path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            blocks = []
+            # Every b"\n" ends at least one text line (lone \r may end more),
+            # so N + 1 of them guarantee N complete lines after the first.
+            found = 0
+            while pos > 0 and found <= lines:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                found += block.count(b"\n")
+                blocks.append(block)
+
+        data = b"".join(reversed(blocks))
+        if pos > 0:
+            # Drop the partial first line; cutting after a b"\n" never
+            # splits a UTF-8 sequence or a \r\n pair.
+            data = data[data.find(b"\n") + 1:]
+        return list(FileHandler._split_lines(data))[-lines:]
+
+    @staticmethod
+    def tail_offset(
+        file_path: str,
+        lines: int,
+        block_size: int = SCAN_CONFIG["tail_block_size"]
+    ) -> int:
+        """Offset at which the last N lines (counted by b"\n") begin"""
+        with open(file_path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            if pos == 0:
+                return 0
+            f.seek(pos - 1)
+            # A trailing newline ends the last line rather than starting one
+            needed = lines + 1 if f.read(1) == b"\n" else lines
+            while pos > 0:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                count = block.count(b"\n")
+                if count >= needed:
+                    cut = len(block)
+                    for _ in range(needed):
+                        cut = block.rfind(b"\n", 0, cut)
+                    return pos + cut + 1
+                needed -= count
+        return 0
+
+    @staticmethod
+    def _tail_compressed(file_path: str, lines: int) -> List[str]:
+        """Last N lines of an archive, reading back from its seek index if any"""
+        index = GZIP_INDEXES.get(file_path)
+        if index is None or index.size is None:
+            return list(deque(FileHandler.iter_lines(file_path), maxlen=lines))
+        # Regions between index points are line aligned; read them newest first
+        collected = []
+        end = index.size
+        for start in reversed([0] + index.line_starts()):
+            if start >= end:
+                continue
+            collected = list(FileHandler.iter_lines(file_path, start=start, end=end)) + collected
+            if len(collected) >= lines:
+                break
+            end = start
+        return collected[-lines:]
+
+    @staticmethod
+    def write_file(file_path: str, content: Iterable[str]) -> bool:
+        """Write content to file (lines are written as they are produced)"""
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.writelines(content)
@@ -47,7 +123,200 @@ class FileHandler:
     def read_all_lines(file_path: str) -> List[str]:
         """Read all lines from file"""
         try:
+            if is_compressed(file_path):
+                return list(FileHandler.iter_lines(file_path))
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 return f.readlines()
         except Exception as e:
             raise IOError(f"Error reading file {file_path}: {str(e)}")
+
+
+    @staticmethod
+    def iter_lines(
+        file_path: str,
+        chunk_size: int = SCAN_CONFIG["chunk_size"],
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[str]:
+        """Stream lines from file, reading it in fixed-size chunks.
+
+        Yields the same lines as read_all_lines (universal newlines,
+        undecodable bytes dropped) while holding at most one chunk in memory.
+        start/end restrict the scan to a byte range; start must be 0 or
+        just past a newline.
+        """
+        counting = METRICS.enabled
+        lines = 0
+        try:
+            remainder = b""
+            for chunk in FileHandler._chunks(file_path, start, end, chunk_size):
+                buffer = remainder + chunk
+                cut = buffer.rfind(b"\n") + 1
+                if not cut:
+                    remainder = buffer
+                    continue
+                remainder = buffer[cut:]
+                if counting:
+                    lines += buffer.count(b"\n", 0, cut)
+                yield from FileHandler._split_lines(buffer[:cut])
+            if remainder:
+                lines += 1
+                yield from FileHandler._split_lines(remainder)
+        except ScanCancelled:
+            raise
+        except Exception as e:
+            raise IOError(f"Error reading file {file_path}: {str(e)}")
+        finally:
+            if counting:
+                METRICS.count("decode" if is_compressed(file_path) else "read", lines=lines)
+
+    @staticmethod
+    def iter_raw_lines(
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = SCAN_CONFIG["tail_block_size"]
+    ) -> Iterator[Tuple[int, bytes]]:
+        """Stream (offset, raw bytes) for each newline-terminated line in [start, end)"""
+        offset = start
+        remainder = b""
+        for chunk in FileHandler._chunks(file_path, start, end, chunk_size):
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                yield offset, line + b"\n"
+                offset += len(line) + 1
+        if remainder:
+            yield offset, remainder
+
+    @staticmethod
+    def _chunks(file_path: str, start: int, end: Optional[int], chunk_size: int) -> Iterator[bytes]:
+        """Bytes of [start, end), decompressed for archives, one chunk at a time"""
+        remaining = None if end is None else max(end - start, 0)
+        if is_compressed(file_path):
+            chunks = METRICS.timed_chunks("decode", iter_decompressed(file_path, start))
+        else:
+            chunks = METRICS.timed_chunks("read", FileHandler._read_chunks(file_path, start, chunk_size, remaining))
+        for chunk in chunks:
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            yield chunk
+            if remaining is not None and remaining <= 0:
+                break
+
+    @staticmethod
+    def _read_chunks(file_path: str, start: int, chunk_size: int, remaining: Optional[int]) -> Iterator[bytes]:
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            while remaining is None or remaining > 0:
+                check_cancelled()
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def last_line_end(
+        file_path: str,
+        start: int,
+        end: int,
+        block_size: int = SCAN_CONFIG["tail_block_size"]
+    ) -> int:
+        """Offset just past the last newline in [start, end), or start if none"""
+        with open(file_path, 'rb') as f:
+            pos = end
+            while pos > start:
+                step = min(block_size, pos - start)
+                pos -= step
+                f.seek(pos)
+                index = f.read(step).rfind(b"\n")
+                if index >= 0:
+                    return pos + index + 1
+        return start
+
+    @staticmethod
+    def next_line_start(
+        file_path: str,
+        offset: int,
+        end: int,
+        block_size: int = SCAN_CONFIG["tail_block_size"]
+    ) -> int:
+        """Offset just past the first newline at or after offset, capped at end"""
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            pos = offset
+            while pos < end:
+                block = f.read(min(block_size, end - pos))
+                if not block:
+                    break
+                index = block.find(b"\n")
+                if index >= 0:
+                    return pos + index + 1
+                pos += len(block)
+        return end
+
+    @staticmethod
+    def _split_lines(data: bytes) -> Iterator[str]:
+        """Decode a newline-aligned block and split it like text-mode reads"""
+        # Cutting on b"\n" never splits a UTF-8 sequence, so decoding the
+        # block drops exactly the bytes a text-mode read would drop.
+        return iter(io.StringIO(data.decode('utf-8', errors='ignore'), newline=None))
+
+
+class LineWriter:
+    """Buffered line writer; with split=True, one file per key next to path.
+
+    Split files are named after path with the key before the suffix
+    (critical.log -> critical.ERROR.log) and created on first use; an
+    unsplit output is created up front, even if nothing is written.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        split: bool = False,
+        buffer_bytes: int = EXTRACT_CONFIG["buffer_bytes"]
+    ):
+        self.file_path = Path(file_path)
+        self.split = split
+        self.buffer_bytes = buffer_bytes
+        self._files = {}  # key -> open file
+        self.paths = {}  # key -> path written
+        if not split:
+            self._open(None)
+
+    def path_for(self, key: Optional[str]) -> Path:
+        if not self.split:
+            return self.file_path
+        return self.file_path.with_name(f"{self.file_path.stem}.{key}{self.file_path.suffix}")
+
+    def _open(self, key: Optional[str]):
+        path = self.path_for(key)
+        try:
+            f = open(path, 'w', encoding='utf-8', buffering=self.buffer_bytes)
+        except Exception as e:
+            raise IOError(f"Error writing file {path}: {str(e)}")
+        self._files[key] = f
+        self.paths[key] = str(path)
+        return f
+
+    def write(self, line: str, key: Optional[str] = None) -> None:
+        key = key if self.split else None
+        f = self._files.get(key)
+        if f is None:
+            f = self._open(key)
+        f.write(line)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self) -> "LineWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,320 @@
+"""Follow mode: live sliding-window aggregates over growing log files
+
+A FollowSession polls the stat of every file get_log_files returns and
+reads only the complete lines appended since its last poll. Records are
+counted into time buckets (by arrival time), and running totals for each
+sliding window are updated as buckets enter and leave it, so reading the
+aggregates costs the same however many lines have been seen. Read
+offsets belong to the file (device and inode), not its path: when app.log
+is renamed to app.log.1 the session keeps reading app.log.1 where it
+stopped, and the new app.log (a new inode at a known path, a rotation)
+is read from its beginning, as is a file that shrank below its offset
+(truncation). A session nobody has read for idle_timeout
+seconds stops itself from its own poll loop.
+"""
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import itertools
+import os
+import threading
+import time
+from config import FOLLOW_CONFIG, SCAN_CONFIG, PARSER_CONFIG
+from utils.archive import is_compressed
+from utils.file_handler import FileHandler
+from utils.parser import LogParser, LogRecord
+from utils.statistics import LEVELS, TemplateCounter
+
+
+class _Bucket:
+    __slots__ = ("index", "lines", "levels", "templates", "overflow")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.lines = 0
+        self.levels = Counter()
+        self.templates = Counter()
+        self.overflow = 0  # template lines dropped by the max_templates cap
+
+
+class _WindowTotals:
+    __slots__ = ("lines", "levels", "templates", "overflow", "buckets")
+
+    def __init__(self):
+        self.lines = 0
+        self.levels = Counter()
+        self.templates = Counter()
+        self.overflow = 0
+        self.buckets = deque()  # buckets currently inside the window
+
+
+class SlidingWindows:
+    """Per-level and per-template counts over several trailing windows"""
+
+    def __init__(
+        self,
+        windows: List[int] = FOLLOW_CONFIG["windows"],
+        bucket_seconds: int = FOLLOW_CONFIG["bucket_seconds"],
+        max_templates: int = FOLLOW_CONFIG["max_templates"]
+    ):
+        self.windows = sorted(windows)
+        self.bucket_seconds = bucket_seconds
+        self.max_templates = max_templates
+        self.totals = {window: _WindowTotals() for window in self.windows}
+        self.lines_seen = 0
+
+    def add(self, record: LogRecord, now: float) -> None:
+        bucket = self._bucket(now)
+        key = TemplateCounter.key(record)
+        if key is not None and key not in bucket.templates:
+            # The widest window holds every live template
+            live = self.totals[self.windows[-1]].templates
+            if key not in live and len(live) >= self.max_templates:
+                key = None
+                bucket.overflow += 1
+                for totals in self.totals.values():
+                    totals.overflow += 1
+        bucket.lines += 1
+        bucket.levels[record.level] += 1
+        if key is not None:
+            bucket.templates[key] += 1
+        for totals in self.totals.values():
+            totals.lines += 1
+            totals.levels[record.level] += 1
+            if key is not None:
+                totals.templates[key] += 1
+        self.lines_seen += 1
+
+    def _bucket(self, now: float) -> _Bucket:
+        index = int(now // self.bucket_seconds)
+        newest = self.totals[self.windows[0]].buckets
+        if newest and newest[-1].index == index:
+            return newest[-1]
+        self.expire(now)
+        bucket = _Bucket(index)
+        for totals in self.totals.values():
+            totals.buckets.append(bucket)
+        return bucket
+
+    def expire(self, now: float) -> None:
+        """Subtract buckets that have left each window"""
+        current = int(now // self.bucket_seconds)
+        for window, totals in self.totals.items():
+            oldest = current - window // self.bucket_seconds
+            while totals.buckets and totals.buckets[0].index <= oldest:
+                bucket = totals.buckets.popleft()
+                totals.lines -= bucket.lines
+                totals.overflow -= bucket.overflow
+                self._subtract(totals.levels, bucket.levels)
+                self._subtract(totals.templates, bucket.templates)
+
+    @staticmethod
+    def _subtract(total: Counter, part: Counter) -> None:
+        for key, count in part.items():
+            remaining = total[key] - count
+            if remaining > 0:
+                total[key] = remaining
+            else:
+                del total[key]
+
+    def result(self, now: float, top_n: int = FOLLOW_CONFIG["top_templates"]) -> Dict:
+        self.expire(now)
+        windows = {}
+        for window, totals in self.totals.items():
+            windows[f"{window}s"] = {
+                "lines": totals.lines,
+                "lines_per_second": round(totals.lines / window, 3),
+                "levels": {level: totals.levels.get(level, 0) for level in LEVELS},
+                "top_templates": [
+                    {"template": template, "count": count}
+                    for template, count in totals.templates.most_common(top_n)
+                ],
+                "untracked_template_lines": totals.overflow,
+            }
+        return windows
+
+
+class _FileState:
+    __slots__ = ("path", "offset")
+
+    def __init__(self, path: str, offset: int):
+        self.path = path  # where the file was last seen
+        self.offset = offset  # just past the last complete line consumed
+
+
+class FollowSession:
+    def __init__(
+        self,
+        directory: str,
+        file_limit: int = 5,
+        poll_interval: float = FOLLOW_CONFIG["poll_interval"],
+        idle_timeout: Optional[float] = FOLLOW_CONFIG["idle_timeout"],
+        from_start: bool = False,
+        log_format: str = PARSER_CONFIG["format"],
+        chunk_size: int = SCAN_CONFIG["chunk_size"]
+    ):
+        self.directory = directory
+        self.file_limit = file_limit
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.parser = LogParser(log_format)
+        self.chunk_size = chunk_size
+        self.windows = SlidingWindows()
+        self.files = {}  # (st_dev, st_ino) -> _FileState
+        self.started = time.time()
+        self.last_read = self.started
+        self.polls = 0
+        self.rotations = 0
+        self.truncations = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Existing content is skipped unless asked for, like tail -f
+        self.poll(skip_existing=not from_start)
+
+    def start(self, on_idle: Optional[Callable[[], None]] = None) -> None:
+        """Poll in a daemon thread; on_idle runs once if the session stops for being idle"""
+        self._thread = threading.Thread(target=self._run, args=(on_idle,), name="log-follow", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.poll_interval + 5)
+
+    @property
+    def idle(self) -> bool:
+        return self.idle_timeout is not None and time.time() - self.last_read > self.idle_timeout
+
+    def _run(self, on_idle: Optional[Callable[[], None]]) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self.idle:
+                self._stop.set()
+                if on_idle is not None:
+                    on_idle()
+                return
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def poll(self, skip_existing: bool = False) -> None:
+        """Consume the complete lines appended to each file since the last poll"""
+        log_files = FileHandler.get_log_files(self.directory, self.file_limit)
+        known_paths = {state.path for state in self.files.values()}
+        current = {}
+        for log_file in log_files:
+            path = str(Path(log_file).resolve())
+            if is_compressed(path):
+                continue  # archives do not grow
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed between listing and stat
+            key = (st.st_dev, st.st_ino)
+            state = self.files.get(key)
+            if state is None:
+                if path in known_paths:
+                    self.rotations += 1  # a new file where another one was
+                offset = FileHandler.last_line_end(path, 0, st.st_size) if skip_existing else 0
+                state = _FileState(path, offset)
+            elif st.st_size < state.offset:
+                state.offset = 0
+                self.truncations += 1
+            state.path = path  # renamed files keep their offset
+            current[key] = state
+            if st.st_size > state.offset:
+                self._consume(path, state, st.st_size)
+        self.files = current
+        self.polls += 1
+
+    def _consume(self, path: str, state: _FileState, size: int) -> None:
+        # A trailing line without newline may still grow; leave it for later
+        end = FileHandler.last_line_end(path, state.offset, size)
+        if end <= state.offset:
+            return
+        records = self.parser.records(FileHandler.iter_lines(path, self.chunk_size, state.offset, end))
+        now = time.time()
+        with self._lock:
+            for record in records:
+                self.windows.add(record, now)
+        state.offset = end
+
+    def result(self, top_n: int = FOLLOW_CONFIG["top_templates"]) -> Dict:
+        now = time.time()
+        with self._lock:
+            self.last_read = now
+            windows = self.windows.result(now, top_n)
+            lines_seen = self.windows.lines_seen
+        return {
+            "directory": self.directory,
+            "running_seconds": round(now - self.started, 1),
+            "polls": self.polls,
+            "files": [Path(state.path).name for state in self.files.values()],
+            "lines_seen": lines_seen,
+            "rotations": self.rotations,
+            "truncations": self.truncations,
+            "last_error": self.last_error,
+            "windows": windows,
+        }
+
+
+class FollowManager:
+    """Registry of running follow sessions, addressed by watch id"""
+
+    def __init__(
+        self,
+        max_sessions: int = FOLLOW_CONFIG["max_sessions"],
+        idle_timeout: float = FOLLOW_CONFIG["idle_timeout"]
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}  # watch id -> FollowSession
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, directory: str, **options) -> str:
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError(f"Too many follow sessions (max {self.max_sessions})")
+            watch_id = f"watch-{next(self._ids)}"
+            self._sessions[watch_id] = None  # slot reserved while the first poll runs
+        try:
+            session = FollowSession(directory, idle_timeout=self.idle_timeout, **options)
+        except Exception:
+            with self._lock:
+                del self._sessions[watch_id]
+            raise
+        with self._lock:
+            self._sessions[watch_id] = session
+        session.start(on_idle=lambda: self._remove(watch_id, session))
+        return watch_id
+
+    def get(self, watch_id: str) -> Optional[FollowSession]:
+        with self._lock:
+            return self._sessions.get(watch_id)
+
+    def stop(self, watch_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(watch_id)
+            if session is None:
+                return False  # unknown, or still starting
+            del self._sessions[watch_id]
+        session.stop()
+        return True
+
+    def list(self) -> List[str]:
+        with self._lock:
+            return [watch_id for watch_id, session in self._sessions.items() if session is not None]
+
+    def _remove(self, watch_id: str, session: FollowSession) -> None:
+        """Forget a session that stopped itself"""
+        with self._lock:
+            if self._sessions.get(watch_id) is session:
+                del self._sessions[watch_id]
+
+
+# Shared by every LogAnalyzer in the process
+FOLLOWS = FollowManager()
@@ -0,0 +1,93 @@
+"""Multi-keyword matching in a single pass over each line
+
+AhoCorasick finds every occurrence of every pattern (overlaps included)
+in one left-to-right walk. Walking it character by character in Python
+is slow, so KeywordMatcher first tests a line with one compiled
+alternation of all keywords (a single C-level search) and runs the
+automaton only on lines that contain at least one keyword, to tell
+which ones.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Set
+import re
+from utils.parser import LogRecord
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self.goto = [{}]  # state -> {char: next state}
+        self.fail = [0]
+        self.output = [set()]  # state -> indexes of patterns ending here
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(index)
+        self._link()
+
+    def _link(self) -> None:
+        """Breadth-first failure links; outputs inherit their fallback's"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, text: str) -> Set[int]:
+        """Indexes of the patterns occurring in text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class KeywordMatcher:
+    """Case-insensitive keyword test plus per-keyword hit counts"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = [keyword for keyword in dict.fromkeys(keywords) if keyword]
+        if not self.keywords:
+            raise ValueError("At least one non-empty keyword is required")
+        upper = [keyword.upper() for keyword in self.keywords]
+        alternation = "|".join(re.escape(keyword) for keyword in sorted(upper, key=len, reverse=True))
+        self._search = re.compile(alternation, re.IGNORECASE).search
+        self.automaton = AhoCorasick(upper)
+        self.hits = [0] * len(self.keywords)
+
+    def matches(self, line: str) -> bool:
+        return self._search(line) is not None
+
+    def add(self, record: LogRecord) -> None:
+        """Count which keywords a matching record contains"""
+        for index in self.automaton.find(record.line.upper()):
+            self.hits[index] += 1
+
+    def result(self) -> Dict[str, int]:
+        return dict(zip(self.keywords, self.hits))
+
+
+def parse_list(value) -> List[str]:
+    """Accept a list or a comma-separated string"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item and item.strip()]
@@ -0,0 +1,284 @@
+"""Timestamp-ordered merge of log files with resumable cursors
+
+Each file is read forward as a stream of (offset, record) from a start
+position, filtered, and merged with the other files through a heap keyed
+by timestamp. Untimed lines (stack traces, continuations) take the
+timestamp of the record before them, so they stay attached to it. Ties
+keep the order of the files as given, then file order.
+
+A page stops reading as soon as it is full. The cursor returned with it
+records, per file, the position of the next unread candidate line and
+the parsing state at that point, so the next page starts reading there
+instead of from the start. It also carries the page number, the number
+of lines before the next page and the total when known. Cursors are
+opaque url-safe strings.
+"""
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import base64
+import hashlib
+import heapq
+import json
+import os
+import zlib
+from utils.archive import is_compressed
+from utils.file_handler import FileHandler
+from utils.parser import LogParser, LogRecord
+from utils.time_index import TimeIndex, TimeRange
+from utils.trigram import TRIGRAM_INDEX
+
+CURSOR_VERSION = 2
+_UNTIMED = float("-inf")  # sort key of untimed lines before a file's first timestamp
+
+
+class CursorError(ValueError):
+    pass
+
+
+class FilePosition:
+    """Where a file's stream resumes: a line offset, the number of text
+    lines already taken from that raw line, and the parsing state there"""
+    __slots__ = ("path", "inode", "offset", "sub", "last_timestamp", "in_window", "skip")
+
+    def __init__(
+        self,
+        path: str,
+        inode: int,
+        offset: int = 0,
+        sub: int = 0,
+        last_timestamp: Optional[float] = None,
+        in_window: bool = True,
+        skip: int = 0
+    ):
+        self.path = path
+        self.inode = inode
+        self.offset = offset
+        self.sub = sub
+        self.last_timestamp = last_timestamp
+        self.in_window = in_window
+        self.skip = skip  # leading lines still to drop (negative `lines`)
+
+    def to_list(self) -> List:
+        return [self.path, self.inode, self.offset, self.sub, self.last_timestamp, self.in_window, self.skip]
+
+    @classmethod
+    def from_list(cls, data: List) -> "FilePosition":
+        return cls(*data)
+
+
+class _Stream:
+    """Filtered records of one file from a position, with the position of each"""
+
+    def __init__(
+        self,
+        position: FilePosition,
+        parser: LogParser,
+        window: Optional[TimeRange],
+        matches: Optional[Callable[[str], object]],
+        ranges: Optional[List[Tuple[int, Optional[int]]]] = None
+    ):
+        self.position = position
+        self.parser = parser
+        self.window = window
+        self.matches = matches
+        self.ranges = ranges or [(position.offset, None)]
+
+    def __iter__(self) -> Iterator[Tuple[float, FilePosition, LogRecord]]:
+        """(sort key, position of the record, record)"""
+        start = self.position
+        path, inode = start.path, start.inode
+        parse = self.parser.parse
+        since = self.window.since if self.window else None
+        until = self.window.until if self.window else None
+        matches = self.matches
+        # Without a window or skip, lines are matched before parsing; an
+        # untimed match then takes the timestamp of the previous match
+        prefilter = matches is not None and self.window is None and not start.skip
+        last_timestamp, in_window, skip = start.last_timestamp, start.in_window, start.skip
+        for range_start, range_end in self.ranges:
+            for offset, raw in FileHandler.iter_raw_lines(path, range_start, range_end):
+                # A lone \r also ends a line in text mode
+                texts = FileHandler._split_lines(raw) if b"\r" in raw else (raw.decode('utf-8', errors='ignore'),)
+                for sub, line in enumerate(texts):
+                    if offset == start.offset and sub < start.sub:
+                        continue  # taken by the previous page
+                    if prefilter and not matches(line):
+                        continue
+                    state = (last_timestamp, in_window, skip)
+                    record = parse(line)
+                    timestamp = record.timestamp
+                    if timestamp is not None:
+                        if until is not None and timestamp > until:
+                            return
+                        in_window = since is None or timestamp >= since
+                        last_timestamp = timestamp
+                    if skip:
+                        skip -= 1
+                        continue
+                    if not in_window or (not prefilter and matches is not None and not matches(line)):
+                        continue
+                    position = FilePosition(path, inode, offset, sub, *state)
+                    yield (_UNTIMED if last_timestamp is None else last_timestamp), position, record
+
+
+class LogMerger:
+    def __init__(self, parser: LogParser, time_index: TimeIndex):
+        self.parser = parser
+        self.time_index = time_index
+
+    def start(
+        self,
+        log_files: List[Path],
+        lines: int,
+        window: Optional[TimeRange]
+    ) -> Tuple[List[FilePosition], Optional[int]]:
+        """Start positions: the last `lines` lines of each file (inside window if given).
+
+        lines <= 0 keeps the slicing semantics of read_file: 0 reads whole
+        files and -N drops their first N lines.
+
+        Also returns the number of lines selected, known when lines > 0
+        (each file then contributes at most `lines`), else None.
+        """
+        positions = []
+        selected = 0 if lines > 0 else None
+        for log_file in log_files:
+            path = str(log_file)
+            position = FilePosition(
+                path, os.stat(path).st_ino,
+                in_window=window is None or window.since is None,
+                skip=0 if window else max(-lines, 0)
+            )
+            compressed = is_compressed(path)
+            if window:
+                first = self.time_index.first_timestamp(path)
+                if first is not None and not window.overlaps(first[0], self.time_index.last_timestamp(path)):
+                    continue
+                if window.since is not None and not compressed:
+                    position.offset = self.time_index.seek(path, window.since)
+            if lines > 0:
+                if window or compressed:
+                    position, count = self._tail_position(position, lines, window)
+                    if position is None:
+                        continue
+                else:
+                    position.offset = FileHandler.tail_offset(path, lines)
+                    # A file shorter than the tail is counted, at most `lines` lines
+                    count = lines if position.offset else self._count_lines(path)
+                selected += count
+            positions.append(position)
+        return positions, selected
+
+    def _tail_position(
+        self,
+        position: FilePosition,
+        lines: int,
+        window: Optional[TimeRange]
+    ) -> Tuple[Optional[FilePosition], int]:
+        """Position of the lines-th last record of a stream (None if it is empty) and their number"""
+        last = deque((item[1] for item in _Stream(position, self.parser, window, None)), maxlen=lines)
+        return (last[0] if last else None), len(last)
+
+    @staticmethod
+    def _count_lines(path: str) -> int:
+        """Lines of a file counted by b"\n" like tail_offset, a last unterminated one included"""
+        count = 0
+        last = b"\n"
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                count += block.count(b"\n")
+                last = block[-1:]
+        return count + (last != b"\n")
+
+    def read(
+        self,
+        positions: List[FilePosition],
+        page_size: int,
+        window: Optional[TimeRange] = None,
+        matches: Optional[Callable[[str], object]] = None,
+        literals: Optional[List[str]] = None,
+        skip: int = 0
+    ) -> Tuple[List[LogRecord], List[FilePosition], int]:
+        """Up to page_size merged records after skipping skip, the positions to
+        resume from, and the number of records skipped"""
+        heap = []
+        for rank, position in enumerate(positions):
+            ranges = None
+            if matches is not None and literals and not window and not position.skip:
+                # Only pages the trigram index marks as candidates are read
+                ranges = TRIGRAM_INDEX.candidate_ranges(position.path, literals, position.offset)
+            self._push(heap, rank, iter(_Stream(position, self.parser, window, matches, ranges)))
+
+        records = []
+        while heap and len(records) < skip + page_size:
+            _, rank, _, record, stream = heapq.heappop(heap)
+            records.append(record)
+            self._push(heap, rank, stream)
+        # Every file still in the heap resumes at its unread head record
+        remaining = sorted(heap, key=lambda entry: entry[1])
+        return records[skip:], [entry[2] for entry in remaining], min(skip, len(records))
+
+    @staticmethod
+    def _push(heap: List, rank: int, stream: Iterator) -> None:
+        # One entry per stream, so (key, rank) never ties
+        item = next(stream, None)
+        if item is not None:
+            key, head, record = item
+            heapq.heappush(heap, (key, rank, head, record, stream))
+
+    @staticmethod
+    def query_key(*query) -> str:
+        return hashlib.sha1(json.dumps(query, default=str).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def encode_cursor(
+        query_key: str,
+        positions: List[FilePosition],
+        page: int,
+        taken: int,
+        total: Optional[int]
+    ) -> Optional[str]:
+        """Opaque cursor for the next page, None once every file is exhausted.
+
+        page is the number of the next page, taken the lines before it and
+        total the lines of the whole query if known.
+        """
+        if not positions:
+            return None
+        data = {
+            "v": CURSOR_VERSION, "q": query_key, "page": page, "taken": taken, "total": total,
+            "files": [position.to_list() for position in positions]
+        }
+        packed = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        return base64.urlsafe_b64encode(packed).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, query_key: str, log_files: List[Path]) -> Tuple[List[FilePosition], Dict]:
+        """Positions stored in a cursor and its page, taken and total;
+        CursorError if it is invalid, for another query or stale.
+
+        Only files in log_files, the files the query reads, are accepted.
+        """
+        try:
+            packed = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(zlib.decompress(packed))
+            positions = [FilePosition.from_list(item) for item in data["files"]]
+        except (ValueError, TypeError, KeyError, zlib.error):
+            raise CursorError("Invalid cursor")
+        if data.get("v") != CURSOR_VERSION or data.get("q") != query_key:
+            raise CursorError("Cursor does not belong to this query")
+        state = {key: data.get(key) for key in ("page", "taken", "total")}
+        allowed = {str(log_file) for log_file in log_files}
+        for position in positions:
+            if position.path not in allowed:
+                raise CursorError(f"Cursor expired: {Path(position.path).name} is no longer read by this query")
+            try:
+                st = os.stat(position.path)
+            except OSError:
+                raise CursorError(f"Cursor expired: {Path(position.path).name} no longer exists")
+            # Archive offsets count decompressed bytes
+            shrunk = not is_compressed(position.path) and st.st_size < position.offset
+            if st.st_ino != position.inode or shrunk:
+                raise CursorError(f"Cursor expired: {Path(position.path).name} was rotated or truncated")
+        return positions, state
@@ -0,0 +1,216 @@
+"""Per-stage timings and counters, and on-demand profiling
+
+Hot paths record into the shared METRICS registry at chunk, file or call
+granularity, never per line, so recording costs little. When
+METRICS_CONFIG["enabled"] is off, timed() and timed_chunks() cost one
+attribute check. Stages nest, so their times overlap: "scan" includes
+the "read"/"decode" time of the chunks it consumed, and each
+"analyzer.*" stage covers its whole call.
+
+Scans in worker processes record into the worker's registry. The
+worker drains that registry with each result and the parent merges it.
+
+profile_call runs one request under cProfile. The profiler only sees
+its own thread, so ParallelScanner checks profiling() and scans in the
+calling thread for the duration of the call.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import cProfile
+import functools
+import pstats
+import threading
+import time
+from config import METRICS_CONFIG
+
+
+class StageStats:
+    __slots__ = ("calls", "seconds", "max_seconds", "bytes", "lines")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.lines = 0
+
+    def add(self, seconds: float, size: int = 0, lines: int = 0, calls: int = 1) -> None:
+        self.calls += calls
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bytes += size
+        self.lines += lines
+
+    def merge(self, other: "StageStats") -> None:
+        self.add(other.seconds, other.bytes, other.lines, other.calls)
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StageStats":
+        stats = cls()
+        for slot in cls.__slots__:
+            setattr(stats, slot, data[slot])
+        return stats
+
+    def result(self) -> Dict:
+        result = {
+            "calls": self.calls,
+            "seconds": round(self.seconds, 4),
+            "avg_ms": round(self.seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+        if self.bytes:
+            result["bytes"] = self.bytes
+            result["mb_per_s"] = round(self.bytes / (1024 * 1024) / self.seconds, 1) if self.seconds else None
+        if self.lines:
+            result["lines"] = self.lines
+            result["lines_per_s"] = round(self.lines / self.seconds) if self.seconds else None
+        return result
+
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_CONFIG["enabled"]):
+        self.enabled = enabled
+        self.started = time.time()
+        self._stages = {}  # stage name -> StageStats
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, size: int = 0, lines: int = 0, calls: int = 1) -> None:
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.add(seconds, size, lines, calls)
+
+    def count(self, stage: str, size: int = 0, lines: int = 0) -> None:
+        """Add bytes/lines to a stage without counting a call"""
+        if self.enabled:
+            self.record(stage, 0.0, size, lines, calls=0)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[StageStats]:
+        """Time a block; the block may set bytes/lines on the yielded stats"""
+        counts = StageStats()
+        started = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            if self.enabled:
+                self.record(stage, time.perf_counter() - started, counts.bytes, counts.lines)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator recording each call of the function under stage"""
+        def decorate(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def run(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+            return run
+        return decorate
+
+    def timed_chunks(self, stage: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass chunks through, recording the time spent producing them and their size"""
+        if not self.enabled:
+            yield from chunks
+            return
+        iterator = iter(chunks)
+        seconds = 0.0
+        size = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - started
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.record(stage, seconds, size)
+
+    def drain(self) -> Dict[str, Dict]:
+        """Take the recorded stages, leaving the registry empty"""
+        with self._lock:
+            stages, self._stages = self._stages, {}
+        return {name: stats.to_dict() for name, stats in stages.items()}
+
+    def merge(self, stages: Dict[str, Dict]) -> None:
+        """Add stages drained from another process"""
+        with self._lock:
+            for name, data in stages.items():
+                stats = self._stages.get(name)
+                if stats is None:
+                    stats = self._stages[name] = StageStats()
+                stats.merge(StageStats.from_dict(data))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages = {}
+        self.started = time.time()
+
+    def result(self) -> Dict:
+        with self._lock:
+            stages = {name: stats.result() for name, stats in sorted(self._stages.items())}
+        return {
+            "enabled": self.enabled,
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "stages": stages,
+        }
+
+
+# Shared by every module of the process
+METRICS = Metrics()
+
+_PROFILING = ContextVar("profiling", default=False)
+
+
+def profiling() -> bool:
+    """Whether the current call runs under profile_call"""
+    return _PROFILING.get()
+
+
+def profile_call(
+    function: Callable,
+    *args,
+    top_n: int = METRICS_CONFIG["profile_top"],
+    sort: str = METRICS_CONFIG["profile_sort"]
+) -> Tuple[object, Dict]:
+    """Run function(*args) under cProfile; (result, hot functions)"""
+    profiler = cProfile.Profile()
+    reset = _PROFILING.set(True)
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            result = function(*args)
+        finally:
+            profiler.disable()
+    finally:
+        _PROFILING.reset(reset)
+    wall = time.perf_counter() - started
+    return result, {"wall_seconds": round(wall, 4), "sort": sort, "top_functions": hot_functions(profiler, top_n, sort)}
+
+
+def hot_functions(profiler: cProfile.Profile, top_n: int, sort: str = "tottime") -> List[Dict]:
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})" if line else name,
+            "calls": calls,
+            "self_s": round(tottime, 4),
+            "cumulative_s": round(cumtime, 4),
+        })
+    key = "cumulative_s" if sort == "cumulative" else "self_s"
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return rows[:top_n]
@@ -0,0 +1,215 @@
+"""Parallel scanning across files and newline-aligned byte ranges
+
+Large ranges are split into PARALLEL_CONFIG["chunk_bytes"] pieces that
+start just past a newline, each piece is aggregated in a worker process,
+and the partial aggregates are merged back in range order. Workers
+build aggregators with their partial() constructor where one exists:
+order-dependent state (Drain templates, the first patterns admitted by
+a timeline) is then settled by the merge in the parent, in range order,
+so the result matches a serial scan exactly. Only the frequency sketches
+(heavy hitters and rare messages) are approximate either way and may
+differ slightly.
+
+Compressed archives cannot be split by offset. This process decodes
+each one from the start, so the gzip seek index built on the way stays
+in its registry for later tails, and hands newline-aligned pieces of the
+output to the workers; only a few pieces are in flight at a time.
+"""
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import multiprocessing
+import os
+import threading
+from config import ARCHIVE_CONFIG, PARALLEL_CONFIG, SCAN_CONFIG, PARSER_CONFIG
+from utils.archive import is_compressed
+from utils.cancellation import bind, check_cancelled
+from utils.file_handler import FileHandler
+from utils.metrics import METRICS, profiling
+from utils.scanner import LogScanner
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def worker_count() -> int:
+    return PARALLEL_CONFIG["workers"] or os.cpu_count() or 1
+
+
+def get_process_pool() -> Executor:
+    """Shared worker processes (spawned, so safe from threaded servers)"""
+    with _pools_lock:
+        if "process" not in _pools:
+            _pools["process"] = ProcessPoolExecutor(
+                max_workers=worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pools["process"]
+
+
+def get_thread_pool() -> Executor:
+    """Shared threads that drive per-file work (I/O, cache, checkpoints)"""
+    with _pools_lock:
+        if "thread" not in _pools:
+            _pools["thread"] = ThreadPoolExecutor(
+                max_workers=worker_count(), thread_name_prefix="log-scan"
+            )
+        return _pools["thread"]
+
+
+def shutdown_pools() -> None:
+    """Stop the shared pools; they are recreated on next use"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _scan_range_task(
+    file_path: str,
+    start: int,
+    end: int,
+    chunk_size: int,
+    log_format: str,
+    factories: List[type],
+    metrics: bool
+) -> Tuple[List, Dict]:
+    """Worker entry point: aggregate one byte range into fresh aggregators"""
+    METRICS.enabled = metrics
+    aggregators = _partials(factories)
+    LogScanner(chunk_size, log_format).scan_range(file_path, start, end, *aggregators)
+    return aggregators, METRICS.drain()
+
+
+def _scan_buffer_task(buffer: bytes, log_format: str, factories: List[type], metrics: bool) -> Tuple[List, Dict]:
+    """Worker entry point: aggregate the lines of a decoded archive piece"""
+    METRICS.enabled = metrics
+    aggregators = _partials(factories)
+    LogScanner(log_format=log_format).scan_buffer(buffer, *aggregators)
+    return aggregators, METRICS.drain()
+
+
+def _partials(factories: List[type]) -> List:
+    return [getattr(factory, "partial", factory)() for factory in factories]
+
+
+class ParallelScanner(LogScanner):
+    def __init__(
+        self,
+        chunk_size: int = SCAN_CONFIG["chunk_size"],
+        log_format: str = PARSER_CONFIG["format"],
+        chunk_bytes: int = PARALLEL_CONFIG["chunk_bytes"],
+        min_parallel_bytes: int = PARALLEL_CONFIG["min_parallel_bytes"],
+        enabled: bool = PARALLEL_CONFIG["enabled"]
+    ):
+        super().__init__(chunk_size, log_format)
+        self.chunk_bytes = chunk_bytes
+        self.min_parallel_bytes = min_parallel_bytes
+        self.enabled = enabled
+
+    def split_range(self, file_path: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Cut [start, end) into pieces that each begin at a line start"""
+        ranges = []
+        while start < end:
+            stop = end
+            if end - start > self.chunk_bytes:
+                stop = FileHandler.next_line_start(file_path, start + self.chunk_bytes, end)
+            ranges.append((start, stop))
+            start = stop
+        return ranges
+
+    def scan_range(self, file_path: str, start: int, end: Optional[int], *aggregators) -> None:
+        """Aggregate [start, end) of a file, in worker processes when large.
+
+        Aggregators must be constructible without arguments and provide
+        merge(); anything else is scanned in-process.
+        """
+        mergeable = all(hasattr(aggregator, "merge") for aggregator in aggregators)
+        if is_compressed(file_path):
+            self._scan_archive(file_path, start, end, mergeable, *aggregators)
+            return
+        if end is None:
+            end = os.path.getsize(file_path)
+        if not self.enabled or profiling() or not mergeable or end - start < self.min_parallel_bytes:
+            super().scan_range(file_path, start, end, *aggregators)
+            return
+
+        factories = [type(aggregator) for aggregator in aggregators]
+        pool = get_process_pool()
+        futures = [
+            pool.submit(
+                _scan_range_task, file_path, range_start, range_end,
+                self.chunk_size, self.parser.log_format, factories, METRICS.enabled
+            )
+            for range_start, range_end in self.split_range(file_path, start, end)
+        ]
+        # Merge strictly in range order so results match a serial scan
+        try:
+            for future in futures:
+                check_cancelled()
+                self._merge(future.result(), aggregators)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _scan_archive(self, file_path: str, start: int, end: Optional[int], mergeable: bool, *aggregators) -> None:
+        """Decode a whole archive here and aggregate its pieces in worker processes
+        (ranges stay in-process)"""
+        whole = start == 0 and end is None
+        large = os.path.getsize(file_path) >= ARCHIVE_CONFIG["min_parallel_bytes"]
+        if not (self.enabled and mergeable and whole and large) or profiling():
+            super().scan_range(file_path, start, end, *aggregators)
+            return
+        factories = [type(aggregator) for aggregator in aggregators]
+        pool = get_process_pool()
+        futures = deque()
+        try:
+            for piece in self._pieces(file_path):
+                futures.append(pool.submit(_scan_buffer_task, piece, self.parser.log_format, factories, METRICS.enabled))
+                # Merging the oldest piece first keeps decoded pieces from piling up
+                if len(futures) > worker_count():
+                    self._merge(futures.popleft().result(), aggregators)
+            while futures:
+                check_cancelled()
+                self._merge(futures.popleft().result(), aggregators)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _pieces(self, file_path: str) -> Iterator[bytes]:
+        """Newline-aligned pieces of about ARCHIVE_CONFIG["piece_bytes"] of an archive's content"""
+        pending, size = [], 0
+        for chunk in FileHandler._chunks(file_path, 0, None, self.chunk_size):
+            pending.append(chunk)
+            size += len(chunk)
+            if size < ARCHIVE_CONFIG["piece_bytes"]:
+                continue
+            buffer = b"".join(pending)
+            cut = buffer.rfind(b"\n") + 1
+            if not cut:
+                pending = [buffer]
+                continue
+            pending = [buffer[cut:]]
+            size = len(pending[0])
+            METRICS.count("decode", lines=buffer.count(b"\n", 0, cut))
+            yield buffer[:cut]
+        if size:
+            buffer = b"".join(pending)
+            METRICS.count("decode", lines=buffer.count(b"\n") + (buffer[-1:] != b"\n"))
+            yield buffer
+
+    @staticmethod
+    def _merge(task_result: Tuple[List, Dict], aggregators) -> None:
+        """Fold a worker's partial aggregates and metrics into ours"""
+        partials, stages = task_result
+        for aggregator, partial in zip(aggregators, partials):
+            aggregator.merge(partial)
+        METRICS.merge(stages)
+
+    def map_files(self, function, items: List) -> List:
+        """Apply function to each item concurrently, preserving order"""
+        if not self.enabled or profiling() or len(items) < 2:
+            return [function(item) for item in items]
+        # Carry the caller's cancel token into the pool threads
+        return list(get_thread_pool().map(bind(function), items))
@@ -0,0 +1,168 @@
+"""Structured log record parsing
+
+Each line is parsed once into a LogRecord (timestamp, level, message)
+by a compiled parser, and every aggregator consumes those records, so
+no line is classified more than once per scan.
+
+Format presets:
+    plain      "2026-01-03 10:00:01 ERROR message" (sample_logs/sample.log)
+    bracketed  "[ERROR] message", optionally preceded by a timestamp
+    json       one JSON object per line
+    auto       try json, plain and bracketed, then fall back to the first
+               standalone level token in the line
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional
+import json
+import re
+from config import PARSER_CONFIG
+
+LEVEL_ALIASES = {
+    "CRITICAL": "CRITICAL",
+    "FATAL": "CRITICAL",
+    "CRIT": "CRITICAL",
+    "ERROR": "ERROR",
+    "ERR": "ERROR",
+    "WARNING": "WARNING",
+    "WARN": "WARNING",
+    "INFO": "INFO",
+    "DEBUG": "DEBUG",
+}
+
+LEVEL_PATTERN = "|".join(sorted(LEVEL_ALIASES, key=len, reverse=True))
+TIMESTAMP_PATTERN = r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'
+
+PLAIN_RE = re.compile(
+    rf'\[?(?P<timestamp>{TIMESTAMP_PATTERN})\]?\s+(?P<level>(?i:{LEVEL_PATTERN}))\b:?\s*(?P<message>.*)', re.S
+)
+BRACKETED_RE = re.compile(
+    rf'(?:\[?(?P<timestamp>{TIMESTAMP_PATTERN})\]?\s+)?\[(?P<level>(?i:{LEVEL_PATTERN}))\]:?\s*(?P<message>.*)', re.S
+)
+LEADING_LEVEL_RE = re.compile(rf'(?P<level>{LEVEL_PATTERN})\b[:\s]\s*(?P<message>.*)', re.S)
+TIMESTAMP_RE = re.compile(rf'\[?(?P<timestamp>{TIMESTAMP_PATTERN})')
+LEVEL_TOKEN_RE = re.compile(rf'\b({LEVEL_PATTERN})\b')
+
+JSON_TIMESTAMP_KEYS = ("timestamp", "@timestamp", "time", "ts", "datetime")
+JSON_LEVEL_KEYS = ("level", "severity", "levelname", "lvl", "log.level")
+JSON_MESSAGE_KEYS = ("message", "msg", "text", "log")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class LogRecord:
+    __slots__ = ("timestamp", "level", "message", "line")
+
+    def __init__(self, timestamp: Optional[float], level: Optional[str], message: str, line: str):
+        self.timestamp = timestamp  # seconds since epoch (wall clock), or None
+        self.level = level  # one of config.LOG_LEVELS, or None
+        self.message = message
+        self.line = line  # raw line, including its newline
+
+
+def normalize_level(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    return LEVEL_ALIASES.get(str(token).upper())
+
+
+def parse_timestamp(text: Optional[str]) -> Optional[float]:
+    """ISO-like timestamp -> seconds since epoch; aware values are made UTC"""
+    if not text:
+        return None
+    try:
+        dt = datetime.fromisoformat(text.replace(",", ".").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH).total_seconds()
+
+
+class LogParser:
+    def __init__(self, log_format: str = PARSER_CONFIG["format"]):
+        parsers = {
+            "auto": self._parse_auto,
+            "plain": self._parse_plain,
+            "bracketed": self._parse_bracketed,
+            "json": self._parse_json,
+        }
+        if log_format not in parsers:
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.log_format = log_format
+        self.parse = parsers[log_format]
+
+    def records(self, lines: Iterable[str]) -> Iterator[LogRecord]:
+        """Parse stage: turn lines into records"""
+        parse = self.parse
+        for line in lines:
+            yield parse(line)
+
+    @staticmethod
+    def _from_match(match, line: str) -> LogRecord:
+        return LogRecord(
+            parse_timestamp(match.group("timestamp")),
+            LEVEL_ALIASES[match.group("level").upper()],
+            match.group("message").strip(),
+            line
+        )
+
+    @staticmethod
+    def _unstructured(line: str) -> LogRecord:
+        return LogRecord(None, None, line.strip(), line)
+
+    def _parse_plain(self, line: str) -> LogRecord:
+        match = PLAIN_RE.match(line)
+        return self._from_match(match, line) if match else self._unstructured(line)
+
+    def _parse_bracketed(self, line: str) -> LogRecord:
+        match = BRACKETED_RE.match(line)
+        return self._from_match(match, line) if match else self._unstructured(line)
+
+    def _parse_json(self, line: str) -> LogRecord:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return self._unstructured(line)
+        if not isinstance(data, dict):
+            return self._unstructured(line)
+        timestamp = self._first_key(data, JSON_TIMESTAMP_KEYS)
+        if isinstance(timestamp, (int, float)):
+            timestamp = float(timestamp / 1000 if timestamp > 1e11 else timestamp)
+        else:
+            timestamp = parse_timestamp(timestamp if isinstance(timestamp, str) else None)
+        message = self._first_key(data, JSON_MESSAGE_KEYS)
+        return LogRecord(
+            timestamp,
+            normalize_level(self._first_key(data, JSON_LEVEL_KEYS)),
+            str(message).strip() if message is not None else line.strip(),
+            line
+        )
+
+    def _parse_auto(self, line: str) -> LogRecord:
+        if line[:1] == "{":
+            return self._parse_json(line)
+        match = PLAIN_RE.match(line) or BRACKETED_RE.match(line)
+        if match:
+            return self._from_match(match, line)
+        match = LEADING_LEVEL_RE.match(line)
+        if match:
+            return LogRecord(None, LEVEL_ALIASES[match.group("level")], match.group("message").strip(), line)
+        # Unstructured: the first standalone upper-case level token wins
+        token = LEVEL_TOKEN_RE.search(line)
+        timestamp = TIMESTAMP_RE.match(line)
+        return LogRecord(
+            parse_timestamp(timestamp.group("timestamp")) if timestamp else None,
+            LEVEL_ALIASES[token.group(1)] if token else None,
+            line.strip(),
+            line
+        )
+
+    @staticmethod
+    def _first_key(data: Dict, keys) -> Optional[object]:
+        for key in keys:
+            if key in data:
+                return data[key]
+        return None
+
+
+DEFAULT_PARSER = LogParser()
@@ -1,94 +1,217 @@
-"""Report generation utilities"""
-from typing import List, Dict
-from datetime import datetime
-from utils.statistics import StatisticsAnalyzer
+"""Report generation utilities
+
+Reports are produced line by line from aggregated scan results and
+streamed to their output file by write(), which keeps only the preview
+in memory.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime, timedelta
+import html
+from config import REPORT_CONFIG
+from utils.metrics import METRICS
+from utils.statistics import LEVELS, Timeline
+
+_EPOCH = datetime(1970, 1, 1)
+_LEVEL_COLORS = {
+    "CRITICAL": "#8e0000",
+    "ERROR": "#e53935",
+    "WARNING": "#fb8c00",
+    "INFO": "#43a047",
+    "DEBUG": "#90a4ae",
+}
+_BAR_WIDTH = 300  # pixels of the longest histogram bar
 
 class ReportGenerator:
     @staticmethod
-    def generate_summary_report(
+    def iter_summary_report(
         directory: str,
-        lines: List[str],
-        log_levels: Dict[str, int]
-    ) -> str:
-        """Generate summary report"""
-        stats = StatisticsAnalyzer.get_statistics(lines)
-        patterns = StatisticsAnalyzer.find_common_patterns(lines, top_n=5)
-        
-        report = []
-        report.append("=" * 60)
-        report.append("LOG ANALYSIS REPORT")
-        report.append("=" * 60)
-        report.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"Log Directory: {directory}\n")
-        
+        stats: Dict,
+        log_levels: Dict[str, int],
+        templates: List[Dict],
+        dropped: int = 0
+    ) -> Iterator[str]:
+        """Lines of the summary report"""
+        yield "=" * 60
+        yield "LOG ANALYSIS REPORT"
+        yield "=" * 60
+        yield f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        yield f"Log Directory: {directory}\n"
+
         # Statistics
-        report.append("STATISTICS:")
-        report.append(f"  Total Lines: {stats['total_lines']}")
-        report.append(f"  Non-Empty Lines: {stats['non_empty_lines']}")
-        report.append(f"  Min Length: {stats['min_length']}")
-        report.append(f"  Max Length: {stats['max_length']}")
-        report.append(f"  Avg Length: {stats['avg_length']:.2f}\n")
-        
+        yield "STATISTICS:"
+        yield f"  Total Lines: {stats['total_lines']}"
+        yield f"  Non-Empty Lines: {stats['non_empty_lines']}"
+        yield f"  Min Length: {stats['min_length']}"
+        yield f"  Max Length: {stats['max_length']}"
+        yield f"  Avg Length: {stats['avg_length']:.2f}\n"
+
         # Log Levels
-        report.append("LOG LEVELS:")
+        yield "LOG LEVELS:"
         for level, count in log_levels.items():
             if count > 0:
                 percentage = (count / stats['total_lines']) * 100 if stats['total_lines'] > 0 else 0
-                report.append(f"  {level}: {count} ({percentage:.1f}%)")
-        
-        # Common Patterns
-        if patterns:
-            report.append("\nMOST COMMON ERRORS:")
-            for i, (pattern, count) in enumerate(patterns, 1):
-                report.append(f"  {i}. {pattern} (x{count})")
-        
-        report.append("\n" + "=" * 60)
-        
-        return "\n".join(report)
+                yield f"  {level}: {count} ({percentage:.1f}%)"
+
+        # Top Error Templates
+        if templates:
+            yield "\nTOP ERROR TEMPLATES:"
+            for i, template in enumerate(templates, 1):
+                yield f"  {i}. {template['template']} (x{template['count']})"
+                yield f"     e.g. {template['example']}"
+            if dropped:
+                yield f"  ({dropped} lines of evicted templates not counted)"
+
+        yield "\n" + "=" * 60
 
     @staticmethod
-    def generate_html_report(
+    def iter_html_report(
         directory: str,
-        lines: List[str],
-        log_levels: Dict[str, int]
-    ) -> str:
-        """Generate HTML report"""
-        stats = StatisticsAnalyzer.get_statistics(lines)
-        
-        html = []
-        html.append("<!DOCTYPE html>")
-        html.append("<html>")
-        html.append("<head>")
-        html.append("<title>Log Analysis Report</title>")
-        html.append("<style>")
-        html.append("body { font-family: Arial; margin: 20px; }")
-        html.append("table { border-collapse: collapse; width: 100%; }")
-        html.append("th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }")
-        html.append("th { background-color: #4CAF50; color: white; }")
-        html.append("</style>")
-        html.append("</head>")
-        html.append("<body>")
-        
-        html.append(f"<h1>Log Analysis Report</h1>")
-        html.append(f"<p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
-        html.append(f"<p>Directory: {directory}</p>")
-        
-        html.append("<h2>Statistics</h2>")
-        html.append("<table>")
-        html.append("<tr><th>Metric</th><th>Value</th></tr>")
-        html.append(f"<tr><td>Total Lines</td><td>{stats['total_lines']}</td></tr>")
-        html.append(f"<tr><td>Average Length</td><td>{stats['avg_length']:.2f}</td></tr>")
-        html.append("</table>")
-        
-        html.append("<h2>Log Levels</h2>")
-        html.append("<table>")
-        html.append("<tr><th>Level</th><th>Count</th></tr>")
+        stats: Dict,
+        log_levels: Dict[str, int],
+        timeline: Optional[Timeline] = None,
+        templates: Optional[List[Dict]] = None,
+        bars: int = REPORT_CONFIG["histogram_bars"],
+        dropped: int = 0
+    ) -> Iterator[str]:
+        """Lines of the HTML report"""
+        yield "<!DOCTYPE html>"
+        yield "<html>"
+        yield "<head>"
+        yield '<meta charset="utf-8">'
+        yield "<title>Log Analysis Report</title>"
+        yield "<style>"
+        yield "body { font-family: Arial; margin: 20px; }"
+        yield "table { border-collapse: collapse; width: 100%; }"
+        yield "th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }"
+        yield "th { background-color: #4CAF50; color: white; }"
+        yield ".bar { display: inline-block; height: 12px; }"
+        yield "code { white-space: pre-wrap; }"
+        yield "</style>"
+        yield "</head>"
+        yield "<body>"
+
+        yield "<h1>Log Analysis Report</h1>"
+        yield f"<p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>"
+        yield f"<p>Directory: {html.escape(directory)}</p>"
+
+        yield "<h2>Statistics</h2>"
+        yield "<table>"
+        yield "<tr><th>Metric</th><th>Value</th></tr>"
+        yield f"<tr><td>Total Lines</td><td>{stats['total_lines']}</td></tr>"
+        yield f"<tr><td>Average Length</td><td>{stats['avg_length']:.2f}</td></tr>"
+        yield "</table>"
+
+        yield "<h2>Log Levels</h2>"
+        yield "<table>"
+        yield "<tr><th>Level</th><th>Count</th></tr>"
         for level, count in log_levels.items():
             if count > 0:
-                html.append(f"<tr><td>{level}</td><td>{count}</td></tr>")
-        html.append("</table>")
-        
-        html.append("</body>")
-        html.append("</html>")
-        
-        return "\n".join(html)
+                yield f"<tr><td>{level}</td><td>{count}</td></tr>"
+        yield "</table>"
+
+        histogram = ReportGenerator.level_histogram(timeline, bars) if timeline is not None else []
+        if histogram:
+            yield "<h2>Levels Over Time</h2>"
+            yield "<table>"
+            yield "<tr><th>From</th>" + "".join(f"<th>{level}</th>" for level in LEVELS) + "<th></th></tr>"
+            peak = max(sum(row["counts"].values()) for row in histogram) or 1
+            for row in histogram:
+                segments = "".join(
+                    f'<span class="bar" style="width:{count * _BAR_WIDTH / peak:.1f}px;'
+                    f'background:{_LEVEL_COLORS[level]}" title="{level}: {count}"></span>'
+                    for level, count in row["counts"].items() if count
+                )
+                cells = "".join(f"<td>{row['counts'][level]}</td>" for level in LEVELS)
+                yield f"<tr><td>{row['start']}</td>{cells}<td>{segments}</td></tr>"
+            yield "</table>"
+
+        if templates:
+            yield "<h2>Top Error Templates</h2>"
+            yield "<table>"
+            yield "<tr><th>#</th><th>Template</th><th>Count</th><th>Example</th></tr>"
+            for i, template in enumerate(templates, 1):
+                yield (
+                    f"<tr><td>{i}</td><td><code>{html.escape(template['template'])}</code></td>"
+                    f"<td>{template['count']}</td><td><code>{html.escape(template['example'])}</code></td></tr>"
+                )
+            yield "</table>"
+            if dropped:
+                yield f"<p>{dropped} lines of evicted templates not counted</p>"
+
+        yield "</body>"
+        yield "</html>"
+
+    @staticmethod
+    def level_histogram(timeline: Timeline, bars: int = REPORT_CONFIG["histogram_bars"]) -> List[Dict]:
+        """Per-level counts over at most bars equal time slices of the timeline"""
+        if not timeline.levels:
+            return []
+        first, last = min(timeline.levels), max(timeline.levels)
+        width = -(-(last - first + 1) // bars)  # buckets per bar, rounded up
+        rows = [[0] * len(LEVELS) for _ in range((last - first) // width + 1)]
+        for bucket, counts in timeline.levels.items():
+            row = rows[(bucket - first) // width]
+            for index, count in enumerate(counts):
+                row[index] += count
+        seconds = width * timeline.bucket_seconds
+        start = _EPOCH + timedelta(seconds=first * timeline.bucket_seconds)
+        return [
+            {"start": str(start + timedelta(seconds=index * seconds)), "counts": dict(zip(LEVELS, row))}
+            for index, row in enumerate(rows)
+        ]
+
+    @staticmethod
+    def write(
+        lines: Iterable[str],
+        output_path: Optional[str] = None,
+        preview_chars: int = REPORT_CONFIG["preview_chars"],
+        buffer_bytes: int = REPORT_CONFIG["buffer_bytes"]
+    ) -> str:
+        """Stream report lines to output_path and return the preview.
+
+        Without an output path, rendering stops once the preview is complete.
+        """
+        preview = []
+        previewed = 0
+        with METRICS.stage("render"):
+            output = open(output_path, 'w', encoding='utf-8', buffering=buffer_bytes) if output_path else None
+            try:
+                separator = ""
+                for line in lines:
+                    text = separator + line
+                    separator = "\n"
+                    if previewed <= preview_chars:
+                        preview.append(text[:preview_chars + 1 - previewed])
+                        previewed += len(preview[-1])
+                    if output is not None:
+                        output.write(text)
+                    elif previewed > preview_chars:
+                        break
+            finally:
+                if output is not None:
+                    output.close()
+        report = "".join(preview)
+        return report[:preview_chars] + "..." if len(report) > preview_chars else report
+
+    @staticmethod
+    @METRICS.timed("render")
+    def generate_summary_report(
+        directory: str,
+        stats: Dict,
+        log_levels: Dict[str, int],
+        templates: List[Dict]
+    ) -> str:
+        """Generate summary report from aggregated scan results"""
+        return "\n".join(ReportGenerator.iter_summary_report(directory, stats, log_levels, templates))
+
+    @staticmethod
+    @METRICS.timed("render")
+    def generate_html_report(
+        directory: str,
+        stats: Dict,
+        log_levels: Dict[str, int],
+        timeline: Optional[Timeline] = None,
+        templates: Optional[List[Dict]] = None
+    ) -> str:
+        """Generate HTML report from aggregated scan results"""
+        return "\n".join(ReportGenerator.iter_html_report(directory, stats, log_levels, timeline, templates))
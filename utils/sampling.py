@@ -0,0 +1,310 @@
+"""Budgeted approximate counts from sampled byte ranges
+
+Every file is a stratum cut into blocks of SAMPLING_CONFIG["block_bytes"].
+A block owns the lines that start inside it, so blocks are newline-aligned
+and every line belongs to exactly one. Blocks are read in random order
+within each file. The next block always comes from the file with the
+smallest fraction read so far, which keeps the sample proportional to
+file size.
+
+Compressed archives cannot be read from the middle, and their
+uncompressed size is only known once they have been read whole, so each
+one is a stratum of a single block: the whole archive, counted exactly.
+Archives not read yet are estimated from the counts per compressed byte
+of the archives read so far. Plain files and archives are estimated as
+two separate groups, each in its own bytes, and their totals added, so
+compressed and uncompressed byte counts are never mixed in one rate.
+Byte counts in coverage() and byte budgets are bytes on disk.
+
+Totals are estimated per file from the counts per byte of its sampled
+blocks; files not sampled yet use the rate pooled over every sampled
+block of their group. Ratios such as level shares and average length are ratios of
+estimated totals. Their intervals use the usual linearized variance of a
+stratified ratio estimator, with the finite population correction. They
+therefore shrink to zero once every block has been read, and the
+estimate is then exact.
+
+A sample is kept under its id, so a later call can read more blocks and
+refine the estimate. The population is fixed when the sample starts: bytes
+appended afterwards are not part of it.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import itertools
+import math
+import os
+import random
+import threading
+import time
+import numpy as np
+from config import SAMPLING_CONFIG
+from utils.archive import is_compressed
+from utils.cancellation import check_cancelled
+from utils.file_handler import FileHandler
+from utils.statistics import LEVELS, LevelCounter, LineStats
+
+# Per-block counts, one column each
+COLUMNS = ["lines", "non_empty_lines", "length_total"] + LEVELS
+_COLUMN = {name: index for index, name in enumerate(COLUMNS)}
+
+
+class _Stratum:
+    """One file: its blocks in sampling order and the counts of those read"""
+
+    def __init__(self, path: str, size: int, block_bytes: int, rng: random.Random):
+        self.path = path
+        self.size = size  # bytes on disk
+        self.archive = is_compressed(path)  # read whole, as one block
+        self.block_bytes = block_bytes
+        self.blocks = 1 if self.archive else max(1, math.ceil(size / block_bytes))
+        self.order = rng.sample(range(self.blocks), self.blocks)
+        self.rows = []  # counts of each block read
+        self.sizes = []  # bytes of each block read
+
+    @property
+    def fraction(self) -> float:
+        return len(self.rows) / self.blocks
+
+    @property
+    def done(self) -> bool:
+        return len(self.rows) >= self.blocks
+
+    def next_range(self) -> Tuple[int, Optional[int]]:
+        """Byte range of the next block: the lines starting inside it"""
+        if self.archive:
+            return 0, None
+        block = self.order[len(self.rows)]
+        return self._boundary(block), self._boundary(block + 1)
+
+    def _boundary(self, block: int) -> int:
+        offset = block * self.block_bytes
+        if offset <= 0:
+            return 0
+        if offset >= self.size:
+            return self.size
+        return FileHandler.next_line_start(self.path, offset - 1, self.size)
+
+
+class Sample:
+    def __init__(
+        self,
+        log_files: List[Path],
+        block_bytes: int = SAMPLING_CONFIG["block_bytes"],
+        seed: Optional[int] = SAMPLING_CONFIG["seed"]
+    ):
+        rng = random.Random(seed)
+        self.strata = [
+            _Stratum(str(log_file), os.path.getsize(log_file), block_bytes, rng) for log_file in log_files
+        ]
+        self.total_bytes = sum(stratum.size for stratum in self.strata)
+        self.bytes_read = 0
+        self.seconds = 0.0
+        self.min_length = None
+        self.max_length = 0
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def blocks_total(self) -> int:
+        return sum(stratum.blocks for stratum in self.strata)
+
+    @property
+    def blocks_read(self) -> int:
+        return sum(len(stratum.rows) for stratum in self.strata)
+
+    @property
+    def exact(self) -> bool:
+        return all(stratum.done for stratum in self.strata)
+
+    def extend(
+        self,
+        scan: Callable[..., None],
+        seconds: Optional[float] = SAMPLING_CONFIG["time_budget"],
+        max_bytes: Optional[int] = SAMPLING_CONFIG["byte_budget"]
+    ) -> None:
+        """Read further blocks until a budget is spent or every block is read.
+
+        scan(file_path, start, end, *aggregators) feeds the lines of a byte range.
+        """
+        with self._lock:
+            started = time.perf_counter()
+            budget_start = self.bytes_read
+            while not self.exact:
+                if seconds is not None and time.perf_counter() - started >= seconds:
+                    break
+                if max_bytes is not None and self.bytes_read - budget_start >= max_bytes:
+                    break
+                check_cancelled()
+                # Least-sampled file first keeps allocation proportional to size
+                stratum = min(
+                    (stratum for stratum in self.strata if not stratum.done),
+                    key=lambda stratum: (stratum.fraction, -stratum.blocks)
+                )
+                self._read_block(stratum, scan)
+            self.seconds += time.perf_counter() - started
+            self.last_used = time.time()
+
+    def _read_block(self, stratum: _Stratum, scan: Callable[..., None]) -> None:
+        start, end = stratum.next_range()
+        levels, stats = LevelCounter(), LineStats()
+        if end is None or end > start:
+            scan(stratum.path, start, end, levels, stats)
+        size = stratum.size if end is None else end - start
+        stratum.rows.append(
+            [stats.total_lines, stats.non_empty_lines, stats.length_total]
+            + [levels.counts[level] for level in LEVELS]
+        )
+        stratum.sizes.append(size)
+        self.bytes_read += size
+        if stats.min_length is not None and (self.min_length is None or stats.min_length < self.min_length):
+            self.min_length = stats.min_length
+        self.max_length = max(self.max_length, stats.max_length)
+
+    def _per_stratum(self) -> List[Tuple[_Stratum, np.ndarray, np.ndarray]]:
+        return [
+            (stratum, np.array(stratum.rows, dtype=np.float64).reshape(-1, len(COLUMNS)),
+             np.array(stratum.sizes, dtype=np.float64))
+            for stratum in self.strata
+        ]
+
+    def _estimate(self, values: Callable[[np.ndarray], np.ndarray], parts) -> Tuple[float, float]:
+        """Estimated total of values(rows) over all files, and its variance"""
+        total = variance = 0.0
+        for archive in (False, True):
+            group = [part for part in parts if part[0].archive == archive]
+            if group:
+                group_total, group_variance = self._estimate_group(values, group)
+                total += group_total
+                variance += group_variance
+        return total, variance
+
+    @staticmethod
+    def _estimate_group(values: Callable[[np.ndarray], np.ndarray], parts) -> Tuple[float, float]:
+        """_estimate() over files whose sizes share one unit"""
+        sampled = [(stratum, values(rows), sizes) for stratum, rows, sizes in parts if len(sizes)]
+        if not sampled:
+            return 0.0, math.inf
+        pooled_values = np.concatenate([value for _, value, _ in sampled])
+        pooled_sizes = np.concatenate([sizes for _, _, sizes in sampled])
+        pooled_rate = pooled_values.sum() / pooled_sizes.sum() if pooled_sizes.sum() else 0.0
+        pooled_residual = pooled_values - pooled_rate * pooled_sizes
+        pooled_var = pooled_residual.var(ddof=1) if len(pooled_residual) > 1 else math.inf
+
+        total = variance = 0.0
+        for stratum, rows, sizes in parts:
+            blocks, read = stratum.blocks, len(sizes)
+            if read >= blocks:
+                total += values(rows).sum()  # fully read: exact
+                continue
+            if read:
+                value = values(rows)
+                rate = value.sum() / sizes.sum() if sizes.sum() else 0.0
+                residual_var = (value - rate * sizes).var(ddof=1) if read > 1 else pooled_var
+            else:
+                rate, residual_var = pooled_rate, pooled_var
+            total += rate * stratum.size
+            if residual_var:
+                variance += blocks * blocks * (1 - read / blocks) * residual_var / max(read, 1)
+        return float(total), float(variance)
+
+    def total(self, column: str, z: float = SAMPLING_CONFIG["z"]) -> Tuple[float, Optional[List[float]]]:
+        """Estimated total of a column with its confidence interval"""
+        parts = self._per_stratum()
+        index = _COLUMN[column]
+        estimate, variance = self._estimate(lambda rows: rows[:, index], parts)
+        return estimate, self._interval(estimate, variance, z, lower=0.0)
+
+    def ratio(
+        self,
+        numerator: List[str],
+        denominator: List[str],
+        z: float = SAMPLING_CONFIG["z"],
+        upper: Optional[float] = None
+    ) -> Tuple[Optional[float], Optional[List[float]]]:
+        """Estimated ratio of two column sums with its confidence interval"""
+        parts = self._per_stratum()
+        top = [_COLUMN[column] for column in numerator]
+        bottom = [_COLUMN[column] for column in denominator]
+        top_total, _ = self._estimate(lambda rows: rows[:, top].sum(axis=1), parts)
+        bottom_total, _ = self._estimate(lambda rows: rows[:, bottom].sum(axis=1), parts)
+        if not bottom_total:
+            return None, None
+        ratio = float(top_total / bottom_total)
+        # Linearization: variance of the total of top - ratio * bottom
+        _, variance = self._estimate(
+            lambda rows: rows[:, top].sum(axis=1) - ratio * rows[:, bottom].sum(axis=1), parts
+        )
+        return ratio, self._interval(ratio, variance / (bottom_total * bottom_total), z, lower=0.0, upper=upper)
+
+    @staticmethod
+    def _interval(
+        estimate: float,
+        variance: float,
+        z: float,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None
+    ) -> Optional[List[float]]:
+        if not math.isfinite(variance):
+            return None
+        margin = z * math.sqrt(max(variance, 0.0))
+        low, high = estimate - margin, estimate + margin
+        if lower is not None:
+            low = max(low, lower)
+        if upper is not None:
+            high = min(high, upper)
+        return [low, high]
+
+    def coverage(self) -> Dict:
+        """How much of the data the estimate is based on"""
+        return {
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "fraction_read": round(self.bytes_read / self.total_bytes, 4) if self.total_bytes else 1.0,
+            "blocks_read": self.blocks_read,
+            "blocks_total": self.blocks_total,
+            "files": len(self.strata),
+            "files_sampled": sum(1 for stratum in self.strata if stratum.rows),
+            "archives": sum(1 for stratum in self.strata if stratum.archive),
+            "archives_read": sum(1 for stratum in self.strata if stratum.archive and stratum.rows),
+            "seconds": round(self.seconds, 3),
+            "exact": self.exact,
+        }
+
+
+class SampleManager:
+    """Samples kept for refinement, addressed by sample id; least recently used are dropped"""
+
+    def __init__(self, max_samples: int = SAMPLING_CONFIG["max_samples"]):
+        self.max_samples = max_samples
+        self._samples = OrderedDict()  # sample id -> (query key, Sample)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, key: Tuple, log_files: List[Path]) -> Tuple[str, Sample]:
+        sample = Sample(log_files)
+        with self._lock:
+            sample_id = f"sample-{next(self._ids)}"
+            self._samples[sample_id] = (key, sample)
+            while len(self._samples) > self.max_samples:
+                self._samples.popitem(last=False)
+        return sample_id, sample
+
+    def get(self, sample_id: str, key: Tuple) -> Sample:
+        with self._lock:
+            entry = self._samples.get(sample_id)
+            if entry is not None:
+                self._samples.move_to_end(sample_id)
+        if entry is None:
+            raise ValueError(f"Unknown or expired sample id: {sample_id}")
+        if entry[0] != key:
+            raise ValueError(f"Sample {sample_id} belongs to another directory or file selection")
+        return entry[1]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"samples": len(self._samples), "max_samples": self.max_samples}
+
+
+# Shared by every LogAnalyzer in the process
+SAMPLES = SampleManager()
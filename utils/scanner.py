@@ -0,0 +1,105 @@
+"""Streaming scan pipeline
+
+Lines are read from disk in chunks, parsed once into LogRecords and flow
+through small generator stages (filter, tap) into aggregators, so memory
+stays bounded by the chunk size and the aggregate state rather than by
+the size of the logs. Aggregators are objects exposing ``add(record)``;
+see utils.statistics. Scans that only count levels and lines take the
+raw-bytes path of utils.byte_scan instead.
+"""
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+from config import SCAN_CONFIG, PARSER_CONFIG
+from utils.byte_scan import ByteScanner
+from utils.file_handler import FileHandler
+from utils.metrics import METRICS
+from utils.parser import LogParser, LogRecord
+from utils.time_index import TimeIndex, TimeRange
+
+
+class LogScanner:
+    def __init__(
+        self,
+        chunk_size: int = SCAN_CONFIG["chunk_size"],
+        log_format: str = PARSER_CONFIG["format"]
+    ):
+        self.chunk_size = chunk_size
+        self.parser = LogParser(log_format)
+        self.time_index = TimeIndex(self.parser, chunk_size)
+        self.bytes = ByteScanner(self.parser)
+
+    def lines(self, log_files: List[Path]) -> Iterator[str]:
+        """Source stage: stream every line of every file in order"""
+        for log_file in log_files:
+            yield from FileHandler.iter_lines(str(log_file), self.chunk_size)
+
+    def records(self, log_files: List[Path]) -> Iterator[LogRecord]:
+        """Parse stage: every line of every file as a LogRecord"""
+        return self.parser.records(self.lines(log_files))
+
+    def records_in_window(self, log_files: List[Path], window: Optional[TimeRange]) -> Iterator[LogRecord]:
+        """Parse stage restricted to a time window (all records if None)"""
+        if window is None:
+            yield from self.records(log_files)
+            return
+        for log_file in log_files:
+            yield from self.time_index.records(str(log_file), window)
+
+    def records_with_levels(
+        self,
+        log_files: List[Path],
+        levels: Set[str],
+        window: Optional[TimeRange] = None
+    ) -> Iterator[LogRecord]:
+        """Parse stage for records of the given levels; may also yield others.
+
+        Without a window, lines are classified on raw bytes and only those
+        of the given levels are decoded and parsed.
+        """
+        if window is not None or not self.bytes.enabled:
+            yield from self.records_in_window(log_files, window)
+            return
+        for log_file in log_files:
+            yield from self.bytes.records(str(log_file), levels)
+
+    @staticmethod
+    def filter(records: Iterable, predicate: Callable[..., bool]) -> Iterator:
+        """Keep only items matching predicate"""
+        return (record for record in records if predicate(record))
+
+    @staticmethod
+    def tap(records: Iterable, *aggregators) -> Iterator:
+        """Feed items to aggregators while passing them downstream"""
+        adders = [aggregator.add for aggregator in aggregators]
+        for record in records:
+            for add in adders:
+                add(record)
+            yield record
+
+    @staticmethod
+    def aggregate(records: Iterable, *aggregators) -> None:
+        """Sink stage: drain items into aggregators"""
+        with METRICS.stage("scan"):
+            for _ in LogScanner.tap(records, *aggregators):
+                pass
+
+    def scan(self, log_files: List[Path], *aggregators) -> None:
+        """Run one pass over log_files feeding every aggregator"""
+        self.aggregate(self.records(log_files), *aggregators)
+
+    def scan_range(self, file_path: str, start: int, end: Optional[int], *aggregators) -> None:
+        """Run one pass over the byte range [start, end) of a single file"""
+        if self.bytes.handles(aggregators):
+            self.bytes.scan_range(file_path, start, end, *aggregators)
+            return
+        self.aggregate(
+            self.parser.records(FileHandler.iter_lines(file_path, self.chunk_size, start, end)),
+            *aggregators
+        )
+
+    def scan_buffer(self, buffer: bytes, *aggregators) -> None:
+        """Run one pass over the lines of bytes already read (or decompressed)"""
+        if self.bytes.handles(aggregators):
+            self.bytes.scan_buffers([buffer], *aggregators)
+            return
+        self.aggregate(self.parser.records(FileHandler._split_lines(buffer)), *aggregators)
@@ -0,0 +1,149 @@
+"""Fixed-memory frequency sketches
+
+CountMinSketch estimates how often any key was seen (never under-
+estimating), SpaceSaving keeps the most frequent keys with an error
+bound. Both use process-independent hashes, serialize to plain lists and
+merge, so partial sketches from workers or earlier runs can be combined.
+"""
+from array import array
+from typing import Dict, List, Tuple
+import heapq
+import zlib
+import numpy as np
+from config import SKETCH_CONFIG
+
+
+class CountMinSketch:
+    def __init__(self, width: int = SKETCH_CONFIG["cms_width"], depth: int = SKETCH_CONFIG["cms_depth"]):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [array('q', bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        data = key.encode('utf-8', errors='ignore')
+        h1 = zlib.crc32(data)
+        h2 = zlib.adler32(data) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count key and return its new estimate"""
+        self.total += count
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Cannot merge sketches of different dimensions")
+        self.total += other.total
+        for row, other_row in zip(self.rows, other.rows):
+            merged = np.frombuffer(row, dtype=np.int64)
+            merged += np.frombuffer(other_row, dtype=np.int64)
+
+    def nbytes(self) -> int:
+        return 8 * self.width * self.depth
+
+    def to_dict(self) -> Dict:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "rows": [row.tolist() for row in self.rows],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        sketch.rows = [array('q', row) for row in data["rows"]]
+        return sketch
+
+
+class SpaceSaving:
+    """Heavy hitters: at most capacity keys, each with count and overcount bound
+
+    A min-heap holds one (count, key) entry per key. Counts only grow, so
+    entries are refreshed lazily when they reach the top: finding the
+    smallest key costs O(log capacity) amortized instead of a full scan.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CONFIG["heavy_hitters"]):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def add(self, key: str, count: int = 1) -> None:
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+        else:
+            # Replace the smallest entry, inheriting its count as error
+            floor, victim = self._smallest()
+            del counts[victim]
+            self.errors.pop(victim)
+            counts[key] = floor + count
+            self.errors[key] = floor
+            heapq.heapreplace(self._heap, (floor + count, key))
+
+    def _smallest(self) -> Tuple[int, str]:
+        """Smallest (count, key), with the heap's top entry brought up to date"""
+        heap, counts = self._heap, self.counts
+        while True:
+            stored, key = heap[0]
+            current = counts[key]
+            if current == stored:
+                return stored, key
+            heapq.heapreplace(heap, (current, key))
+
+    def _rebuild(self) -> None:
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _floor(self) -> int:
+        return self._smallest()[0] if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving") -> None:
+        mine, theirs = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for key in list(self.counts) + [key for key in other.counts if key not in self.counts]:
+            counts[key] = self.counts.get(key, mine) + other.counts.get(key, theirs)
+            errors[key] = self.errors.get(key, mine) + other.errors.get(key, theirs)
+        keep = sorted(counts, key=lambda key: -counts[key])[:self.capacity]
+        kept = set(keep)
+        self.counts = {key: count for key, count in counts.items() if key in kept}
+        self.errors = {key: errors[key] for key in self.counts}
+        self._rebuild()
+
+    def top(self, top_n: int = 10) -> List[Dict]:
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])[:top_n]
+        return [
+            {"message": key, "count": count, "error": self.errors[key]}
+            for key, count in ranked
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "entries": [[key, count, self.errors[key]] for key, count in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SpaceSaving":
+        sketch = cls(data["capacity"])
+        for key, count, error in data["entries"]:
+            sketch.counts[key] = count
+            sketch.errors[key] = error
+        sketch._rebuild()
+        return sketch
@@ -1,89 +1,532 @@
 """Statistical analysis utilities"""
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 from collections import Counter
-import re
 from datetime import datetime
+import re
+import sys
+from config import ANOMALY_CONFIG, SKETCH_CONFIG, STATS_CONFIG
+from utils.parser import DEFAULT_PARSER, LogRecord
+from utils.anomaly import AnomalyDetector
+from utils.templates import TemplateMiner, mask_message
+from utils.sketches import CountMinSketch, SpaceSaving
+from utils.metrics import METRICS
+
+LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
+_LEVEL_INDEX = {level: index for index, level in enumerate(LEVELS)}
+# Bump when aggregate semantics change so persisted summaries are rebuilt
+SUMMARY_VERSION = 7
+
+
+class LevelCounter:
+    """Streaming counterpart of StatisticsAnalyzer.analyze_log_levels"""
+
+    def __init__(self):
+        self.counts = {level: 0 for level in LEVELS}
+
+    def add(self, record: LogRecord) -> None:
+        if record.level:
+            self.counts[record.level] += 1
+
+    def merge(self, other: "LevelCounter") -> None:
+        for level, count in other.counts.items():
+            self.counts[level] += count
+
+    def to_dict(self) -> Dict:
+        return dict(self.counts)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LevelCounter":
+        counter = cls()
+        counter.counts.update(data)
+        return counter
+
+    def result(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+
+class LineCounter:
+    """Number of lines, for scans that need no line lengths"""
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, record: LogRecord) -> None:
+        self.count += 1
+
+    def merge(self, other: "LineCounter") -> None:
+        self.count += other.count
+
+    def result(self) -> int:
+        return self.count
+
+
+class LineStats:
+    """Streaming counterpart of StatisticsAnalyzer.get_statistics"""
+
+    def __init__(self):
+        self.total_lines = 0
+        self.non_empty_lines = 0
+        self.min_length = None
+        self.max_length = 0
+        self.length_total = 0
+
+    def add(self, record: LogRecord) -> None:
+        line = record.line
+        length = len(line.strip())
+        self.total_lines += 1
+        self.length_total += length
+        if length:
+            self.non_empty_lines += 1
+        if self.min_length is None or length < self.min_length:
+            self.min_length = length
+        if length > self.max_length:
+            self.max_length = length
+
+    def merge(self, other: "LineStats") -> None:
+        self.total_lines += other.total_lines
+        self.non_empty_lines += other.non_empty_lines
+        self.length_total += other.length_total
+        if other.min_length is not None and (
+            self.min_length is None or other.min_length < self.min_length
+        ):
+            self.min_length = other.min_length
+        self.max_length = max(self.max_length, other.max_length)
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LineStats":
+        stats = cls()
+        vars(stats).update(data)
+        return stats
+
+    def result(self) -> Dict:
+        if not self.total_lines:
+            return {"error": "No logs found"}
+        return {
+            "total_lines": self.total_lines,
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "avg_length": self.length_total / self.total_lines,
+            "non_empty_lines": self.non_empty_lines,
+        }
+
+
+class TemplateCounter:
+    """ERROR/WARNING/CRITICAL lines counted by Drain template as they are scanned.
+
+    Every masked message joins or starts a template of an online
+    TemplateMiner. Drain matches each line against the templates seen
+    before it, so a chunk of a parallel scan (see partial()) only keeps
+    its lines in order and the counter it is merged into mines them:
+    templates then do not depend on how a file was split. Counters of
+    whole files merge template by template, in file order. Lines of
+    templates evicted at the template cap are reported as dropped.
+    """
+
+    def __init__(self):
+        self.miner = TemplateMiner()
+        self.pending = None  # (masked message, message) per line of a partial counter
+
+    @classmethod
+    def partial(cls) -> "TemplateCounter":
+        """Counter of one chunk of a parallel scan; mined when merged"""
+        counter = cls()
+        counter.pending = []
+        return counter
+
+    @property
+    def dropped(self) -> int:
+        return self.miner.dropped
+
+    @staticmethod
+    def key(record: LogRecord) -> Optional[str]:
+        """Masked message of an ERROR/WARNING/CRITICAL record"""
+        if record.level in ("ERROR", "WARNING", "CRITICAL") and record.message:
+            return mask_message(record.message)
+        return None
+
+    def add(self, record: LogRecord) -> None:
+        self.add_keyed(record, TemplateCounter.key(record))
+
+    def add_keyed(self, record: LogRecord, key: Optional[str]) -> None:
+        if key is None:
+            return
+        if self.pending is not None:
+            # Interned so repeated messages are pickled once
+            self.pending.append((sys.intern(key), record.message))
+        else:
+            self.miner.add_masked(key, 1, record.message)
+
+    def add_count(self, key: str, count: int, example: str) -> None:
+        """Count lines of one masked message at once"""
+        self.miner.add_masked(key, count, example)
+
+    def merge(self, other: "TemplateCounter") -> None:
+        if other.pending is not None:
+            # A chunk: mine its lines as if they had been scanned here
+            if self.pending is not None:
+                self.pending.extend(other.pending)
+                return
+            add = self.miner.add_masked
+            for key, message in other.pending:
+                add(key, 1, message)
+        elif not self.miner.clusters and not self.miner.dropped:
+            # Nothing to join yet: take the templates over unchanged
+            self.miner = TemplateMiner.from_dict(other.miner.to_dict())
+        else:
+            self.miner.merge(other.miner)
+
+    def to_dict(self) -> Dict:
+        return self.miner.to_dict()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TemplateCounter":
+        counter = cls()
+        counter.miner = TemplateMiner.from_dict(data)
+        return counter
+
+    def templates(self, top_n: int = 5) -> List[Dict]:
+        """Top templates with id, count and an example message"""
+        return [cluster.to_dict() for cluster in self.miner.top(top_n)]
+
+    def result(self, top_n: int = 5) -> List[Tuple[str, int]]:
+        return [(template["template"], template["count"]) for template in self.templates(top_n)]
+
+    def nbytes(self) -> int:
+        return sum(
+            200 + 2 * len(cluster.template) + len(cluster.example)
+            for cluster in self.miner.clusters.values()
+        )
+
+
+class LineSample:
+    """Count lines longer than min_length, keeping the first few (stripped)"""
+
+    def __init__(self, limit: int = 10, min_length: float = -1):
+        self.limit = limit
+        self.min_length = min_length
+        self.count = 0
+        self.lines = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.lines) >= self.limit
+
+    def add(self, record: LogRecord) -> None:
+        if len(record.line) > self.min_length:
+            self.count += 1
+            if len(self.lines) < self.limit:
+                self.lines.append(record.line.strip())
+
+    def result(self) -> List[str]:
+        return list(self.lines)
+
+
+class Timeline:
+    """Per-time-bucket line, level and ERROR/CRITICAL counts, plus per-pattern counts.
+
+    Only timestamped records are bucketed. Patterns are masked messages
+    (see TemplateCounter); tracking stops admitting new ones once
+    max_patterns are known, which bounds memory. A partial() timeline of
+    a parallel scan chunk admits every pattern, in first-seen order, so
+    the timeline it is merged into keeps the same patterns a serial scan
+    would.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = ANOMALY_CONFIG["bucket_seconds"],
+        max_patterns: Optional[int] = ANOMALY_CONFIG["max_patterns"]
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.max_patterns = max_patterns
+        self.lines = {}  # bucket -> timestamped lines
+        self.errors = {}  # bucket -> ERROR/CRITICAL lines
+        self.levels = {}  # bucket -> lines per level, in LEVELS order
+        self.patterns = {}  # masked message -> {bucket: count}, in first-seen order
+
+    @classmethod
+    def partial(cls) -> "Timeline":
+        """Timeline of one chunk of a parallel scan, without a pattern cap"""
+        return cls(max_patterns=None)
+
+    def add(self, record: LogRecord) -> None:
+        self.add_keyed(record, TemplateCounter.key(record))
+
+    def add_keyed(self, record: LogRecord, template_key: Optional[str]) -> None:
+        timestamp = record.timestamp
+        if timestamp is None:
+            return
+        bucket = int(timestamp // self.bucket_seconds)
+        self.lines[bucket] = self.lines.get(bucket, 0) + 1
+        level = record.level
+        if level:
+            counts = self.levels.get(bucket)
+            if counts is None:
+                counts = self.levels[bucket] = [0] * len(LEVELS)
+            counts[_LEVEL_INDEX[level]] += 1
+            if level == "ERROR" or level == "CRITICAL":
+                self.errors[bucket] = self.errors.get(bucket, 0) + 1
+        if template_key is not None:
+            self._count_pattern(template_key, {bucket: 1})
+
+    def merge(self, other: "Timeline") -> None:
+        for bucket, count in other.lines.items():
+            self.lines[bucket] = self.lines.get(bucket, 0) + count
+        for bucket, count in other.errors.items():
+            self.errors[bucket] = self.errors.get(bucket, 0) + count
+        for bucket, counts in other.levels.items():
+            mine = self.levels.get(bucket)
+            if mine is None:
+                self.levels[bucket] = list(counts)
+            else:
+                for index, count in enumerate(counts):
+                    mine[index] += count
+        for key, buckets in other.patterns.items():
+            self._count_pattern(key, buckets)
+
+    def _count_pattern(self, key: str, buckets: Dict[int, int]) -> None:
+        series = self.patterns.get(key)
+        if series is None:
+            if self.max_patterns is not None and len(self.patterns) >= self.max_patterns:
+                return
+            series = self.patterns[key] = {}
+        for bucket, count in buckets.items():
+            series[bucket] = series.get(bucket, 0) + count
+
+    def to_dict(self) -> Dict:
+        # JSON object keys must be strings, so buckets are stored as pairs
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "lines": list(self.lines.items()),
+            "errors": list(self.errors.items()),
+            "levels": [[bucket, counts] for bucket, counts in self.levels.items()],
+            "patterns": [[key, list(buckets.items())] for key, buckets in self.patterns.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Timeline":
+        timeline = cls(bucket_seconds=data["bucket_seconds"])
+        timeline.lines = {bucket: count for bucket, count in data["lines"]}
+        timeline.errors = {bucket: count for bucket, count in data["errors"]}
+        timeline.levels = {bucket: counts for bucket, counts in data["levels"]}
+        timeline.patterns = {
+            key: {bucket: count for bucket, count in buckets}
+            for key, buckets in data["patterns"]
+        }
+        return timeline
+
+    def result(self, anomaly_type: str = "spike") -> Dict:
+        return AnomalyDetector.detect(self, anomaly_type)
+
+
+class MessageSketch:
+    """Heavy hitters and rare events over masked messages, in fixed memory.
+
+    Messages are masked like template keys (mask_message), so both views
+    group the same lines together. A count-min sketch
+    estimates every message's frequency, SpaceSaving tracks the most
+    frequent ones, and a bounded set of candidates remembers an example
+    line for messages that were still rare when last checked.
+    """
+
+    def __init__(self, max_candidates: int = SKETCH_CONFIG["rare_candidates"]):
+        self.cms = CountMinSketch()
+        self.heavy = SpaceSaving()
+        self.max_candidates = max_candidates
+        self.candidates = {}  # masked message -> example line
+        self._next_prune = 0  # total at which a full candidate set is pruned again
+
+    @staticmethod
+    def key(record: LogRecord) -> str:
+        return mask_message(record.message)
+
+    def add(self, record: LogRecord) -> None:
+        self.add_keyed(record, MessageSketch.key(record))
+
+    def add_keyed(self, record: LogRecord, key: str) -> None:
+        if not key:
+            return
+        estimate = self.cms.add(key)
+        self.heavy.add(key)
+        if estimate == 1 and key not in self.candidates:
+            if len(self.candidates) >= self.max_candidates and self.cms.total >= self._next_prune:
+                self._prune()
+            if len(self.candidates) < self.max_candidates:
+                self.candidates[key] = record.line.strip()
+
+    def _prune(self, threshold: float = STATS_CONFIG["rare_threshold"]) -> None:
+        """Drop candidates that stopped being rare; back off if none did"""
+        cutoff = max(1, threshold * self.cms.total)
+        self.candidates = {
+            key: example for key, example in self.candidates.items()
+            if self.cms.estimate(key) <= cutoff
+        }
+        while len(self.candidates) > self.max_candidates:
+            # Most frequent candidates go first; ties keep the earliest
+            worst = max(self.candidates, key=self.cms.estimate)
+            del self.candidates[worst]
+        if len(self.candidates) >= self.max_candidates:
+            self._next_prune = self.cms.total * 2  # keeps admission O(1) amortized
+
+    def merge(self, other: "MessageSketch") -> None:
+        self.cms.merge(other.cms)
+        self.heavy.merge(other.heavy)
+        for key, example in other.candidates.items():
+            self.candidates.setdefault(key, example)
+        if len(self.candidates) > self.max_candidates:
+            self._prune()
+        self._next_prune = max(self._next_prune, other._next_prune)
+
+    def to_dict(self) -> Dict:
+        return {
+            "cms": self.cms.to_dict(),
+            "heavy": self.heavy.to_dict(),
+            "candidates": [[key, example] for key, example in self.candidates.items()],
+            "next_prune": self._next_prune,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MessageSketch":
+        sketch = cls()
+        sketch.cms = CountMinSketch.from_dict(data["cms"])
+        sketch.heavy = SpaceSaving.from_dict(data["heavy"])
+        sketch.candidates = {key: example for key, example in data["candidates"]}
+        sketch._next_prune = data["next_prune"]
+        return sketch
+
+    def heavy_hitters(self, top_n: int = 10) -> List[Dict]:
+        return self.heavy.top(top_n)
+
+    def rare(self, threshold: float = STATS_CONFIG["rare_threshold"], limit: int = 10) -> List[str]:
+        """Example lines of messages seen at most threshold * total times"""
+        cutoff = max(1, threshold * self.cms.total)
+        estimates = {key: self.cms.estimate(key) for key in self.candidates}
+        rare = [key for key in self.candidates if estimates[key] <= cutoff]
+        rare.sort(key=lambda key: estimates[key])
+        return [self.candidates[key] for key in rare[:limit]]
+
+    def nbytes(self) -> int:
+        return (
+            self.cms.nbytes()
+            + sum(150 + len(key) for key in self.heavy.counts)
+            + sum(150 + len(key) + len(example) for key, example in self.candidates.items())
+        )
+
+
+class LogSummary:
+    """All cacheable per-file aggregates, computed in one pass"""
+
+    def __init__(self):
+        self.levels = LevelCounter()
+        self.line_stats = LineStats()
+        self.templates = TemplateCounter()
+        self.timeline = Timeline()
+        self.sketch = MessageSketch()
+
+    @classmethod
+    def partial(cls) -> "LogSummary":
+        """Summary of one chunk of a parallel scan (see TemplateCounter.partial)"""
+        summary = cls()
+        summary.templates = TemplateCounter.partial()
+        summary.timeline = Timeline.partial()
+        return summary
+
+    def add(self, record: LogRecord) -> None:
+        self.levels.add(record)
+        self.line_stats.add(record)
+        # Mask once, share between aggregators
+        template_key = TemplateCounter.key(record)
+        self.templates.add_keyed(record, template_key)
+        self.timeline.add_keyed(record, template_key)
+        self.sketch.add_keyed(record, template_key if template_key is not None else MessageSketch.key(record))
+
+    def merge(self, other: "LogSummary") -> None:
+        self.levels.merge(other.levels)
+        self.line_stats.merge(other.line_stats)
+        self.templates.merge(other.templates)
+        self.timeline.merge(other.timeline)
+        self.sketch.merge(other.sketch)
+
+    def copy(self) -> "LogSummary":
+        summary = LogSummary()
+        summary.merge(self)
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": SUMMARY_VERSION,
+            "levels": self.levels.to_dict(),
+            "line_stats": self.line_stats.to_dict(),
+            "templates": self.templates.to_dict(),
+            "timeline": self.timeline.to_dict(),
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LogSummary":
+        if data.get("version") != SUMMARY_VERSION:
+            raise ValueError("Summary was built by an incompatible version")
+        summary = cls()
+        summary.levels = LevelCounter.from_dict(data["levels"])
+        summary.line_stats = LineStats.from_dict(data["line_stats"])
+        summary.templates = TemplateCounter.from_dict(data["templates"])
+        summary.timeline = Timeline.from_dict(data["timeline"])
+        summary.sketch = MessageSketch.from_dict(data["sketch"])
+        return summary
+
+    def estimated_size(self) -> int:
+        """Rough memory footprint in bytes, used for cache accounting"""
+        timeline = self.timeline
+        return (
+            1024
+            + self.sketch.nbytes()
+            + self.templates.nbytes()
+            + 100 * (len(timeline.lines) + len(timeline.errors))
+            + 150 * len(timeline.levels)
+            + sum(100 + len(key) + 100 * len(buckets) for key, buckets in timeline.patterns.items())
+        )
+
 
 class StatisticsAnalyzer:
     @staticmethod
-    def analyze_log_levels(lines: List[str]) -> Dict[str, int]:
+    def classify_level(line: str) -> Optional[str]:
+        """Return the severity level of a line"""
+        return DEFAULT_PARSER.parse(line).level
+
+    @staticmethod
+    @METRICS.timed("classify")
+    def feed(aggregator, lines: Iterable[str]):
+        """Parse lines, run an aggregator over the records and return it"""
+        add = aggregator.add
+        for record in DEFAULT_PARSER.records(lines):
+            add(record)
+        return aggregator
+
+    @staticmethod
+    def analyze_log_levels(lines: Iterable[str]) -> Dict[str, int]:
         """Count logs by severity level"""
-        levels = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
-        counts = {level: 0 for level in levels}
-        
-        for line in lines:
-            for level in levels:
-                if f"[{level}]" in line or f"{level}" in line.upper():
-                    counts[level] += 1
-                    break
-        
-        return counts
+        return StatisticsAnalyzer.feed(LevelCounter(), lines).result()
 
     @staticmethod
-    def get_statistics(lines: List[str]) -> Dict:
+    def get_statistics(lines: Iterable[str]) -> Dict:
         """Generate comprehensive statistics"""
-        if not lines:
-            return {"error": "No logs found"}
-        
-        line_lengths = [len(line.strip()) for line in lines]
-        
-        return {
-            "total_lines": len(lines),
-            "min_length": min(line_lengths) if line_lengths else 0,
-            "max_length": max(line_lengths) if line_lengths else 0,
-            "avg_length": sum(line_lengths) / len(line_lengths) if line_lengths else 0,
-            "non_empty_lines": len([l for l in lines if l.strip()]),
-        }
+        return StatisticsAnalyzer.feed(LineStats(), lines).result()
 
     @staticmethod
-    def find_common_patterns(lines: List[str], top_n: int = 5) -> List[Tuple[str, int]]:
-        """Find most common error messages"""
-        # Extract error/warning messages
-        patterns = []
-        for line in lines:
-            if "ERROR" in line or "WARNING" in line:
-                # Extract message after level indicator
-                match = re.search(r'\[(ERROR|WARNING)\]\s*(.+?)(?:\s|$)', line)
-                if match:
-                    patterns.append(match.group(2)[:50])  # First 50 chars
-        
-        # Count and return top N
-        counter = Counter(patterns)
-        return counter.most_common(top_n)
+    def find_common_patterns(lines: Iterable[str], top_n: int = 5) -> List[Tuple[str, int]]:
+        """Find most common error message templates"""
+        return StatisticsAnalyzer.feed(TemplateCounter(), lines).result(top_n)
 
     @staticmethod
-    def find_rare_logs(lines: List[str], threshold: float = 0.01) -> List[str]:
-        """Find rare/unusual log entries"""
-        # Simple heuristic: very long lines or unusual patterns
-        rare = []
-        avg_length = sum(len(l) for l in lines) / len(lines) if lines else 0
-        
-        for line in lines:
-            if len(line) > avg_length * 2:  # 2x average length
-                rare.append(line.strip())
-        
-        return rare[:10]  # Return top 10
+    def find_rare_logs(lines: Iterable[str], threshold: float = STATS_CONFIG["rare_threshold"]) -> List[str]:
+        """Find rare log messages (seen in at most threshold of all lines)"""
+        return StatisticsAnalyzer.feed(MessageSketch(), lines).rare(threshold)
 
     @staticmethod
-    def detect_spike(lines: List[str], window_size: int = 10) -> Dict:
-        """Detect sudden spikes in ERROR/CRITICAL logs"""
-        errors = [line for line in lines if "ERROR" in line or "CRITICAL" in line]
-        
-        if len(errors) < window_size:
-            return {"spikes_detected": 0, "message": "Not enough errors to detect spikes"}
-        
-        # Simple spike detection: compare moving averages
-        first_half = errors[:len(errors)//2]
-        second_half = errors[len(errors)//2:]
-        
-        first_avg = len(first_half) / (len(errors)//2) if len(errors)//2 > 0 else 0
-        second_avg = len(second_half) / (len(errors) - len(errors)//2) if len(errors) - len(errors)//2 > 0 else 0
-        
-        spike_detected = second_avg > first_avg * 1.5
-        
-        return {
-            "spike_detected": spike_detected,
-            "first_half_errors": len(first_half),
-            "second_half_errors": len(second_half),
-            "increase_percentage": ((second_avg - first_avg) / (first_avg + 0.1)) * 100 if first_avg > 0 else 0
-        }
+    def detect_spike(lines: Iterable[str], window_size: int = ANOMALY_CONFIG["window_buckets"]) -> Dict:
+        """Detect sudden spikes in ERROR/CRITICAL logs per time bucket"""
+        timeline = StatisticsAnalyzer.feed(Timeline(), lines)
+        return AnomalyDetector.detect_spikes(timeline, window_buckets=window_size)
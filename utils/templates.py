@@ -0,0 +1,208 @@
+"""Online log template mining (Drain-style)
+
+Messages are first masked token by token (numbers, IDs, IPs, paths)
+and then clustered by a fixed-depth prefix tree: token count, then the
+leading tokens, then a short list of clusters compared by token
+similarity. A cluster's template turns differing tokens into <*> as
+new messages join it. The number of templates is capped: when the cap
+is reached, the rarest of the least recently matched templates is
+evicted and its lines are counted as dropped. Miners of separate files
+merge template by template.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import itertools
+import re
+from config import TEMPLATE_CONFIG
+
+WILDCARD = "<*>"
+_DIGIT_RE = re.compile(r'\d')
+_MASKABLE_RE = re.compile(r'[\d/\\]')  # tokens without these are kept as they are
+_KEY_NUMBER_RE = re.compile(r'((?:[^\d=/\\]*=)?)\d+')  # 123 and key=123, the common cases
+_NUMBER_RE = re.compile(r'[-+]?\d+(?:[.,:]\d+)*(?:%|[a-zA-Z]{1,3})?')
+_IP_RE = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?')
+_HEX_RE = re.compile(r'(?:0x)?[0-9a-fA-F]{8,}|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}')
+_EDGE_PUNCTUATION = "()[]{}<>,;'\"."
+_EVICTION_CANDIDATES = 16  # least recently matched templates compared when evicting
+_EXAMPLE_CHARS = 200  # characters of the example message kept per template
+
+
+def mask_token(token: str) -> str:
+    """Replace the variable part of a token with a typed placeholder"""
+    simple = _KEY_NUMBER_RE.fullmatch(token)
+    if simple is not None:
+        return simple.group(1) + "<NUM>"
+    if "=" in token:
+        key, value = token.split("=", 1)
+        return f"{key}={mask_token(value)}" if value else token
+    head = len(token) - len(token.lstrip(_EDGE_PUNCTUATION))
+    core = token.strip(_EDGE_PUNCTUATION)
+    if not core:
+        return token
+    tail = len(token) - head - len(core)
+    if "/" in core or "\\" in core:
+        masked = "<PATH>"
+    elif not _DIGIT_RE.search(core):
+        return token
+    elif _IP_RE.fullmatch(core):
+        masked = "<IP>"
+    elif _NUMBER_RE.fullmatch(core):
+        masked = "<NUM>"
+    else:
+        masked = "<ID>"  # mixed letters and digits, hex, UUIDs
+    return token[:head] + masked + (token[len(token) - tail:] if tail else "")
+
+
+def mask_message(message: str) -> str:
+    search = _MASKABLE_RE.search
+    if not search(message):
+        return " ".join(message.split())
+    return " ".join([mask_token(token) if search(token) else token for token in message.split()])
+
+
+class TemplateCluster:
+    __slots__ = ("template_id", "tokens", "count", "example")
+
+    def __init__(self, template_id: int, tokens: List[str], count: int, example: str):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = count
+        self.example = example
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def to_dict(self) -> Dict:
+        return {
+            "template_id": self.template_id,
+            "template": self.template,
+            "count": self.count,
+            "example": self.example,
+        }
+
+
+class TemplateMiner:
+    def __init__(
+        self,
+        depth: int = TEMPLATE_CONFIG["depth"],
+        similarity: float = TEMPLATE_CONFIG["similarity"],
+        max_children: int = TEMPLATE_CONFIG["max_children"],
+        max_templates: int = TEMPLATE_CONFIG["max_templates"]
+    ):
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self.root = {}
+        self.clusters = OrderedDict()  # template_id -> cluster, least recent first
+        self._leaves = {}  # template_id -> leaf list holding the cluster
+        self._next_id = 1
+        self.evicted = 0
+        self.dropped = 0  # lines of evicted templates
+
+    def add(self, message: str, count: int = 1, example: Optional[str] = None) -> TemplateCluster:
+        """Assign a message to a template, creating or generalizing one"""
+        return self.add_masked(mask_message(message), count, example if example is not None else message)
+
+    def add_masked(self, masked: str, count: int = 1, example: Optional[str] = None) -> TemplateCluster:
+        """add() for a message already passed through mask_message"""
+        tokens = masked.split()
+        leaf = self._leaf(tokens)
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            if len(self.clusters) >= self.max_templates:
+                self._evict()
+            example = example if example is not None else masked
+            cluster = TemplateCluster(self._next_id, tokens, 0, example[:_EXAMPLE_CHARS])
+            self._next_id += 1
+            self._insert(cluster, leaf)
+        else:
+            cluster.tokens = [
+                token if token == other else WILDCARD
+                for token, other in zip(cluster.tokens, tokens)
+            ]
+            self.clusters.move_to_end(cluster.template_id)
+        cluster.count += count
+        return cluster
+
+    def merge(self, other: "TemplateMiner") -> None:
+        """Add the templates of other, oldest first, as if its lines came next"""
+        for cluster in sorted(other.clusters.values(), key=lambda c: c.template_id):
+            self.add_masked(cluster.template, cluster.count, cluster.example)
+        self.evicted += other.evicted
+        self.dropped += other.dropped
+
+    def top(self, top_n: int = 5) -> List[TemplateCluster]:
+        return sorted(self.clusters.values(), key=lambda c: (-c.count, c.template_id))[:top_n]
+
+    def to_dict(self) -> Dict:
+        # Least recently matched first, so from_dict restores the eviction order
+        return {
+            "clusters": [
+                [cluster.template_id, cluster.template, cluster.count, cluster.example]
+                for cluster in self.clusters.values()
+            ],
+            "next_id": self._next_id,
+            "evicted": self.evicted,
+            "dropped": self.dropped,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TemplateMiner":
+        miner = cls()
+        for template_id, template, count, example in data["clusters"]:
+            tokens = template.split()
+            miner._insert(TemplateCluster(template_id, tokens, count, example), miner._leaf(tokens))
+        miner._next_id = data["next_id"]
+        miner.evicted = data["evicted"]
+        miner.dropped = data["dropped"]
+        return miner
+
+    def _insert(self, cluster: TemplateCluster, leaf: List[TemplateCluster]) -> None:
+        leaf.append(cluster)
+        self._leaves[cluster.template_id] = leaf
+        self.clusters[cluster.template_id] = cluster
+
+    def _leaf(self, tokens: List[str]) -> List[TemplateCluster]:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if WILDCARD in token or "<" in token or _DIGIT_RE.search(token):
+                token = WILDCARD
+            if token not in node:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                node = node.setdefault(token, {})
+            else:
+                node = node[token]
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[TemplateCluster], tokens: List[str]) -> Optional[TemplateCluster]:
+        best, best_score = None, -1.0
+        for cluster in leaf:
+            same = sum(1 for token, other in zip(cluster.tokens, tokens) if token == other)
+            score = same / len(tokens) if tokens else 1.0
+            if score > best_score:
+                best, best_score = cluster, score
+        return best if best is not None and best_score >= self.similarity else None
+
+    def _evict(self) -> None:
+        # The rarest of the least recently matched, so busy templates survive bursts of new ones
+        candidates = itertools.islice(self.clusters.values(), _EVICTION_CANDIDATES)
+        cluster = min(candidates, key=lambda c: c.count)
+        del self.clusters[cluster.template_id]
+        self._leaves.pop(cluster.template_id).remove(cluster)
+        self.evicted += 1
+        self.dropped += cluster.count
+
+
+def mine_templates(messages: List[Tuple[str, int, str]]) -> Tuple[TemplateMiner, Dict[str, int]]:
+    """Cluster (masked message, count, example) triples in the given order.
+
+    Returns the miner and a map of masked message -> template id.
+    """
+    miner = TemplateMiner()
+    assignment = {}
+    for message, count, example in messages:
+        assignment[message] = miner.add(message, count, example).template_id
+    return miner, assignment
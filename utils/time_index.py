@@ -0,0 +1,119 @@
+"""Time-range queries over timestamped log files
+
+Timestamps within a file are assumed to be monotonic, so the first line
+at or after a given time can be found by bisecting byte offsets instead
+of scanning from the start. Reading then stops at the first record past
+the end of the window, so query cost follows the window size rather
+than the file size.
+"""
+from typing import Dict, Iterator, Optional, Tuple
+import os
+from config import SCAN_CONFIG, TIME_INDEX_CONFIG
+from utils.archive import is_compressed
+from utils.file_handler import FileHandler
+from utils.parser import LogParser, LogRecord, parse_timestamp
+
+
+class TimeRange:
+    __slots__ = ("since", "until")
+
+    def __init__(self, since: Optional[float] = None, until: Optional[float] = None):
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def parse(cls, since: Optional[str] = None, until: Optional[str] = None) -> Optional["TimeRange"]:
+        """Build a range from ISO timestamps; None when neither bound is given"""
+        if not since and not until:
+            return None
+        bounds = []
+        for name, text in (("since", since), ("until", until)):
+            value = parse_timestamp(text) if text else None
+            if text and value is None:
+                raise ValueError(f"Invalid {name} timestamp: {text}")
+            bounds.append(value)
+        if bounds[0] is not None and bounds[1] is not None and bounds[0] > bounds[1]:
+            raise ValueError("since must not be later than until")
+        return cls(*bounds)
+
+    def overlaps(self, first: Optional[float], last: Optional[float]) -> bool:
+        """Whether a file spanning [first, last] can hold records in range"""
+        if self.until is not None and first is not None and first > self.until:
+            return False
+        if self.since is not None and last is not None and last < self.since:
+            return False
+        return True
+
+    def to_dict(self) -> Dict:
+        return {"since": self.since, "until": self.until}
+
+
+class TimeIndex:
+    def __init__(
+        self,
+        parser: LogParser,
+        chunk_size: int = SCAN_CONFIG["chunk_size"],
+        linear_scan_bytes: int = TIME_INDEX_CONFIG["linear_scan_bytes"],
+        probe_lines: int = TIME_INDEX_CONFIG["probe_lines"]
+    ):
+        self.parser = parser
+        self.chunk_size = chunk_size
+        self.linear_scan_bytes = linear_scan_bytes
+        self.probe_lines = probe_lines
+
+    def first_timestamp(self, file_path: str, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[float, int]]:
+        """(timestamp, line offset) of the first timestamped line in [start, end)"""
+        for count, (offset, raw) in enumerate(FileHandler.iter_raw_lines(file_path, start, end)):
+            if count >= self.probe_lines:
+                break
+            timestamp = self.parser.parse(raw.decode('utf-8', errors='ignore')).timestamp
+            if timestamp is not None:
+                return timestamp, offset
+        return None
+
+    def last_timestamp(self, file_path: str) -> Optional[float]:
+        """Timestamp of the last timestamped line near the end of the file"""
+        lines = 16
+        while lines <= self.probe_lines:
+            tail = FileHandler.read_file(file_path, lines)
+            for line in reversed(tail):
+                timestamp = self.parser.parse(line).timestamp
+                if timestamp is not None:
+                    return timestamp
+            if len(tail) < lines:
+                break
+            lines *= 4
+        return None
+
+    def seek(self, file_path: str, since: float) -> int:
+        """Line offset from which every record at or after since can be read"""
+        lo, hi = 0, os.path.getsize(file_path)
+        # Invariant: every timestamped line starting before lo is < since
+        while hi - lo > self.linear_scan_bytes:
+            mid = (lo + hi) // 2
+            start = FileHandler.next_line_start(file_path, mid, hi)
+            probe = self.first_timestamp(file_path, start, hi)
+            if probe is None or probe[0] >= since:
+                hi = mid
+            else:
+                lo = probe[1]
+        return lo
+
+    def records(self, file_path: str, window: TimeRange) -> Iterator[LogRecord]:
+        """Records of one file inside window; untimed lines follow the previous record"""
+        first = self.first_timestamp(file_path)
+        if first is not None and not window.overlaps(first[0], self.last_timestamp(file_path)):
+            return
+        # Archives cannot be bisected cheaply; they are filtered linearly
+        bisect = window.since is not None and not is_compressed(file_path)
+        start = self.seek(file_path, window.since) if bisect else 0
+        in_window = window.since is None
+        lines = FileHandler.iter_lines(file_path, self.chunk_size, start)
+        for record in self.parser.records(lines):
+            timestamp = record.timestamp
+            if timestamp is not None:
+                if window.until is not None and timestamp > window.until:
+                    break
+                in_window = window.since is None or timestamp >= window.since
+            if in_window:
+                yield record
@@ -0,0 +1,479 @@
+"""On-disk trigram index for substring and regex filters
+
+A file is cut into newline-aligned pages of about TRIGRAM_CONFIG
+["page_bytes"]. For every page the set of (upper-cased, hashed to 16
+bits) byte trigrams is recorded, and per trigram the pages containing it
+are kept as a delta-encoded posting list, compressed on disk in segments
+of about TRIGRAM_CONFIG["segment_bytes"]. A filter is reduced to the
+trigrams any match must contain; only pages holding all of them are read
+and their lines checked, so hashing collisions only cost extra reads.
+
+Filters compare case-insensitively with str.upper() or re.IGNORECASE,
+under which a few non-ASCII characters (the fi ligature, long s,
+dotless i, ...) equal ASCII letters. Pages also index the trigrams of
+their lines holding such characters as folded text, so the index never
+drops a page the linear filter would match in.
+
+Indexes are built lazily on the first search of a file, extended with new
+segments as the file grows, and rebuilt when its inode or head changes,
+it shrinks, or it was rewritten at the same size (mtime changed).
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+from config import CHECKPOINT_CONFIG, TRIGRAM_CONFIG
+from utils.archive import is_compressed
+from utils.cancellation import check_cancelled
+from utils.file_handler import FileHandler
+
+HASH_BITS = 16
+INDEX_VERSION = 2  # bump when the trigrams recorded per page change
+_UPPER = np.arange(256, dtype=np.uint8)
+_UPPER[ord("a"):ord("z") + 1] -= 32
+_REGEX_META = set(".^$*+?{}[]()|\\")
+_ESCAPE_ARGS = {"x": 2, "u": 4, "U": 8}  # hex digits following the escape
+_VERBOSE_RE = re.compile(r"\(\?[a-zA-Z]*x")  # (?x) makes whitespace and # insignificant
+# Non-ASCII characters whose str.upper() holds ASCII letters, or that
+# re.IGNORECASE matches to one (the last two, mapped by _FOLD_EXTRA)
+_FOLDING_CHARS = (
+    "\u00df\u0131\u0149\u017f\u01f0\u1e96\u1e97\u1e98\u1e99\u1e9a"
+    "\ufb00\ufb01\ufb02\ufb03\ufb04\ufb05\ufb06\u0130\u212a"
+)
+_FOLDING_RE = re.compile(b"|".join(re.escape(char.encode("utf-8")) for char in _FOLDING_CHARS))
+_FOLD_EXTRA = {0x130: "I", 0x212A: "K"}
+
+
+def trigram_hashes(data: np.ndarray) -> np.ndarray:
+    """Hashes of the trigrams starting at each position (upper-cased bytes)"""
+    data = _UPPER[data]
+    trigrams = (
+        (data[:-2].astype(np.uint32) << 16)
+        | (data[1:-1].astype(np.uint32) << 8)
+        | data[2:].astype(np.uint32)
+    )
+    return ((trigrams * np.uint32(2654435761)) >> np.uint32(32 - HASH_BITS)).astype(np.uint32)
+
+
+def _folded_keys(block: bytes, bounds: np.ndarray) -> Optional[np.ndarray]:
+    """(page << HASH_BITS) + hash of the trigrams of case-folded lines holding _FOLDING_CHARS"""
+    if block.isascii():
+        return None
+    keys = []
+    line_end = 0
+    for match in _FOLDING_RE.finditer(block):
+        if match.start() < line_end:
+            continue  # line already folded
+        line_start = block.rfind(b"\n", 0, match.start()) + 1
+        line_end = block.find(b"\n", match.end())
+        line_end = len(block) if line_end < 0 else line_end
+        text = block[line_start:line_end].decode("utf-8", errors="replace")
+        folded = np.frombuffer(text.upper().translate(_FOLD_EXTRA).encode("utf-8"), dtype=np.uint8)
+        if len(folded) >= 3:
+            page = int(np.searchsorted(bounds, line_start, side="right")) - 1
+            keys.append((page << HASH_BITS) + trigram_hashes(folded).astype(np.int64))
+    return np.concatenate(keys) if keys else None
+
+
+def literal_hashes(literals: List[str]) -> Set[int]:
+    """Trigram hashes every match must contain (ASCII trigrams only)"""
+    hashes = set()
+    for literal in literals:
+        data = np.frombuffer(literal.encode('utf-8'), dtype=np.uint8)
+        if len(data) < 3:
+            continue
+        ascii_only = (data[:-2] < 128) & (data[1:-1] < 128) & (data[2:] < 128)
+        hashes.update(int(value) for value in trigram_hashes(data)[ascii_only])
+    return hashes
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Upper-cased literal runs that any match of a simple regex must contain.
+
+    Conservative: alternations and verbose patterns yield nothing, groups
+    and classes are skipped, a character made optional by ?, * or {} is
+    dropped, and escapes other than an escaped punctuation character end
+    the run together with their arguments (\\x61, \\N{...}, \\12, ...).
+    """
+    if "|" in pattern or _VERBOSE_RE.search(pattern):
+        return []
+    literals, run = [], []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped.isalnum() or escaped == "_":
+                literals.append("".join(run))  # \d, \w, \b, \x61, \1, ...
+                run = []
+                i = _skip_escape(pattern, i)
+            else:
+                run.append(escaped)
+                i += 2
+            continue
+        if char in "?*{":
+            if run:
+                run.pop()
+            literals.append("".join(run))
+            run = []
+            if char == "{":
+                close = pattern.find("}", i)
+                i = close if close >= 0 else i
+        elif char in "[(":
+            literals.append("".join(run))
+            run = []
+            i = _skip_group(pattern, i)
+            # The group may itself be optional
+            if i + 1 < len(pattern) and pattern[i + 1] in "?*{":
+                i += 1
+                if pattern[i] == "{":
+                    close = pattern.find("}", i)
+                    i = close if close >= 0 else i
+        elif char in _REGEX_META:
+            literals.append("".join(run))
+            run = []
+        else:
+            run.append(char)
+        i += 1
+    literals.append("".join(run))
+    return [literal.upper() for literal in literals if len(literal) >= 3]
+
+
+def _skip_escape(pattern: str, i: int) -> int:
+    """Index after the letter or digit escape starting at i, arguments included"""
+    escaped = pattern[i + 1]
+    end = i + 2
+    if escaped in _ESCAPE_ARGS:
+        end += _ESCAPE_ARGS[escaped]
+    elif escaped == "N" and pattern.startswith("{", end):
+        close = pattern.find("}", end)
+        end = close + 1 if close >= 0 else len(pattern)
+    elif escaped.isdigit():
+        # Octal (\\0, \\012) or group reference (\\1, \\12): at most three digits
+        while end < min(i + 4, len(pattern)) and pattern[end].isdigit():
+            end += 1
+    return min(end, len(pattern))
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    """Index of the bracket closing the class or group opened at i"""
+    opener = pattern[i]
+    closer = "]" if opener == "[" else ")"
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if opener == "(" and char == "(":
+            depth += 1
+        elif char == closer:
+            depth -= 1 if opener == "(" else 1
+            if opener == "[" or depth == 0:
+                return i
+        i += 1
+    return len(pattern) - 1
+
+
+class _Segment:
+    """Pages of the byte range [start, end) with their trigram posting lists"""
+
+    def __init__(self, pages: np.ndarray, bounds: np.ndarray, postings: np.ndarray):
+        self.pages = pages  # page start offsets, plus the segment end
+        self.bounds = bounds  # postings[bounds[h]:bounds[h + 1]] lists pages with hash h
+        self.postings = postings  # delta-encoded page numbers
+
+    @property
+    def start(self) -> int:
+        return int(self.pages[0])
+
+    @property
+    def end(self) -> int:
+        return int(self.pages[-1])
+
+    def pages_with(self, hashes: Set[int]) -> np.ndarray:
+        """Pages containing every hash"""
+        candidates = None
+        for value in sorted(hashes, key=lambda value: self.bounds[value + 1] - self.bounds[value]):
+            pages = np.cumsum(self.postings[self.bounds[value]:self.bounds[value + 1]], dtype=np.int64)
+            candidates = pages if candidates is None else np.intersect1d(candidates, pages, assume_unique=True)
+            if not len(candidates):
+                break
+        return candidates
+
+    @classmethod
+    def build(cls, file_path: str, start: int, end: int, page_bytes: int, batch_bytes: int) -> "_Segment":
+        page_starts, page_ids, page_hashes = [], [], []
+        page_count = 0
+        for base, block in _aligned_blocks(file_path, start, end, batch_bytes):
+            data = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(data == 10)
+            # Pages end at the first newline after every page_bytes
+            marks = np.arange(page_bytes, len(data), page_bytes)
+            cuts = np.zeros(0, dtype=np.int64)
+            if len(newlines):
+                cuts = newlines[np.minimum(np.searchsorted(newlines, marks - 1), len(newlines) - 1)] + 1
+            bounds = np.unique(np.concatenate(([0], cuts[cuts < len(data)], [len(data)])))
+            pages = len(bounds) - 1
+            page_starts.append(bounds[:-1] + base)
+            if len(data) >= 3:
+                valid = (data[:-2] != 10) & (data[1:-1] != 10) & (data[2:] != 10)
+                local = np.repeat(np.arange(pages, dtype=np.int64), np.diff(bounds))[:-2]
+                keys = (local << HASH_BITS) + trigram_hashes(data)
+                present = np.flatnonzero(np.bincount(keys[valid], minlength=pages << HASH_BITS))
+                folded = _folded_keys(block, bounds)
+                if folded is not None:
+                    present = np.union1d(present, folded)
+                page_ids.append((present >> HASH_BITS) + page_count)
+                page_hashes.append(present & ((1 << HASH_BITS) - 1))
+            page_count += pages
+
+        pages = np.concatenate(page_starts + [np.array([end])]).astype(np.int64)
+        ids = np.concatenate(page_ids) if page_ids else np.zeros(0, dtype=np.int64)
+        hashes = np.concatenate(page_hashes) if page_hashes else np.zeros(0, dtype=np.int64)
+        order = np.lexsort((ids, hashes))
+        ids, hashes = ids[order], hashes[order]
+        bounds = np.searchsorted(hashes, np.arange((1 << HASH_BITS) + 1)).astype(np.int64)
+        # Delta-encode each posting list; the first entry keeps its value
+        deltas = np.diff(ids, prepend=0)
+        firsts = bounds[:-1][bounds[:-1] < bounds[1:]]
+        deltas[firsts] = ids[firsts]
+        return cls(pages, bounds, deltas.astype(np.uint32))
+
+    def save(self, path: str) -> None:
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(temp, pages=self.pages, bounds=self.bounds, postings=self.postings)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "_Segment":
+        with np.load(path) as data:
+            return cls(data["pages"], data["bounds"], data["postings"])
+
+
+def _aligned_blocks(file_path: str, start: int, end: int, batch_bytes: int) -> Iterator:
+    """(offset, bytes) blocks of [start, end) cut just after a newline"""
+    offset = start
+    remainder = b""
+    for chunk in FileHandler._chunks(file_path, start, end, batch_bytes):
+        buffer = remainder + chunk
+        cut = buffer.rfind(b"\n") + 1
+        if not cut:
+            remainder = buffer
+            continue
+        remainder = buffer[cut:]
+        yield offset, buffer[:cut]
+        offset += cut
+    if remainder:
+        yield offset, remainder
+
+
+class _FileIndex:
+    __slots__ = ("inode", "mtime_ns", "head_length", "head_hash", "segments")
+
+    def __init__(self, inode: int, mtime_ns: int, head_length: int, head_hash: str, segments: List[_Segment]):
+        self.inode = inode
+        self.mtime_ns = mtime_ns
+        self.head_length = head_length
+        self.head_hash = head_hash
+        self.segments = segments
+
+    @property
+    def end(self) -> int:
+        return self.segments[-1].end if self.segments else 0
+
+
+class TrigramIndex:
+    def __init__(
+        self,
+        index_dir: Optional[str] = TRIGRAM_CONFIG["index_dir"],
+        enabled: bool = TRIGRAM_CONFIG["enabled"],
+        min_file_bytes: int = TRIGRAM_CONFIG["min_file_bytes"],
+        page_bytes: int = TRIGRAM_CONFIG["page_bytes"],
+        segment_bytes: int = TRIGRAM_CONFIG["segment_bytes"],
+        max_cached: int = TRIGRAM_CONFIG["max_cached"],
+        head_bytes: int = CHECKPOINT_CONFIG["head_bytes"]
+    ):
+        self.index_dir = index_dir or os.path.join(tempfile.gettempdir(), "log_analyzer_trigrams")
+        self.enabled = enabled
+        self.min_file_bytes = min_file_bytes
+        self.page_bytes = page_bytes
+        self.segment_bytes = segment_bytes
+        self.max_cached = max_cached
+        self.head_bytes = head_bytes
+        self._cached = OrderedDict()  # path -> _FileIndex
+        self._locks = {}  # path -> lock serializing builds of one file
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.pages_read = 0
+        self.pages_total = 0
+
+    def search(
+        self,
+        file_path: str,
+        predicate: Callable[[str], bool],
+        literals: List[str],
+        start: int = 0
+    ) -> Optional[List[str]]:
+        """Lines at or after offset start matching predicate; None if the index cannot help"""
+        ranges = self.candidate_ranges(file_path, literals, start)
+        if ranges is None:
+            return None
+        matches = []
+        for range_start, range_end in ranges:
+            lines = FileHandler.iter_lines(file_path, start=range_start, end=range_end)
+            matches.extend(line for line in lines if predicate(line))
+        return matches
+
+    def candidate_ranges(
+        self,
+        file_path: str,
+        literals: List[str],
+        start: int = 0
+    ) -> Optional[List[Tuple[int, Optional[int]]]]:
+        """Newline-aligned byte ranges at or after start that may hold a match, in file order.
+
+        The last range runs to EOF (end None) and covers bytes appended
+        since the index was updated. None if the index cannot help.
+        """
+        if not self.enabled or is_compressed(file_path):
+            return None
+        hashes = literal_hashes(literals)
+        if not hashes:
+            return None
+        size = os.path.getsize(file_path)
+        if size < self.min_file_bytes:
+            return None
+        index = self._index(file_path)
+
+        ranges = []
+        for segment in index.segments:
+            if segment.end <= start:
+                continue
+            pages = segment.pages_with(hashes)
+            self.pages_total += len(segment.pages) - 1
+            self.pages_read += len(pages)
+            for page in pages:
+                page_start, page_end = int(segment.pages[page]), int(segment.pages[page + 1])
+                if page_end <= start:
+                    continue
+                ranges.append((max(page_start, start), page_end))
+        # Bytes appended after the index was brought up to date
+        ranges.append((max(index.end, start), None))
+        self.searches += 1
+        return ranges
+
+    def _index(self, file_path: str) -> _FileIndex:
+        """Load, extend or build the index of a file"""
+        path = str(Path(file_path).resolve())
+        with self._lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            st = os.stat(path)
+            index = self._cached.get(path) or self._load(path)
+            if index is not None and not self._is_valid(path, index, st):
+                index = None
+            if index is None:
+                index = _FileIndex(st.st_ino, st.st_mtime_ns, 0, "", [])
+            line_end = FileHandler.last_line_end(path, index.end, st.st_size)
+            if line_end > index.end or index.mtime_ns != st.st_mtime_ns:
+                rebuilt = not index.segments
+                changed = self._extend(path, index, line_end)
+                index.mtime_ns = st.st_mtime_ns
+                self._save(path, index, changed, rebuilt)
+            with self._lock:
+                self._cached[path] = index
+                self._cached.move_to_end(path)
+                while len(self._cached) > self.max_cached:
+                    self._cached.popitem(last=False)
+            return index
+
+    def _is_valid(self, path: str, index: _FileIndex, st: os.stat_result) -> bool:
+        if index.inode != st.st_ino or st.st_size < index.end:
+            return False
+        if st.st_size == index.end and st.st_mtime_ns != index.mtime_ns:
+            return False  # rewritten in place
+        return self._head_hash(path, index.head_length) == index.head_hash
+
+    def _extend(self, path: str, index: _FileIndex, line_end: int) -> List[_Segment]:
+        """Index [index.end, line_end), rebuilding a last segment that is not full"""
+        start = index.end
+        if index.segments and index.segments[-1].end - index.segments[-1].start < self.segment_bytes:
+            start = index.segments.pop().start
+        changed = []
+        while start < line_end:
+            check_cancelled()
+            stop = line_end
+            if line_end - start > self.segment_bytes:
+                stop = FileHandler.next_line_start(path, start + self.segment_bytes, line_end)
+            # About 16 pages are hashed per vectorized step
+            segment = _Segment.build(path, start, stop, self.page_bytes, 16 * self.page_bytes)
+            index.segments.append(segment)
+            changed.append(segment)
+            start = stop
+        index.head_length = min(self.head_bytes, index.end)
+        index.head_hash = self._head_hash(path, index.head_length)
+        return changed
+
+    @staticmethod
+    def _head_hash(path: str, length: int) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read(length)).hexdigest()
+
+    def _base(self, path: str) -> str:
+        name = hashlib.sha1(path.encode('utf-8', errors='ignore')).hexdigest()
+        return os.path.join(self.index_dir, name)
+
+    def _load(self, path: str) -> Optional[_FileIndex]:
+        base = self._base(path)
+        try:
+            with open(f"{base}.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            segments = [_Segment.load(f"{base}.{start}.npz") for start in meta["segments"]]
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get("version") != INDEX_VERSION:
+            return None
+        return _FileIndex(meta["inode"], meta["mtime_ns"], meta["head_length"], meta["head_hash"], segments)
+
+    def _save(self, path: str, index: _FileIndex, changed: List[_Segment], rebuilt: bool) -> None:
+        Path(self.index_dir).mkdir(parents=True, exist_ok=True)
+        base = self._base(path)
+        if rebuilt:
+            # Drop segment files of a previous version of the file
+            for stale in Path(self.index_dir).glob(f"{Path(base).name}.*.npz"):
+                stale.unlink(missing_ok=True)
+        for segment in changed:
+            segment.save(f"{base}.{segment.start}.npz")
+        meta = {
+            "version": INDEX_VERSION,
+            "path": path,
+            "inode": index.inode,
+            "mtime_ns": index.mtime_ns,
+            "head_length": index.head_length,
+            "head_hash": index.head_hash,
+            "segments": [segment.start for segment in index.segments],
+        }
+        temp = f"{base}.json.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp, f"{base}.json")
+
+    def stats(self) -> dict:
+        return {
+            "searches": self.searches,
+            "pages_read": self.pages_read,
+            "pages_total": self.pages_total,
+            "pages_skipped_rate": round(1 - self.pages_read / self.pages_total, 4) if self.pages_total else 0.0,
+            "index_dir": self.index_dir,
+        }
+
+
+# Shared by every LogAnalyzer in the process
+TRIGRAM_INDEX = TrigramIndex()
@@ -0,0 +1,112 @@
+"""Background warm-up of configured log directories
+
+After the server starts, one daemon thread discovers and summarizes each
+directory of WARMUP_CONFIG["paths"] in turn, so the first call against it
+is answered from the analysis cache (or the columnar store) instead of a
+cold scan. The work itself is passed in by the caller; this module only
+runs it and records progress, and imports nothing heavy so the server
+can load it before its handshake.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import threading
+import time
+
+
+class WarmupProgress:
+    """Progress of one directory: pending, running, done or error"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.state = "pending"
+        self.files = []  # resolved paths being warmed
+        self.bytes_total = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def begin(self, files: List[str], bytes_total: int) -> None:
+        with self._lock:
+            self.files = list(files)
+            self.bytes_total = bytes_total
+
+    def advance(self, size: int) -> None:
+        """One more file summarized"""
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "directory": self.directory,
+                "state": self.state,
+                "files": len(self.files),
+                "files_done": self.files_done,
+                "bytes_total": self.bytes_total,
+                "bytes_done": self.bytes_done,
+                "seconds": round(end - self.started, 3) if self.started else None,
+                "error": self.error,
+            }
+
+
+class Warmup:
+    def __init__(self):
+        self._progress = OrderedDict()  # resolved directory -> WarmupProgress
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, directories: List[str], warm: Callable[[str, WarmupProgress], None]) -> bool:
+        """Warm directories one after another in a daemon thread; False if already running.
+
+        warm(directory, progress) does the work and reports it on progress.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            queue = []
+            for directory in directories:
+                progress = WarmupProgress(directory)
+                self._progress[self.key(directory)] = progress
+                queue.append(progress)
+            if not queue:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(queue, warm), name="log-warmup", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    @staticmethod
+    def _run(queue: List[WarmupProgress], warm: Callable[[str, WarmupProgress], None]) -> None:
+        for progress in queue:
+            progress.state = "running"
+            progress.started = time.time()
+            try:
+                warm(progress.directory, progress)
+                progress.state = "done"
+            except Exception as e:
+                progress.state = "error"
+                progress.error = str(e)
+            progress.finished = time.time()
+
+    @staticmethod
+    def key(directory: str) -> str:
+        return str(Path(directory).resolve())
+
+    def get(self, directory: str) -> Optional[WarmupProgress]:
+        with self._lock:
+            return self._progress.get(self.key(directory))
+
+    def list(self) -> List[WarmupProgress]:
+        with self._lock:
+            return list(self._progress.values())
+
+
+# Shared by every LogAnalyzer in the process
+WARMUP = Warmup()